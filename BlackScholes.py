@@ -1,5 +1,197 @@
 import numpy as np
-import scipy.stats as si
+from datetime import datetime, timezone
+from scipy.special import ndtr
+
+import tracing
+
+SECONDS_PER_YEAR = 365 * 24 * 3600
+_INV_SQRT_2PI = float(1.0 / np.sqrt(2.0 * np.pi))
+
+
+def _is_call(call_put, shape):
+    """Normalise a call/put flag ("C"/"P", bools or an array of either) to a bool array."""
+    flag = np.asarray(call_put)
+    if flag.dtype.kind in "USO":                   # object: pandas string / mixed columns
+        text = np.char.upper(flag.astype(str))
+        flag = (text == "C") | (text == "TRUE")    # object arrays of bools stringify to "True"
+    return np.broadcast_to(flag.astype(bool), shape)
+
+
+def bs_engine(S, K, T, r, sigma, call_put="C", dtype=np.float64):
+    """
+    Price and Greeks for a whole batch of European options in one pass.
+
+    Every argument broadcasts, so a full option chain can be priced by
+    passing the strike / expiry / IV columns as arrays and the spot and
+    rate as scalars.  d1, d2, the discount factor and N(.) / n(.) are
+    computed once and shared between the price and all Greeks.
+
+    Parameters:
+    S : float or array - Underlying asset price
+    K : float or array - Strike price
+    T : float or array - Time to maturity in years
+    r : float or array - Risk-free rate (annual)
+    sigma : float or array - Volatility (annual)
+    call_put : "C"/"P", bool or array of either - True / "C" for calls
+    dtype : np.float32 or np.float64 - Working precision
+
+    Returns:
+    dict: 'price', 'delta', 'gamma', 'theta', 'vega', 'rho' arrays
+          (theta per year, vega and rho per 1.0 change in sigma / r)
+    """
+    S, K, T, r, sigma = (np.asarray(x, dtype=dtype) for x in (S, K, T, r, sigma))
+    S, K, T, r, sigma = np.broadcast_arrays(S, K, T, r, sigma)
+    sign = np.where(_is_call(call_put, S.shape), 1, -1).astype(dtype)
+
+    sqrt_t = np.sqrt(T)
+    vol_sqrt_t = sigma * sqrt_t
+    d1 = (np.log(S / K) + (r + 0.5 * sigma * sigma) * T) / vol_sqrt_t
+    d2 = d1 - vol_sqrt_t
+
+    pdf_d1 = _INV_SQRT_2PI * np.exp(-0.5 * d1 * d1)
+    cdf_d1 = ndtr(sign * d1)
+    cdf_d2 = ndtr(sign * d2)
+    k_disc = K * np.exp(-r * T)
+    s_pdf = S * pdf_d1
+
+    return {
+        "price": sign * (S * cdf_d1 - k_disc * cdf_d2),
+        "delta": sign * cdf_d1,
+        "gamma": pdf_d1 / (S * vol_sqrt_t),
+        "theta": -(s_pdf * sigma) / (2 * sqrt_t) - sign * r * k_disc * cdf_d2,
+        "vega": s_pdf * sqrt_t,
+        "rho": sign * T * k_disc * cdf_d2,
+    }
+
+
+def as_utc(when):
+    """Aware UTC datetime from a datetime or ISO string; naive values (e.g. expiry dates) are read as UTC."""
+    if isinstance(when, str):
+        when = datetime.fromisoformat(when)
+    return when.replace(tzinfo=timezone.utc) if when.tzinfo is None else when.astimezone(timezone.utc)
+
+
+def year_fractions(expiries, now=None):
+    """Convert ISO expiry strings (e.g. from tkr.options) to years from `now` (UTC)."""
+    now = as_utc(now or datetime.now(timezone.utc)).replace(tzinfo=None)    # numpy wants naive UTC
+    exp = np.asarray(expiries, dtype="datetime64[s]")
+    secs = (exp - np.datetime64(now, "s")).astype(np.float64)
+    return secs / SECONDS_PER_YEAR
+
+
+def chain_greeks(chain, S, r, expiry=None, call_put="C", now=None, dtype=np.float64):
+    """
+    Price every row of a yfinance option-chain frame (option_chain(exp).calls / .puts).
+
+    Uses the 'strike' and 'impliedVolatility' columns.  The expiry is taken
+    from an 'expiry' column if present, otherwise from `expiry`; the call/put
+    flag likewise comes from a 'call_put' column or the `call_put` argument.
+
+    Returns:
+    dict: same keys as bs_engine, one entry per chain row
+    """
+    T = year_fractions(chain["expiry"] if "expiry" in chain else expiry, now)
+    flag = chain["call_put"].to_numpy() if "call_put" in chain else call_put
+    tracing.count("options.priced", len(chain))
+    return bs_engine(S, chain["strike"].to_numpy(), T, r,
+                     chain["impliedVolatility"].to_numpy(), flag, dtype)
+
+
+def implied_vol(price, S, K, T, r, call_put="C", tol=1e-8, max_iter=50,
+                lo=1e-6, hi=5.0):
+    """
+    Back out Black-Scholes implied volatility for a batch of contracts at once.
+
+    Puts are mapped to calls through put-call parity, then every row is
+    solved together with a safeguarded Newton iteration: a step that leaves
+    the current [lo, hi] bracket (or has a vanishing vega) falls back to
+    bisection.  The start point is the Corrado-Miller approximation.  Rows
+    drop out of the working set as soon as they converge.
+
+    Parameters:
+    price : float or array - Observed option price (last or mid)
+    S, K, T, r : float or array - See black_scholes_call for descriptions
+    call_put : "C"/"P", bool or array of either - True / "C" for calls
+    tol : float - Absolute price tolerance
+    max_iter : int - Iteration cap
+    lo, hi : float - Initial volatility bracket
+
+    Returns:
+    dict: 'iv' (NaN where unsolved), 'converged' mask, 'no_solution' mask
+          (price outside the arbitrage-free bounds) and 'iterations'
+    """
+    price, S, K, T, r = np.broadcast_arrays(
+        *(np.asarray(x, dtype=np.float64) for x in (price, S, K, T, r)))
+    tracing.count("options.iv_solved", S.size)
+    k_disc = K * np.exp(-r * T)
+    # solve everything as a call: C = P + S - K e^{-rT}
+    call = np.where(_is_call(call_put, S.shape), price, price + S - k_disc)
+
+    no_solution = ~((call > np.maximum(S - k_disc, 0.0)) & (call < S) & (T > 0))
+    iv = np.full(S.shape, np.nan)
+    converged = np.zeros(S.shape, dtype=bool)
+    iterations = np.zeros(S.shape, dtype=np.int64)
+
+    idx = np.flatnonzero(~no_solution)
+    S_, K_, T_, r_, c_ = (x.ravel()[idx] for x in (S, K, T, r, call))
+    kd_ = k_disc.ravel()[idx]
+
+    # Corrado-Miller start point, clipped into the bracket
+    half_gap = 0.5 * (S_ - kd_)
+    body = c_ - half_gap
+    root = np.sqrt(np.maximum(body * body - (S_ - kd_) ** 2 / np.pi, 0.0))
+    sig = np.sqrt(2 * np.pi / T_) * (body + root) / (S_ + kd_)
+    lo_ = np.full(idx.shape, lo)
+    hi_ = np.full(idx.shape, hi)
+    sig = np.clip(np.nan_to_num(sig, nan=0.2), lo, hi)
+
+    for it in range(1, max_iter + 1):
+        out = bs_engine(S_, K_, T_, r_, sig, "C")
+        diff = out["price"] - c_
+        done = np.abs(diff) < tol
+        if done.any():
+            iv.flat[idx[done]] = sig[done]
+            converged.flat[idx[done]] = True
+            iterations.flat[idx[done]] = it
+            keep = ~done
+            idx, S_, K_, T_, r_, c_, sig, lo_, hi_, diff = (
+                x[keep] for x in (idx, S_, K_, T_, r_, c_, sig, lo_, hi_, diff))
+            vega = out["vega"][keep]
+        else:
+            vega = out["vega"]
+        if idx.size == 0:
+            break
+
+        above = diff > 0
+        hi_ = np.where(above, sig, hi_)
+        lo_ = np.where(above, lo_, sig)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            step = sig - diff / vega
+        bad = ~np.isfinite(step) | (step <= lo_) | (step >= hi_)
+        sig = np.where(bad, 0.5 * (lo_ + hi_), step)
+
+    iterations.flat[idx] = max_iter
+    return {"iv": iv[()], "converged": converged[()],
+            "no_solution": no_solution[()], "iterations": iterations[()]}
+
+
+def chain_implied_vol(chain, S, r, expiry=None, call_put="C", now=None, **kw):
+    """
+    Solve implied volatility for every row of a yfinance option-chain frame.
+
+    Uses the bid/ask mid where both quotes are positive and 'lastPrice'
+    otherwise.  Expiry and call/put are resolved as in chain_greeks.
+
+    Returns:
+    dict: see implied_vol
+    """
+    bid, ask = chain["bid"].to_numpy(), chain["ask"].to_numpy()
+    price = np.where((bid > 0) & (ask > 0), 0.5 * (bid + ask),
+                     chain["lastPrice"].to_numpy())
+    T = year_fractions(chain["expiry"] if "expiry" in chain else expiry, now)
+    flag = chain["call_put"].to_numpy() if "call_put" in chain else call_put
+    return implied_vol(price, S, chain["strike"].to_numpy(), T, r, flag, **kw)
+
 
 def black_scholes_call(S, K, T, r, sigma):
     """
@@ -15,10 +207,7 @@ def black_scholes_call(S, K, T, r, sigma):
     Returns:
     float - Call option price
     """
-    d1 = (np.log(S / K) + (r + 0.5 * sigma ** 2) * T) / (sigma * np.sqrt(T))
-    d2 = d1 - sigma * np.sqrt(T)
-    call_price = S * si.norm.cdf(d1) - K * np.exp(-r * T) * si.norm.cdf(d2)
-    return call_price
+    return bs_engine(S, K, T, r, sigma, "C")["price"][()]
 
 def greeks_call(S, K, T, r, sigma):
     """
@@ -30,26 +219,8 @@ def greeks_call(S, K, T, r, sigma):
     Returns:
     dict: Dictionary with keys 'delta', 'gamma', 'theta', 'vega', 'rho'
     """
-    d1 = (np.log(S / K) + (r + 0.5 * sigma ** 2) * T) / (sigma * np.sqrt(T))
-    d2 = d1 - sigma * np.sqrt(T)
-    
-    # Greeks calculations for the call option:
-    delta = si.norm.cdf(d1)  # Call Delta
-    gamma = si.norm.pdf(d1) / (S * sigma * np.sqrt(T))
-    theta = (
-        - (S * si.norm.pdf(d1) * sigma) / (2 * np.sqrt(T))
-        - r * K * np.exp(-r * T) * si.norm.cdf(d2)
-    )
-    vega = S * si.norm.pdf(d1) * np.sqrt(T)  # Vega per 1 unit change in volatility
-    rho = K * T * np.exp(-r * T) * si.norm.cdf(d2)
-    
-    return {
-        "delta": delta,
-        "gamma": gamma,
-        "theta": theta,
-        "vega": vega,
-        "rho": rho
-    }
+    out = bs_engine(S, K, T, r, sigma, "C")
+    return {k: out[k][()] for k in ("delta", "gamma", "theta", "vega", "rho")}
 
 def greeks_put(S, K, T, r, sigma):
     """
@@ -65,24 +236,8 @@ def greeks_put(S, K, T, r, sigma):
     Returns:
     dict: Dictionary with keys 'delta', 'gamma', 'theta', 'vega', 'rho'
     """
-    d1 = (np.log(S / K) + (r + 0.5 * sigma ** 2) * T) / (sigma * np.sqrt(T))
-    d2 = d1 - sigma * np.sqrt(T)
-    
-    # Greeks calculations for the put option:
-    delta = si.norm.cdf(d1) - 1  # Put Delta: equivalent to N(d1) - 1
-    gamma = si.norm.pdf(d1) / (S * sigma * np.sqrt(T))
-    theta = - (S * si.norm.pdf(d1) * sigma) / (2 * np.sqrt(T)) \
-            + r * K * np.exp(-r * T) * si.norm.cdf(-d2)
-    vega = S * si.norm.pdf(d1) * np.sqrt(T)
-    rho = -K * T * np.exp(-r * T) * si.norm.cdf(-d2)
-    
-    return {
-        "delta": delta,
-        "gamma": gamma,
-        "theta": theta,
-        "vega": vega,
-        "rho": rho
-    }
+    out = bs_engine(S, K, T, r, sigma, "P")
+    return {k: out[k][()] for k in ("delta", "gamma", "theta", "vega", "rho")}
 
 if __name__ == "__main__":
     # Test parameters
@@ -1,7 +1,7 @@
 import pandas as pd
 from pathlib import Path
-import yfinance as yf
-import time
+from marketData import YFinanceSource
+from priceStore import PriceStore
 
 # ------------------- Part 1: Scraping Tickers (making the list of tickers) -------------------
 wiki = "https://en.wikipedia.org/wiki/Nasdaq-100" # Link to wikipedia article that contains table with list of QQQ companies
@@ -18,37 +18,27 @@ except Exception as e:
 
 # ------------------- Part 2: Downloading Data -------------------
 START = "2015-04-21" # setting the start date of the market data I'm collecting to 10 years ago
-DATA_DIR = Path("data/qqq_dfs")  # New directory for DataFrames
-DATA_DIR.mkdir(parents=True, exist_ok=True)
-SLEEP = 1  # creating a one second pause between calls so I don't get throttled
+DATA_DIR = Path("data/qqq_dfs")  # Columnar price store (created on first use)
+WORKERS = 4   # parallel requests in flight
+RATE = 2.0    # requests per second shared by all workers, so I don't get throttled
 # ------------------------------
 
-all_dfs = {}  # Dictionary to store DataFrames
+store = PriceStore(DATA_DIR)  # one memory-mapped partition per ticker + last-date index
 
 if tickers: # Only proceed if the tickers list is not empty
-    for tkr in tickers:
-        try:
-            df = yf.download(
-                tickers=tkr,
-                start=START,
-                progress=False,
-                auto_adjust=True
-            )
-            if df.empty:
-                print(f"{tkr}: no data")
-                continue
-            all_dfs[tkr] = df  # Store the DataFrame in the dictionary
-            print(f"✔  {tkr} DataFrame stored in memory")
-            # If you also want to save to a different format (e.g., Pickle):
-            # out_file = DATA_DIR / f"{tkr}.pkl"
-            # df.to_pickle(out_file)
-            # print(f"✔  {tkr} saved as Pickle → {out_file}")
-        except Exception as e:
-            print(f"✖  {tkr}: {e}")
-        time.sleep(SLEEP)
+    # Only the days after each ticker's last stored row are fetched, in multi-ticker
+    # batches; failures are retried per ticker with backoff
+    failed = store.update(
+        tickers,
+        YFinanceSource(),
+        start=START,
+        workers=WORKERS,
+        rate=RATE,
+    )
+    for tkr, err in failed.items():
+        print(f"✖  {tkr}: {err}")
 
-    # The 'all_dfs' dictionary now contains all the downloaded DataFrames,
-    # with the ticker symbol as the key.
-    print("\nAll DataFrames downloaded and stored in the 'all_dfs' dictionary.")
+    # Read back with store.read(tkr) / store.panel(tickers, "Close") as needed
+    print(f"\nPrice store up to date in {DATA_DIR} ({len(store.tickers())} tickers).")
 else:
-    print("No tickers found. Skipping data download.")
\ No newline at end of file
+    print("No tickers found. Skipping data download.")
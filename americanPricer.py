@@ -0,0 +1,278 @@
+# americanPricer.py  ── vectorized American-exercise pricing: CRR lattice + Barone-Adesi-Whaley
+import numpy as np
+from scipy.special import ndtr
+
+from BlackScholes import _INV_SQRT_2PI, _is_call, bs_engine
+
+STEPS    = 500          # lattice time steps
+CHUNK    = 64           # contracts per lattice block (keeps the working rows in cache)
+H_SIGMA  = 0.01         # vol bump for lattice vega (smaller bumps pick up node-grid noise)
+H_RATE   = 1e-4         # rate bump for rho
+BAW_TOL  = 1e-8         # relative tolerance of the BAW critical-price iteration
+METHODS  = ("binomial", "baw")
+
+
+def _inputs(S, K, T, r, sigma, q, call_put):
+    arrays = np.broadcast_arrays(*(np.asarray(x, dtype=np.float64) for x in (S, K, T, r, sigma, q)))
+    return arrays, _is_call(call_put, arrays[0].shape)
+
+
+def european_price(S, K, T, r, sigma, call_put="C", q=0.0):
+    """Black-Scholes price with a continuous dividend yield `q` (bs_engine on the dividend-adjusted spot)."""
+    return bs_engine(np.asarray(S) * np.exp(-np.asarray(q) * np.asarray(T)), K, T, r, sigma, call_put)["price"]
+
+
+# ── binomial lattice ─────────────────────────────────────────────────────
+def _lattice(S, K, T, r, sigma, q, is_call, steps, american, greeks):
+    """
+    Cox-Ross-Rubinstein tree for a 1-D block of contracts.
+
+    All contracts step back together: row k of `V` holds contract k's
+    option values at the current time level, so each level is a handful of
+    whole-array operations on an (n, level + 1) slice.
+    """
+    n = S.shape[0]
+    dt = (T / steps)[:, None]
+    vol_dt = sigma[:, None] * np.sqrt(dt)
+    u = np.exp(vol_dt)
+    d = 1.0 / u
+    disc = np.exp(-r[:, None] * dt)
+    p = (np.exp((r - q)[:, None] * dt) - d) / (u - d)
+    pu, pd = disc * p, disc * (1.0 - p)
+    sign = np.where(is_call, 1.0, -1.0)[:, None]
+
+    # Node j of level i (j down moves) has spot S·u^(i−2j), which equals node j + 1 of
+    # level i + 2.  So two precomputed payoff rows, for even and odd levels, cover the whole tree.
+    j = np.arange(steps + 1)
+    payoff = [np.maximum(sign * (S[:, None] * np.exp(vol_dt * (steps - odd - 2.0 * j)) - K[:, None]), 0.0)
+              for odd in (0, 1)]
+    V = payoff[0].copy()
+    tmp = np.empty_like(V)
+    level1 = None
+    level2 = V[:, :3].copy() if greeks and steps == 2 else None     # level 2 is the terminal one
+    for i in range(steps - 1, -1, -1):
+        w = i + 1
+        Vi, t = V[:, :w], tmp[:, :w]
+        np.multiply(V[:, 1 : w + 1], pd, out=t)          # before Vi is overwritten
+        Vi *= pu
+        Vi += t
+        if american:
+            back = steps - i                             # levels above the terminal one
+            off = back // 2
+            np.maximum(Vi, payoff[back % 2][:, off : off + w], out=Vi)
+        if greeks and i == 2:
+            level2 = Vi.copy()
+        elif greeks and i == 1:
+            level1 = Vi.copy()
+
+    out = {"price": V[:, 0].copy()}
+    if greeks:
+        S_ = S[:, None]
+        s1 = S_ * np.hstack([u, d])
+        s2 = S_ * np.hstack([u * u, np.ones((n, 1)), d * d])
+        out["delta"] = (level1[:, 0] - level1[:, 1]) / (s1[:, 0] - s1[:, 1])
+        up = (level2[:, 0] - level2[:, 1]) / (s2[:, 0] - s2[:, 1])
+        down = (level2[:, 1] - level2[:, 2]) / (s2[:, 1] - s2[:, 2])
+        out["gamma"] = (up - down) / (0.5 * (s2[:, 0] - s2[:, 2]))
+        out["theta"] = (level2[:, 1] - out["price"]) / (2 * dt[:, 0])
+    return out
+
+
+def binomial_engine(S, K, T, r, sigma, call_put="C", q=0.0, steps=STEPS, american=True,
+                    greeks=True, chunk=CHUNK):
+    """
+    Price and Greeks for a batch of American (or European) options on a CRR lattice.
+
+    Every argument broadcasts as in bs_engine; `q` is a continuous dividend
+    yield.  Delta, gamma and theta come from the first two tree levels;
+    vega and rho are central differences (±H_SIGMA, ±H_RATE) priced in the
+    same pass as the base contracts.  Contracts are processed `chunk` at a
+    time, so memory is O(chunk × steps) whatever the batch size.
+
+    Returns:
+    dict: 'price' (and with greeks=True 'delta', 'gamma', 'theta', 'vega',
+          'rho') arrays, in bs_engine's units (theta per year, vega and rho
+          per 1.0 change in sigma / r)
+    """
+    if steps < (2 if greeks else 1):
+        raise ValueError(f"steps must be >= {2 if greeks else 1}"
+                         f"{' with greeks=True (they use the first two tree levels)' if greeks else ''}, got {steps}")
+    (S, K, T, r, sigma, q), is_call = _inputs(S, K, T, r, sigma, q, call_put)
+    shape = S.shape
+    cols = [x.ravel() for x in (S, K, T, r, sigma, q)] + [is_call.ravel()]
+    if greeks:                                   # base, sigma+, sigma-, r+, r-
+        bumps = [(0, 0), (H_SIGMA, 0), (-H_SIGMA, 0), (0, H_RATE), (0, -H_RATE)]
+        S_, K_, T_, r_, v_, q_, c_ = cols
+        cols = [np.tile(S_, 5), np.tile(K_, 5), np.tile(T_, 5),
+                np.concatenate([r_ + dr for _, dr in bumps]),
+                np.concatenate([v_ + dv for dv, _ in bumps]),
+                np.tile(q_, 5), np.tile(c_, 5)]
+
+    size = S.size
+    blocks = [_lattice(*(c[i : i + chunk] for c in cols), steps, american, greeks and i < size)
+              for i in range(0, cols[0].size, chunk)]
+    price = np.concatenate([b["price"] for b in blocks])
+    out = {"price": price[:size].reshape(shape)}
+    if greeks:
+        for k in ("delta", "gamma", "theta"):
+            out[k] = np.concatenate([b[k] for b in blocks if k in b])[:size].reshape(shape)
+        p = price.reshape(5, size)
+        out["vega"] = ((p[1] - p[2]) / (2 * H_SIGMA)).reshape(shape)
+        out["rho"] = ((p[3] - p[4]) / (2 * H_RATE)).reshape(shape)
+    return out
+
+
+# ── Barone-Adesi-Whaley quadratic approximation ──────────────────────────
+def _baw_price(S, K, T, r, sigma, q, is_call):
+    """BAW price for 1-D arrays; calls with q <= 0 and puts with r <= 0 are never exercised early."""
+    b = r - q
+    vol_t = sigma * np.sqrt(T)
+    euro = european_price(S, K, T, r, sigma, is_call, q)
+    carry = np.exp((b - r) * T)
+
+    N = 2 * b / (sigma * sigma)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        M_over_k = np.where(r != 0, 2 * r / (sigma * sigma) / -np.expm1(-r * T), 2 / (sigma * sigma * T))
+    root = np.sqrt((N - 1) ** 2 + 4 * M_over_k)
+    root_inf = np.sqrt((N - 1) ** 2 + 8 * r / (sigma * sigma))
+    sign = np.where(is_call, 1.0, -1.0)
+    qx = (-(N - 1) + sign * root) / 2                       # q2 for calls, q1 for puts
+    q_inf = (-(N - 1) + sign * root_inf) / 2
+
+    # Seed (Barone-Adesi & Whaley 1987 / Haug), then Newton on the critical price S*
+    with np.errstate(divide="ignore", invalid="ignore"):
+        s_inf = K / (1 - 1 / q_inf)
+        h = -sign * (b * T + sign * 2 * vol_t) * K / (sign * (s_inf - K))
+        s_star = np.where(is_call, K + (s_inf - K) * (1 - np.exp(h)), s_inf + (K - s_inf) * np.exp(h))
+    early = np.where(is_call, q > 0, r > 0) & np.isfinite(s_star) & (T > 0)
+    s_star = np.where(early, s_star, K)
+
+    def parts(x, m):
+        """European value, N(±d1) and n(d1) at spot x for the rows selected by mask m."""
+        d1 = (np.log(x / K[m]) + (b[m] + 0.5 * sigma[m] ** 2) * T[m]) / vol_t[m]
+        value = european_price(x, K[m], T[m], r[m], sigma[m], is_call[m], q[m])
+        return value, ndtr(sign[m] * d1), _INV_SQRT_2PI * np.exp(-0.5 * d1 * d1)
+
+    active = early.copy()
+    for _ in range(100):
+        if not active.any():
+            break
+        m = active.copy()
+        x, s, qa, c, k = s_star[m], sign[m], qx[m], carry[m], K[m]
+        v, cdf, pdf = parts(x, m)
+        rhs = v + s * (1 - c * cdf) * x / qa
+        slope = s * c * cdf * (1 - 1 / qa) + s * (1 - s * c * pdf / vol_t[m]) / qa
+        s_star[m] = np.where(s > 0, (k + rhs - slope * x) / (1 - slope), (k - rhs + slope * x) / (1 + slope))
+        active[np.flatnonzero(m)[np.abs(s * (x - k) - rhs) / k < BAW_TOL]] = False
+
+    all_rows = np.ones(S.shape, dtype=bool)
+    _, cdf_star, _ = parts(s_star, all_rows)
+    A = sign * (s_star / qx) * (1 - carry * cdf_star)
+    exercise = np.where(is_call, S >= s_star, S <= s_star)
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        approx = np.where(exercise, sign * (S - K), euro + A * (S / s_star) ** qx)
+    return np.where(early, approx, euro)
+
+
+def baw_engine(S, K, T, r, sigma, call_put="C", q=0.0, greeks=True):
+    """
+    Barone-Adesi-Whaley approximation for a batch of American options.
+
+    Closed form apart from a vectorized Newton solve for each contract's
+    critical exercise price, so thousands of contracts cost about as much
+    as a few bs_engine calls.  Greeks are central differences of the
+    approximation, evaluated together with the base price in one batch.
+
+    Returns:
+    dict: same keys and units as binomial_engine
+    """
+    (S, K, T, r, sigma, q), is_call = _inputs(S, K, T, r, sigma, q, call_put)
+    shape = S.shape
+    cols = [x.ravel() for x in (S, K, T, r, sigma, q)]
+    c = is_call.ravel()
+    if not greeks:
+        return {"price": _baw_price(*cols, c).reshape(shape)}
+
+    S_, K_, T_, r_, v_, q_ = cols
+    hS = 1e-3 * S_
+    hT = np.minimum(1 / 365, 0.5 * T_)
+    # base, S+, S-, sigma+, sigma-, r+, r-, T-
+    rows = [(0, 0, 0, 0), (1, 0, 0, 0), (-1, 0, 0, 0), (0, 1, 0, 0), (0, -1, 0, 0),
+            (0, 0, 1, 0), (0, 0, -1, 0), (0, 0, 0, -1)]
+    p = _baw_price(np.concatenate([S_ + a * hS for a, _, _, _ in rows]), np.tile(K_, 8),
+                   np.concatenate([T_ + t * hT for _, _, _, t in rows]),
+                   np.concatenate([r_ + g * H_RATE for _, _, g, _ in rows]),
+                   np.concatenate([v_ + w * H_SIGMA for _, w, _, _ in rows]),
+                   np.tile(q_, 8), np.tile(c, 8)).reshape(8, -1)
+    return {
+        "price": p[0].reshape(shape),
+        "delta": ((p[1] - p[2]) / (2 * hS)).reshape(shape),
+        "gamma": ((p[1] - 2 * p[0] + p[2]) / (hS * hS)).reshape(shape),
+        "theta": ((p[7] - p[0]) / hT).reshape(shape),
+        "vega": ((p[3] - p[4]) / (2 * H_SIGMA)).reshape(shape),
+        "rho": ((p[5] - p[6]) / (2 * H_RATE)).reshape(shape),
+    }
+
+
+def american_engine(S, K, T, r, sigma, call_put="C", q=0.0, method="binomial", **kw):
+    """American price and Greeks: method="binomial" (lattice, `steps`) or "baw" (fast approximation)."""
+    if method == "binomial":
+        return binomial_engine(S, K, T, r, sigma, call_put, q, **kw)
+    if method == "baw":
+        return baw_engine(S, K, T, r, sigma, call_put, q, **kw)
+    raise ValueError(f"Unknown method {method!r}; choose one of {', '.join(METHODS)}")
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    ap = argparse.ArgumentParser(description="American pricer: lattice convergence and chain timing")
+    ap.add_argument("--contracts", type=int, default=3000, help="size of the synthetic chain")
+    ap.add_argument("--steps", type=int, default=STEPS)
+    args = ap.parse_args()
+
+    rng = np.random.default_rng(0)
+    n = args.contracts
+    S, r = 100.0, 0.05
+    K = rng.uniform(60, 140, n)
+    T = rng.choice([7, 14, 30, 60, 91, 182, 365, 730], n) / 365
+    sigma = rng.uniform(0.1, 0.8, n)
+    cp = np.where(rng.random(n) < 0.5, "C", "P")
+
+    # ── convergence: European lattice vs. the closed form ────────────────
+    idx = slice(0, 500)
+    exact = bs_engine(S, K[idx], T[idx], r, sigma[idx], cp[idx])["price"]
+    print(f"European lattice vs. Black-Scholes ({exact.size} contracts)")
+    print(f"{'steps':>6} {'max |err|':>10} {'mean |err|':>11} {'ms':>8}")
+    for steps in (25, 50, 100, 200, 500, 1000):
+        t0 = time.perf_counter()
+        lat = binomial_engine(S, K[idx], T[idx], r, sigma[idx], cp[idx], steps=steps,
+                              american=False, greeks=False)["price"]
+        ms = 1000 * (time.perf_counter() - t0)
+        err = np.abs(lat - exact)
+        print(f"{steps:6d} {err.max():10.5f} {err.mean():11.6f} {ms:8.1f}")
+
+    # ── American: BAW and the lattice vs. a 2000-step reference ──────────
+    q = 0.02
+    ref = binomial_engine(S, K[idx], T[idx], r, sigma[idx], cp[idx], q, steps=2000, greeks=False)["price"]
+    euro = european_price(S, K[idx], T[idx], r, sigma[idx], cp[idx], q)
+    print(f"\nAmerican (q = {q}) vs. 2000-step lattice; early-exercise premium up to {np.max(ref - euro):.4f}")
+    for label, px in (("lattice 500", binomial_engine(S, K[idx], T[idx], r, sigma[idx], cp[idx], q,
+                                                        greeks=False)["price"]),
+                      ("BAW", baw_engine(S, K[idx], T[idx], r, sigma[idx], cp[idx], q, greeks=False)["price"]),
+                      ("European", euro)):
+        err = np.abs(px - ref)
+        print(f"  {label:<12} max |err| {err.max():.5f}  mean |err| {err.mean():.6f}")
+
+    # ── chain timing ─────────────────────────────────────────────────────
+    print(f"\n{n} contracts")
+    for label, fn in (
+        (f"lattice {args.steps}, price", lambda: binomial_engine(S, K, T, r, sigma, cp, steps=args.steps, greeks=False)),
+        (f"lattice {args.steps}, Greeks", lambda: binomial_engine(S, K, T, r, sigma, cp, steps=args.steps)),
+        ("BAW, Greeks", lambda: baw_engine(S, K, T, r, sigma, cp)),
+        ("Black-Scholes", lambda: bs_engine(S, K, T, r, sigma, cp)),
+    ):
+        t0 = time.perf_counter()
+        fn()
+        print(f"  {label:<22} {1000 * (time.perf_counter() - t0):9.1f} ms")
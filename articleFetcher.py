@@ -0,0 +1,181 @@
+# articleFetcher.py  ── concurrent article download + parse with a local cache
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import tracing
+
+CACHE_DIR  = "data/article_cache"
+USER_AGENT = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+              "(KHTML, like Gecko) Chrome/124.0 Safari/537.36")
+
+
+def parse_html(url, html):
+    """newspaper3k parse of already-downloaded HTML → (title, text). Runs in a worker process."""
+    from newspaper import Article
+
+    art = Article(url)
+    art.download(input_html=html)
+    art.parse()
+    return art.title, art.text
+
+
+class ArticleFetcher:
+    """
+    Fetch and parse news articles concurrently.
+
+    Downloads share one pooled `requests.Session` (keep-alive per host) and
+    run on a thread pool, with at most `per_host` requests in flight to any
+    one host and a (connect, read) `timeout`.  HTML is parsed by
+    newspaper3k on a process pool (`parse_workers=0` parses inline).
+
+    Parsed title + text is cached on disk together with the response's
+    ETag / Last-Modified.  Within `fresh_for` seconds the cache is served
+    without touching the network; after that the page is re-requested
+    conditionally and a 304 reuses the cached text.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, workers=16, per_host=4, parse_workers=None,
+                 timeout=(5, 20), fresh_for=3600):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.workers = workers
+        self.per_host = per_host
+        self.parse_workers = os.cpu_count() if parse_workers is None else parse_workers
+        self.timeout = timeout
+        self.fresh_for = fresh_for
+        self.errors = {}
+
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = USER_AGENT
+        adapter = HTTPAdapter(pool_connections=64, pool_maxsize=max(workers, per_host))
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    # ── public API ───────────────────────────────────────────────────────
+    def fetch(self, url):
+        """Title + "\\n" + text for one URL (raises on failure)."""
+        with tracing.span("article.download"):
+            entry, html = self._download(url)
+        if html is not None:
+            with tracing.span("article.parse"):
+                entry = self._store(url, entry, *parse_html(url, html))
+        return entry["title"] + "\n" + entry["text"]
+
+    def fetch_many(self, urls):
+        """
+        Yield (url, text) for each distinct URL as soon as it is ready.
+
+        Order follows completion, not input.  URLs that fail are left out
+        of the stream and recorded in `self.errors`.
+        """
+        urls = list(dict.fromkeys(u.strip() for u in urls if u and u.strip()))
+        parse_pool = (ProcessPoolExecutor(self.parse_workers)
+                      if self.parse_workers else None)
+        io_pool = ThreadPoolExecutor(self.workers)
+        try:
+            pending = {io_pool.submit(self._download, u): ("download", u, None) for u in urls}
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    stage, url, entry = pending.pop(fut)
+                    try:
+                        result = fut.result()
+                    except Exception as e:
+                        self.errors[url] = str(e)
+                        continue
+                    if stage == "parse":
+                        entry = self._store(url, entry, *result)
+                    else:
+                        entry, html = result
+                        if html is not None and parse_pool is not None:
+                            pending[parse_pool.submit(parse_html, url, html)] = ("parse", url, entry)
+                            continue
+                        if html is not None:
+                            entry = self._store(url, entry, *parse_html(url, html))
+                    yield url, entry["title"] + "\n" + entry["text"]
+        finally:
+            io_pool.shutdown(wait=False, cancel_futures=True)
+            if parse_pool is not None:
+                parse_pool.shutdown(cancel_futures=True)
+
+    def close(self):
+        self.session.close()
+
+    # ── internals ────────────────────────────────────────────────────────
+    def _host_slot(self, url):
+        host = urlsplit(url).netloc
+        with self._lock:
+            if host not in self._hosts:
+                self._hosts[host] = threading.Semaphore(self.per_host)
+            return self._hosts[host]
+
+    def _download(self, url):
+        """Return (cache entry, html) — html is None when the cached parse can be reused."""
+        cached = self._load(url)
+        if cached and time.time() - cached["fetched"] < self.fresh_for:
+            tracing.count("article.cache_hits")
+            return cached, None
+
+        headers = {}
+        if cached and cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached and cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+        with self._host_slot(url):
+            resp = self.session.get(url, headers=headers, timeout=self.timeout)
+        if resp.status_code == 304 and cached:
+            tracing.count("article.not_modified")
+            cached["fetched"] = time.time()
+            self._save(url, cached)
+            return cached, None
+        resp.raise_for_status()
+        if resp.encoding in (None, "ISO-8859-1"):   # requests' default when no charset is sent
+            resp.encoding = resp.apparent_encoding
+        entry = {"url": url,
+                 "etag": resp.headers.get("ETag"),
+                 "last_modified": resp.headers.get("Last-Modified")}
+        return entry, resp.text
+
+    def _store(self, url, entry, title, text):
+        entry = dict(entry, title=title, text=text, fetched=time.time())
+        self._save(url, entry)
+        return entry
+
+    def _path(self, url):
+        return self.cache_dir / (hashlib.sha256(url.encode()).hexdigest() + ".json")
+
+    def _load(self, url):
+        try:
+            return json.loads(self._path(url).read_text())
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _save(self, url, entry):
+        path = self._path(url)
+        tmp = path.with_name(f"{path.stem}.{threading.get_ident()}.tmp")
+        tmp.write_text(json.dumps(entry))
+        os.replace(tmp, path)
+
+
+if __name__ == "__main__":
+    import sys
+
+    fetcher = ArticleFetcher()
+    t0 = time.perf_counter()
+    for url, text in fetcher.fetch_many(sys.argv[1:]):
+        print(f"{time.perf_counter() - t0:6.2f}s  {len(text):6d} chars  {url}")
+    for url, err in fetcher.errors.items():
+        print(f"✖  {url}: {err}")
@@ -0,0 +1,199 @@
+# backtest.py  ── vectorized historical check of the iv_adjust sentiment rule
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from BlackScholes import bs_engine
+from sentimentMapping import iv_adjust_array
+
+TRADING_DAYS = 252
+WINDOW   = 21        # trailing days of realized vol used as the baseline IV
+HORIZON  = 21        # trading days the forecast / straddle is held
+MAX_AGE  = 5         # trading days a sentiment reading stays in force
+CUTOFF   = 16        # hour (exchange time) after which news counts for the next session
+EXCHANGE_TZ = "America/New_York"
+
+
+# ── inputs ───────────────────────────────────────────────────────────────
+def load_sentiment(path):
+    """Sentiment events (CSV/Parquet) with columns timestamp, ticker, sent_id, confidence."""
+    events = pd.read_parquet(path) if str(path).endswith(".parquet") else pd.read_csv(path)
+    events["timestamp"] = pd.to_datetime(events["timestamp"])
+    return events
+
+
+def align_sentiment(events, dates, tickers, max_age=MAX_AGE, cutoff=CUTOFF):
+    """
+    Date × ticker matrices of sent_id and confidence in force at each close.
+
+    Naive timestamps are taken as exchange time, aware ones are converted
+    to it.  News after `cutoff` o'clock counts for the next session; several
+    articles on one session keep the latest.  A reading is carried forward
+    for `max_age` sessions, after which the cell is NaN (no adjustment).
+    """
+    ts = events["timestamp"]
+    if ts.dt.tz is not None:
+        ts = ts.dt.tz_convert(EXCHANGE_TZ).dt.tz_localize(None)
+    day = ts.dt.normalize() + pd.to_timedelta((ts.dt.hour >= cutoff).astype(int), unit="D")
+    row = np.searchsorted(dates.values, day.values.astype(dates.dtype))
+    col = pd.Index(tickers).get_indexer(events["ticker"])
+    keep = (row < len(dates)) & (col >= 0)
+
+    cells = pd.DataFrame({"row": row[keep], "col": col[keep], "ts": ts.values[keep],
+                          "sent": events["sent_id"].values[keep],
+                          "conf": events["confidence"].values[keep]})
+    cells = cells.sort_values("ts").drop_duplicates(["row", "col"], keep="last")
+
+    out = []
+    for field in ("sent", "conf"):
+        m = np.full((len(dates), len(tickers)), np.nan)
+        m[cells["row"].to_numpy(), cells["col"].to_numpy()] = cells[field].to_numpy()
+        out.append(pd.DataFrame(m).ffill(limit=max_age).to_numpy())
+    return out[0], out[1]
+
+
+def prepare(closes, events, window=WINDOW, horizon=HORIZON, max_age=MAX_AGE):
+    """
+    Everything the rule is evaluated on, as aligned date × ticker arrays.
+
+    The baseline IV is trailing `window`-day realized vol (no historical
+    option quotes are stored); the target is the realized vol over the
+    next `horizon` sessions, and `move` is |S(t+h) − S(t)| – the payoff of
+    an ATM straddle bought at t.
+    """
+    closes = closes.sort_index()
+    logret = np.log(closes).diff()
+    base_iv = logret.rolling(window, min_periods=window).std() * np.sqrt(TRADING_DAYS)
+    fwd_rv = base_iv.shift(-horizon) if window == horizon else (
+        logret.rolling(horizon, min_periods=horizon).std().shift(-horizon) * np.sqrt(TRADING_DAYS))
+    sent, conf = align_sentiment(events, closes.index, closes.columns, max_age)
+    return {
+        "dates": closes.index, "tickers": closes.columns, "horizon": horizon,
+        "spot": closes.to_numpy(), "move": (closes.shift(-horizon) - closes).abs().to_numpy(),
+        "base_iv": base_iv.to_numpy(), "fwd_rv": fwd_rv.to_numpy(), "sent": sent, "conf": conf,
+    }
+
+
+# ── evaluation ───────────────────────────────────────────────────────────
+def _straddle(S, T, r, sigma):
+    call = bs_engine(S, S, T, r, sigma, "C")["price"]
+    return 2 * call - S + S * np.exp(-r * T)               # + put via parity, K = S
+
+
+def evaluate(prep, k_neg=0.20, k_pos=0.10, r=0.05):
+    """
+    Baseline vs sentiment-adjusted forecasts for every (date, ticker) at once.
+
+    Vol errors are IV − realized forward vol; straddle errors are model
+    price − discounted realized payoff, as a fraction of spot.  Cells
+    without a full trailing and forward window are NaN; `signal` marks
+    cells where the rule actually changed the IV.
+    """
+    T = prep["horizon"] / TRADING_DAYS
+    iv_adj = iv_adjust_array(prep["base_iv"], prep["sent"], prep["conf"], k_neg, k_pos)
+    S = prep["spot"]
+    payoff = prep["move"] * np.exp(-r * T)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return {
+            "iv_adj": iv_adj,
+            "vol_err_base": prep["base_iv"] - prep["fwd_rv"],
+            "vol_err_adj": iv_adj - prep["fwd_rv"],
+            "px_err_base": (_straddle(S, T, r, prep["base_iv"]) - payoff) / S,
+            "px_err_adj": (_straddle(S, T, r, iv_adj) - payoff) / S,
+            "signal": (prep["sent"] == 0) | (prep["sent"] == 2),
+        }
+
+
+def summarize(prep, res, signal_only=True):
+    """Per-ticker and pooled MAE / RMSE / bias for baseline vs adjusted (nan-aware, no loops)."""
+    valid = ~np.isnan(res["vol_err_base"]) & ~np.isnan(res["px_err_base"])
+    if signal_only:
+        valid &= res["signal"]
+    n = valid.sum(axis=0)
+
+    def stats(err, axis):
+        e = np.where(valid, err, np.nan)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)        # all-NaN columns → NaN
+            return (np.nanmean(np.abs(e), axis=axis), np.sqrt(np.nanmean(e * e, axis=axis)),
+                    np.nanmean(e, axis=axis))
+
+    table, pooled = {"n": n}, {"n": int(n.sum())}
+    for name in ("vol_err_base", "vol_err_adj", "px_err_base", "px_err_adj"):
+        short = name.replace("_err", "")
+        for metric, per_t, agg in zip(("mae", "rmse", "bias"), stats(res[name], 0), stats(res[name], None)):
+            table[f"{short}_{metric}"] = per_t
+            pooled[f"{short}_{metric}"] = float(agg)
+    adj_wins = valid & (np.abs(res["vol_err_adj"]) < np.abs(res["vol_err_base"]))
+    table["vol_win_rate"] = adj_wins.sum(axis=0) / np.maximum(n, 1)
+    pooled["vol_win_rate"] = float(adj_wins.sum() / max(n.sum(), 1))
+    return pd.DataFrame(table, index=prep["tickers"]), pooled
+
+
+def report(table, pooled, signal_only=True):
+    cols = ["n", "vol_base_mae", "vol_adj_mae", "vol_win_rate", "px_base_mae", "px_adj_mae"]
+    with pd.option_context("display.width", 120, "display.max_rows", 20, "display.float_format", "{:.4f}".format):
+        print(table[cols].sort_values("n", ascending=False))
+    scope = "ticker-days with a sentiment signal" if signal_only else "ticker-days"
+    print(f"\npooled over {pooled['n']} {scope}:")
+    for kind, label in (("vol", "vol forecast"), ("px", "ATM straddle / spot")):
+        b, a = pooled[f"{kind}_base_mae"], pooled[f"{kind}_adj_mae"]
+        print(f"  {label:<20} MAE base {b:.4f}  adj {a:.4f}  ({100 * (b - a) / b:+.1f}% better)   "
+              f"RMSE base {pooled[f'{kind}_base_rmse']:.4f}  adj {pooled[f'{kind}_adj_rmse']:.4f}   "
+              f"bias base {pooled[f'{kind}_base_bias']:+.4f}  adj {pooled[f'{kind}_adj_bias']:+.4f}")
+    print(f"  adjusted vol closer to realized on {100 * pooled['vol_win_rate']:.1f}% of them")
+
+
+def synthetic_sentiment(tickers, start, end, per_day=0.2, seed=0):
+    """Random (uninformative) sentiment events – about `per_day` articles per ticker per day."""
+    rng = np.random.default_rng(seed)
+    span = (pd.Timestamp(end) - pd.Timestamp(start)).total_seconds()
+    n = int(per_day * len(tickers) * span / 86400)
+    return pd.DataFrame({
+        "timestamp": pd.Timestamp(start) + pd.to_timedelta(rng.uniform(0, span, n), unit="s"),
+        "ticker": rng.choice(list(tickers), n),
+        "sent_id": rng.choice([0, 1, 2], n),
+        "confidence": rng.uniform(0.4, 1.0, n),
+    })
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    from priceStore import PriceStore
+
+    ap = argparse.ArgumentParser(description="Backtest iv_adjust against realized volatility")
+    ap.add_argument("--store", default="data/qqq_dfs", help="PriceStore root (DataIntegration.py)")
+    ap.add_argument("--sentiment", help="CSV/Parquet: timestamp, ticker, sent_id, confidence")
+    ap.add_argument("--synthetic", action="store_true",
+                    help="100 synthetic tickers × 10 years with random sentiment (offline timing run)")
+    ap.add_argument("--k-neg", type=float, default=0.20)
+    ap.add_argument("--k-pos", type=float, default=0.10)
+    ap.add_argument("--window", type=int, default=WINDOW)
+    ap.add_argument("--horizon", type=int, default=HORIZON)
+    ap.add_argument("--all-days", action="store_true", help="score every day, not just signal days")
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    if args.synthetic:
+        from marketData import synthetic_ohlcv
+        names = [f"T{i:03d}" for i in range(100)]
+        closes = pd.DataFrame({t: synthetic_ohlcv(t, "2015-04-21", "2025-04-21")["Close"] for t in names})
+        events = synthetic_sentiment(names, "2015-04-21", "2025-04-21")
+    else:
+        if not args.sentiment:
+            ap.error("--sentiment is required unless --synthetic is given")
+        closes = PriceStore(args.store).panel(column="Close")
+        events = load_sentiment(args.sentiment)
+    t1 = time.perf_counter()
+
+    prep = prepare(closes, events, args.window, args.horizon)
+    res = evaluate(prep, args.k_neg, args.k_pos)
+    table, pooled = summarize(prep, res, signal_only=not args.all_days)
+    t2 = time.perf_counter()
+
+    report(table, pooled, signal_only=not args.all_days)
+    print(f"\n{closes.shape[1]} tickers × {closes.shape[0]} days, {len(events)} sentiment events: "
+          f"load {t1 - t0:.2f}s, backtest {t2 - t1:.2f}s")
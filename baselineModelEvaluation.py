@@ -2,34 +2,19 @@ import torch, evaluate
 from transformers import (
     AutoConfig,
     AutoModelForSequenceClassification,
+    AutoTokenizer,
     Trainer,
     TrainingArguments,
 )
 from datasets import load_from_disk
+from dynamicPadding import add_lengths, by_length, make_collator
 
 # ─── paths & constants ────────────────────────────────────────────────
 MODEL = "ProsusAI/finbert"        # choosing the finBERT model
 DATA  = "data/finbert_tweets"     # folder containing the cleaned data
 BATCH = 32                        # batch size = number of sequences for each input into finBERT
 
-# ─── configure model for SINGLE-LABEL classification ─────────────────
-config = AutoConfig.from_pretrained(
-    MODEL,
-    num_labels=3,                               # 0 neg, 1 neu, 2 pos
-    problem_type="single_label_classification", # ← forces CrossEntropy
-)
-
-device = "cuda" if torch.cuda.is_available() else "cpu"
-
-model = AutoModelForSequenceClassification.from_pretrained(
-    MODEL,
-    config=config,
-).to(device)
-
-# ─── load tokenised dataset ───────────────────────────────────────────
-dataset = load_from_disk(DATA)
-
-# ─── metrics helpers ─────────────────────────────────────────────────
+# ─── metrics helpers (shared with the backend parity harness) ────────
 metric_acc = evaluate.load("accuracy")
 metric_f1  = evaluate.load("f1")
 
@@ -42,16 +27,41 @@ def compute_metrics(eval_pred):
         "f1_macro": metric_f1.compute(predictions=preds, references=labels, average="macro")["f1"],
     }
 
-# ─── run evaluation ──────────────────────────────────────────────────
-trainer = Trainer(
-    model=model,
-    eval_dataset=dataset["validation"],
-    compute_metrics=compute_metrics,
-    args=TrainingArguments(
-        output_dir="runs/baseline",
-        per_device_eval_batch_size=BATCH,
-        report_to="none"          # no wandb, tensorboard only
-    ),
-)
 
-print(trainer.evaluate())
+def main():
+    # ─── configure model for SINGLE-LABEL classification ─────────────────
+    config = AutoConfig.from_pretrained(
+        MODEL,
+        num_labels=3,                               # 0 neg, 1 neu, 2 pos
+        problem_type="single_label_classification", # ← forces CrossEntropy
+    )
+
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+
+    model = AutoModelForSequenceClassification.from_pretrained(
+        MODEL,
+        config=config,
+    ).to(device)
+
+    # ─── load tokenised dataset (unpadded – padded per batch) ─────────────
+    dataset = add_lengths(load_from_disk(DATA))
+    collator = make_collator(AutoTokenizer.from_pretrained(MODEL))   # pad to longest in batch
+
+    # ─── run evaluation ──────────────────────────────────────────────────
+    trainer = Trainer(
+        model=model,
+        eval_dataset=by_length(dataset["validation"]),   # similar lengths share a batch
+        data_collator=collator,
+        compute_metrics=compute_metrics,
+        args=TrainingArguments(
+            output_dir="runs/baseline",
+            per_device_eval_batch_size=BATCH,
+            report_to="none"          # no wandb, tensorboard only
+        ),
+    )
+
+    print(trainer.evaluate())
+
+
+if __name__ == "__main__":
+    main()
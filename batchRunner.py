@@ -0,0 +1,356 @@
+# batchRunner.py  ── streaming batch calibration over many (ticker, article) jobs
+import csv
+import json
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import numpy as np
+
+import tracing
+from BlackScholes import as_utc, chain_implied_vol
+
+STOP = object()       # end-of-stream marker passed between stages
+
+
+# ── job I/O ──────────────────────────────────────────────────────────────
+def read_jobs(path, on_error=None):
+    """
+    Yield job dicts from a .jsonl or .csv file, one at a time.
+
+    A job needs `ticker` and `url` or `text`; `expiry`, `strike`, `iv`,
+    `r` (default 0.05) and `call_put` (default C) are optional – missing
+    ones are filled from the live chain (nearest expiry ≥ 1 day, ATM
+    strike, IV solved from the quote).
+
+    A JSONL line that does not parse to an object is passed to
+    `on_error(line_no, line, error)` and skipped (raised if no callback).
+    """
+    path = Path(path)
+    with path.open(newline="") as f:
+        rows = csv.DictReader(f) if path.suffix == ".csv" else _json_rows(f, on_error)
+        for i, row in enumerate(rows):
+            job = {k: v for k, v in row.items() if v not in (None, "")}
+            job.setdefault("id", i)
+            yield job
+
+
+def _json_rows(f, on_error):
+    for line_no, line in enumerate(f, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+            if not isinstance(row, dict):
+                raise ValueError(f"expected a JSON object, got {type(row).__name__}")
+        except ValueError as e:                     # JSONDecodeError is a ValueError
+            if on_error is None:
+                raise
+            on_error(line_no, line.rstrip("\n"), f"{type(e).__name__}: {e}")
+            continue
+        yield row
+
+
+class JsonlWriter:
+    """Thread-safe, line-buffered JSONL sink."""
+
+    def __init__(self, path):
+        self.f = open(path, "a", buffering=1)
+        self.lock = threading.Lock()
+        self.count = 0
+
+    def write(self, obj):
+        with self.lock:
+            self.f.write(json.dumps(obj, default=float) + "\n")
+            self.count += 1
+
+    def close(self):
+        self.f.close()
+
+
+# ── stage functions ──────────────────────────────────────────────────────
+class SnapshotChains:
+    """Spot + contract lookup through a ChainSnapshots cache (live, record or replay)."""
+
+    def __init__(self, snapshots=None):
+        from chainSnapshots import ChainSnapshots
+        self.snapshots = snapshots or ChainSnapshots()
+
+    def contract(self, job):
+        from chainSnapshots import nearest_expiry
+
+        ticker = job["ticker"]
+        S = self.snapshots.spot(ticker)
+        exp = job.get("expiry") or nearest_expiry(self.snapshots, ticker)
+        chain = self.snapshots.chain(ticker, exp)
+        side = chain.calls if job.get("call_put", "C").upper() == "C" else chain.puts
+        return S, exp, side
+
+
+class StubChains:
+    """Synthetic spot + chain (flat 25 % vol, strikes ±20 % around spot) for offline runs."""
+
+    def __init__(self, latency=0.01):
+        self.latency = latency
+
+    def contract(self, job):
+        import pandas as pd
+
+        from BlackScholes import bs_engine, year_fractions
+
+        time.sleep(self.latency)
+        S = 100.0 + sum(map(ord, job["ticker"])) % 400
+        exp = job.get("expiry") or (datetime.now(timezone.utc) + timedelta(days=30)).date().isoformat()
+        strikes = np.round(np.linspace(0.8 * S, 1.2 * S, 41))
+        price = bs_engine(S, strikes, year_fractions(exp), 0.05, 0.25, job.get("call_put", "C"))["price"]
+        side = pd.DataFrame({"strike": strikes, "bid": price * 0.99, "ask": price * 1.01,
+                             "lastPrice": price, "impliedVolatility": 0.25})
+        return S, exp, side
+
+
+def resolve_contract(job, chains):
+    """Fill spot, expiry, strike and base IV for a job from its option chain."""
+    S, exp, side = chains.contract(job)
+    r = float(job.get("r", 0.05))
+    if "strike" in job:
+        row = side.loc[(side["strike"] - float(job["strike"])).abs().idxmin()]
+    else:
+        row = side.iloc[(side["strike"] - S).abs().argmin()]
+    iv = job.get("iv")
+    if iv is None:
+        solved = chain_implied_vol(row.to_frame().T, S, r, expiry=exp,
+                                   call_put=job.get("call_put", "C").upper())
+        iv = float(solved["iv"][0]) if solved["converged"][0] else float(row.get("impliedVolatility", np.nan))
+        if not iv > 0:
+            raise ValueError(f"no usable IV for {job['ticker']} {exp} strike {row.strike}")
+    return dict(job, spot=S, expiry=exp, strike=float(row.strike), iv=float(iv), r=r)
+
+
+def finish(job):
+    """Numeric tail (runs in the process pool): iv_adjust → Greeks → analysis text."""
+    import finalAnalysis
+    from sentimentMapping import black_scholes_greeks, iv_adjust
+
+    cp = job.get("call_put", "C").upper()
+    T = (as_utc(job["expiry"]) - datetime.now(timezone.utc)).total_seconds() / (365 * 24 * 3600)
+    iv_new = iv_adjust(job["iv"], job["sent_id"], job["confidence"])
+    greeks = {k: float(v) for k, v in
+              black_scholes_greeks(job["spot"], job["strike"], T, job["r"], iv_new, cp).items()}
+    job = {k: v for k, v in job.items() if k != "text"}
+    return dict(job, iv_adjusted=iv_new, greeks=greeks,
+                analysis=finalAnalysis.generate_analysis(iv_new, greeks, cp))
+
+
+# ── pipeline plumbing ────────────────────────────────────────────────────
+class Stage:
+    """
+    `workers` threads pulling jobs from `inq`, applying `fn`, pushing to `outq`.
+
+    Each job gets `retries` extra attempts with exponential backoff; after
+    that it is written to the dead-letter sink and the stream carries on.
+    With `batch > 1` a worker drains up to that many queued jobs and calls
+    `fn` once on the list (used for model inference).  When the last
+    worker sees STOP it forwards STOP to the next stage.
+    """
+
+    def __init__(self, name, fn, inq, outq, dead, workers=1, batch=1, retries=2, backoff=0.5):
+        self.name, self.fn, self.inq, self.outq, self.dead = name, fn, inq, outq, dead
+        self.workers, self.batch, self.retries, self.backoff = workers, batch, retries, backoff
+        self.done = self.failed = 0
+        self.busy = 0.0
+        self._alive = workers
+        self._lock = threading.Lock()
+        self.threads = [threading.Thread(target=self._loop, name=f"{name}-{i}", daemon=True)
+                        for i in range(workers)]
+
+    def start(self):
+        for t in self.threads:
+            t.start()
+
+    def _take(self):
+        first = self.inq.get()
+        if first is STOP or self.batch == 1:
+            return first, []
+        items = [first]
+        while len(items) < self.batch:
+            try:
+                nxt = self.inq.get_nowait()
+            except queue.Empty:
+                break
+            if nxt is STOP:
+                self.inq.put(STOP)              # leave it for this worker's next take
+                break
+            items.append(nxt)
+        return None, items
+
+    def _loop(self):
+        while True:
+            single, items = self._take()
+            if single is STOP:
+                self.inq.put(STOP)                  # wake the next sibling
+                with self._lock:
+                    self._alive -= 1
+                    if self._alive == 0:
+                        self.outq.put(STOP)
+                return
+            for r in self._attempt(items or [single]):
+                self.outq.put(r)
+
+    def _attempt(self, jobs):
+        for attempt in range(self.retries + 1):
+            t0 = time.perf_counter()
+            try:
+                with tracing.span(f"stage.{self.name}", jobs=len(jobs), attempt=attempt):
+                    out = self.fn(jobs) if self.batch > 1 else [self.fn(jobs[0])]
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+                if attempt < self.retries:
+                    tracing.count(f"batch.{self.name}.retries")
+                    time.sleep(self.backoff * 2 ** attempt)
+            else:
+                with self._lock:
+                    self.done += len(jobs)
+                return out
+            finally:
+                with self._lock:
+                    self.busy += time.perf_counter() - t0
+
+        if len(jobs) > 1:                           # isolate the bad item(s) in a failed batch
+            return [r for j in jobs for r in self._attempt([j])]
+        with self._lock:
+            self.failed += 1
+        tracing.count(f"batch.{self.name}.dead_lettered")
+        self.dead.write({**{k: v for k, v in jobs[0].items() if k != "text"},
+                         "stage": self.name, "error": error})
+        return []
+
+
+def run(jobs_path, out_path, dead_path, chains=None, scorer=None, cache=None, fetch_workers=8,
+        market_workers=8, compute_workers=2, score_batch=16, queue_size=64, retries=2,
+        backoff=0.5, progress_every=5.0):
+    """
+    Run every job through fetch → score → chain → compute, streaming results to `out_path`.
+
+    At most `queue_size` jobs wait between any two stages, so memory stays
+    bounded however long the job file is.  `cache` (a SentimentCache) lets
+    repeated articles skip the model.
+    """
+    from articleFetcher import ArticleFetcher
+
+    chains = chains or SnapshotChains()
+    if scorer is None:
+        from sentimentMapping import get_sentiment_scores as scorer
+    fetcher = ArticleFetcher(parse_workers=0)
+    out, dead = JsonlWriter(out_path), JsonlWriter(dead_path)
+    qs = [queue.Queue(queue_size) for _ in range(5)]
+    pool = ProcessPoolExecutor(compute_workers)
+
+    def fetch(job):
+        return job if "text" in job else dict(job, text=fetcher.fetch(job["url"]))
+
+    def score(batch):
+        found = [cache.get(j["text"]) if cache else None for j in batch]
+        todo = [j["text"] for j, f in zip(batch, found) if f is None]
+        fresh = iter(scorer(todo) if todo else [])
+        out = []
+        for j, f in zip(batch, found):
+            if f is None:
+                f = next(fresh)
+                if cache:
+                    cache.put(j["text"], *f)
+            out.append(dict(j, sent_id=f[0], confidence=f[1], scores=f[2]))
+        return out
+
+    stages = [
+        Stage("fetch", fetch, qs[0], qs[1], dead, fetch_workers, retries=retries, backoff=backoff),
+        Stage("score", score, qs[1], qs[2], dead, 1, batch=score_batch, retries=retries, backoff=backoff),
+        Stage("chain", lambda j: resolve_contract(j, chains), qs[2], qs[3], dead, market_workers,
+              retries=retries, backoff=backoff),
+        Stage("compute", lambda j: pool.submit(finish, j).result(), qs[3], qs[4], dead,
+              compute_workers * 2, retries=retries, backoff=backoff),
+    ]
+    for s in stages:
+        s.start()
+
+    def bad_line(line_no, line, error):
+        tracing.count("batch.read.dead_lettered")
+        dead.write({"line": line_no, "raw": line, "stage": "read", "error": error})
+
+    def feed():
+        try:
+            for job in read_jobs(jobs_path, on_error=bad_line):
+                qs[0].put(job)                      # blocks while the pipeline is full
+        except Exception as e:                      # unreadable file: record it, still drain
+            dead.write({"stage": "read", "error": f"{type(e).__name__}: {e}"})
+        finally:
+            qs[0].put(STOP)
+
+    threading.Thread(target=feed, name="reader", daemon=True).start()
+
+    t0 = last = time.perf_counter()
+    try:
+        while (item := qs[4].get()) is not STOP:
+            out.write(item)
+            now = time.perf_counter()
+            if now - last >= progress_every:
+                last = now
+                print(f"{now - t0:7.1f}s  {out.count} done, {dead.count} dead-lettered, "
+                      f"queues {[q.qsize() for q in qs[:4]]}")
+    finally:
+        pool.shutdown()
+        fetcher.close()
+        out.close()
+        dead.close()
+
+    wall = time.perf_counter() - t0
+    print(f"\n{out.count} results → {out_path}, {dead.count} dead-lettered → {dead_path} "
+          f"in {wall:.1f}s ({out.count / max(wall, 1e-9):.1f} jobs/s)")
+    if isinstance(chains, SnapshotChains):
+        print(f"  chain snapshots: {chains.snapshots.stats()}")
+    for s in stages:
+        print(f"  {s.name:<8} {s.workers:3d} workers  {s.done:6d} ok  {s.failed:4d} failed  "
+              f"busy {s.busy:7.1f}s")
+    return out.count, dead.count
+
+
+if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Batch sentiment-adjusted Greeks over a JSONL/CSV of jobs")
+    ap.add_argument("jobs", help=".jsonl or .csv with ticker + url|text (+ expiry, strike, iv, r, call_put)")
+    ap.add_argument("-o", "--out", default="runs/batch_results.jsonl")
+    ap.add_argument("--dead-letter", default="runs/batch_failed.jsonl")
+    ap.add_argument("--fetch-workers", type=int, default=8)
+    ap.add_argument("--market-workers", type=int, default=8)
+    ap.add_argument("--compute-workers", type=int, default=2, help="processes for iv_adjust / Greeks / analysis")
+    ap.add_argument("--score-batch", type=int, default=16, help="articles per forward pass")
+    ap.add_argument("--queue-size", type=int, default=64, help="max jobs waiting between two stages")
+    ap.add_argument("--retries", type=int, default=2)
+    ap.add_argument("--no-cache", action="store_true", help="don't use the on-disk sentiment cache")
+    ap.add_argument("--snapshots", choices=["live", "record", "replay"], default="live",
+                    help="replay = serve spot/chains only from recorded snapshots (offline)")
+    ap.add_argument("--snapshot-dir", default="data/chain_snapshots")
+    ap.add_argument("--stub", action="store_true", help="synthetic chains + stub scorer (offline dry run)")
+    tracing.add_arguments(ap)
+    args = ap.parse_args()
+
+    for p in (args.out, args.dead_letter):
+        Path(p).parent.mkdir(parents=True, exist_ok=True)
+    if args.stub:
+        from sentimentService import StubScorer
+        chains, scorer, cache = StubChains(), StubScorer(), None
+    else:
+        import sentimentMapping
+        from chainSnapshots import ChainSnapshots
+        from sentimentCache import SentimentCache
+        chains, scorer = SnapshotChains(ChainSnapshots(args.snapshot_dir, args.snapshots)), None
+        cache = None if args.no_cache else SentimentCache(variant=sentimentMapping.BACKEND)
+
+    with tracing.from_args(args, profile_depth=0):           # stage spans are the roots here
+        run(args.jobs, args.out, args.dead_letter, chains, scorer, cache,
+            fetch_workers=args.fetch_workers, market_workers=args.market_workers,
+            compute_workers=args.compute_workers, score_batch=args.score_batch,
+            queue_size=args.queue_size, retries=args.retries)
@@ -0,0 +1,382 @@
+# benchmarks.py  ── offline benchmark suite over the hot paths, with JSON history + regression check
+import fnmatch
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+HISTORY   = "runs/benchmarks.jsonl"
+THRESHOLD = 0.10          # relative slow-down flagged as a regression
+REPEAT    = 5             # timed runs per benchmark (best is kept), after one warm-up
+SEED      = 0
+
+BENCHMARKS = {}           # name → (fn, unit, higher_is_better)
+
+
+def bench(name, unit, higher=True):
+    """
+    Register a benchmark.  `fn(fx)` gets the shared Fixtures and returns
+    (items, work): `work()` is timed and the result is items per second.
+    A benchmark that measures itself returns a plain number instead.
+    """
+    def wrap(fn):
+        BENCHMARKS[name] = (fn, unit, higher)
+        return fn
+    return wrap
+
+
+# ── fixtures (all synthetic, built on first use) ─────────────────────────
+class Fixtures:
+    """Seeded inputs shared by the benchmarks; the tiny model is only built if a benchmark asks for it."""
+
+    def __init__(self, threads=1):
+        self.threads = threads
+        self.rng = np.random.default_rng(SEED)
+        self._tmp = None
+        self._model_dir = None
+        self.words = ["".join(self.rng.choice(list("abcdefghijklmnopqrstuvwxyz"), self.rng.integers(3, 9)))
+                      for _ in range(2000)]
+
+    def contracts(self, n):
+        rng = np.random.default_rng(SEED)
+        return {"S": 100.0, "K": rng.uniform(50, 150, n), "T": rng.uniform(7, 730, n) / 365,
+                "r": 0.05, "sigma": rng.uniform(0.1, 0.8, n), "call_put": rng.choice(["C", "P"], n)}
+
+    def tweets(self, n):
+        rng = np.random.default_rng(SEED)
+        noise = ["https://t.co/x1y2z3", "@trader", "#stocks", "$AAPL", ""]
+        return [" ".join(list(rng.choice(self.words, rng.integers(5, 30))) + [str(rng.choice(noise))]).title()
+                for _ in range(n)]
+
+    def articles(self, n, words=1500):
+        rng = np.random.default_rng(SEED)
+        return [" ".join(rng.choice(self.words, words)) for _ in range(n)]
+
+    @property
+    def model_dir(self):
+        """Random-weight 2-layer BERT + word-level tokenizer over `words`, saved once to a temp dir."""
+        if self._model_dir is None:
+            import torch
+            from transformers import BertConfig, BertForSequenceClassification, BertTokenizerFast
+            from transformers.utils import logging
+
+            logging.disable_progress_bar()
+            torch.manual_seed(SEED)
+            torch.set_num_threads(self.threads)
+            self._tmp = tempfile.TemporaryDirectory(prefix="dg-bench-")
+            path = Path(self._tmp.name)
+            (path / "vocab.txt").write_text("\n".join(["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + self.words))
+            BertTokenizerFast(str(path / "vocab.txt")).save_pretrained(path)
+            labels = {0: "negative", 1: "neutral", 2: "positive"}
+            config = BertConfig(vocab_size=len(self.words) + 5, hidden_size=128, num_hidden_layers=2,
+                                num_attention_heads=2, intermediate_size=512, num_labels=3,
+                                id2label=labels, label2id={v: k for k, v in labels.items()})
+            BertForSequenceClassification(config).eval().save_pretrained(path)
+            self._model_dir = str(path)
+        return self._model_dir
+
+    def tokenizer(self):
+        from transformers import AutoTokenizer
+        return AutoTokenizer.from_pretrained(self.model_dir)
+
+    def use_tiny_model(self):
+        """Point sentimentMapping's registry at the tiny model (eager backend)."""
+        import sentimentMapping
+        from inferenceBackends import EagerBackend
+        from modelRegistry import registry
+
+        tok, model_dir = self.tokenizer(), self.model_dir
+        sentimentMapping.set_backend("eager")
+        registry.register("tokenizer", lambda: tok)
+        registry.register("finbert:eager", lambda: EagerBackend(model_dir))
+        return sentimentMapping
+
+    def close(self):
+        if self._tmp is not None:
+            self._tmp.cleanup()
+
+
+# ── benchmarks ───────────────────────────────────────────────────────────
+@bench("import.analysis_layer", "ms", higher=False)
+def _import_time(fx):
+    from importBenchmark import time_import
+    return 1000 * time_import()[0]
+
+
+@bench("greeks.per_contract", "contracts/s")
+def _greeks_loop(fx):
+    from sentimentMapping import black_scholes_greeks
+    c = fx.contracts(2_000)
+    rows = list(zip(c["K"], c["T"], c["sigma"], c["call_put"]))
+    return len(rows), lambda: [black_scholes_greeks(c["S"], K, T, c["r"], v, cp) for K, T, v, cp in rows]
+
+
+@bench("greeks.batched", "contracts/s")
+def _greeks_batched(fx):
+    from BlackScholes import bs_engine
+    c = fx.contracts(200_000)
+    return 200_000, lambda: bs_engine(c["S"], c["K"], c["T"], c["r"], c["sigma"], c["call_put"])
+
+
+@bench("iv.batched", "contracts/s")
+def _implied_vol(fx):
+    from BlackScholes import bs_engine, implied_vol
+    c = fx.contracts(100_000)
+    price = bs_engine(c["S"], c["K"], c["T"], c["r"], c["sigma"], c["call_put"])["price"]
+    return 100_000, lambda: implied_vol(price, c["S"], c["K"], c["T"], c["r"], c["call_put"])
+
+
+@bench("american.baw", "contracts/s")
+def _baw(fx):
+    from americanPricer import baw_engine
+    c = fx.contracts(20_000)
+    return 20_000, lambda: baw_engine(c["S"], c["K"], c["T"], c["r"], c["sigma"], c["call_put"], 0.01)
+
+
+@bench("american.lattice", "node-steps/s")
+def _lattice(fx):
+    from americanPricer import binomial_engine
+    c, steps = fx.contracts(200), 200
+    return 200 * steps * (steps + 1) // 2, lambda: binomial_engine(
+        c["S"], c["K"], c["T"], c["r"], c["sigma"], c["call_put"], 0.01, steps=steps, greeks=False)
+
+
+@bench("scenario.grid", "cells/s")
+def _scenario(fx):
+    from scenarioRisk import evaluate, scenario_grid, synthetic_positions
+    positions = synthetic_positions(500, SEED)
+    grid = scenario_grid(np.linspace(-0.2, 0.2, 21), np.linspace(-0.1, 0.1, 11), days=(0, 5, 21))
+    return len(positions) * len(grid), lambda: evaluate(positions, grid)
+
+
+@bench("analysis.generate", "calls/s")
+def _generate(fx):
+    from finalAnalysis import generate_analysis
+    from sentimentMapping import black_scholes_greeks
+    c = fx.contracts(2_000)
+    g = black_scholes_greeks(c["S"], c["K"], c["T"], c["r"], c["sigma"], c["call_put"])
+    rows = [({k: float(v[i]) for k, v in g.items()}, c["sigma"][i], c["call_put"][i]) for i in range(2_000)]
+    return len(rows), lambda: [generate_analysis(iv, greeks, cp) for greeks, iv, cp in rows]
+
+
+@bench("analysis.screen", "contracts/s")
+def _screen(fx):
+    from finalAnalysis import screen_greeks
+    from sentimentMapping import black_scholes_greeks
+    c = fx.contracts(200_000)
+    g = black_scholes_greeks(c["S"], c["K"], c["T"], c["r"], c["sigma"], c["call_put"])
+    return 200_000, lambda: screen_greeks(g, c["call_put"])
+
+
+@bench("cleansing.clean", "rows/s")
+def _clean(fx):
+    import pandas as pd
+
+    from dataCleansing import clean_text
+    tweets = pd.Series(fx.tweets(50_000))
+    return len(tweets), lambda: clean_text(tweets)
+
+
+@bench("cleansing.clean_tokenise", "rows/s")
+def _clean_tokenise(fx):
+    import dataCleansing
+    dataCleansing._tokenizer = fx.tokenizer()            # what _init_worker does in each process
+    tweets = fx.tweets(20_000)
+    chunk = (tweets, [0] * len(tweets), np.arange(len(tweets)))
+    return len(tweets), lambda: dataCleansing._process_chunk(chunk)
+
+
+@bench("tickers.route", "articles/s")
+def _ticker_route(fx):
+    from tickerIndex import NASDAQ100, TickerIndex
+    rng, index = np.random.default_rng(SEED), TickerIndex()
+    names = [name for name, _ in NASDAQ100.values()] + [f"${t}" for t in NASDAQ100]
+    articles = []
+    for text in fx.articles(1_000, words=900):
+        words = text.split()
+        for i in rng.integers(0, len(words), 8):
+            words[i] = str(rng.choice(names))
+        articles.append(" ".join(words))
+    return len(articles), lambda: index.route(articles)
+
+
+def _chunks(fx, texts, max_len=510):
+    tok = fx.tokenizer()
+    return sum(max(1, -(-len(ids) // (max_len - 2))) for ids in tok(texts, add_special_tokens=False)["input_ids"])
+
+
+@bench("sentiment.full", "chunks/s")
+def _sentiment_full(fx):
+    sm = fx.use_tiny_model()
+    articles = fx.articles(8)
+    return _chunks(fx, articles), lambda: [sm.get_sentiment_full(a) for a in articles]
+
+
+@bench("sentiment.batch", "chunks/s")
+def _sentiment_batch(fx):
+    sm = fx.use_tiny_model()
+    articles = fx.articles(8)
+    return _chunks(fx, articles), lambda: sm.get_sentiment_batch(articles)
+
+
+# ── runner ───────────────────────────────────────────────────────────────
+def _git(*args):
+    try:
+        return subprocess.run(["git", *args], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def machine():
+    return {"host": platform.node(), "cpu": platform.processor() or platform.machine(),
+            "cores": os.cpu_count(), "python": platform.python_version(), "numpy": np.__version__}
+
+
+def run(patterns=("*",), repeat=REPEAT, threads=1, progress=print):
+    """Run the matching benchmarks; returns one history record."""
+    fx = Fixtures(threads)
+    results = {}
+    try:
+        for name, (fn, unit, higher) in BENCHMARKS.items():
+            if not any(fnmatch.fnmatch(name, p) for p in patterns):
+                continue
+            out = fn(fx)
+            if isinstance(out, tuple):
+                items, work = out
+                work()                                       # warm-up: caches, lazy loads, allocator
+                best = min(_timed(work) for _ in range(repeat))
+                results[name] = {"value": items / best, "unit": unit, "higher_is_better": higher,
+                                 "seconds": best, "items": items}
+            else:
+                results[name] = {"value": float(out), "unit": unit, "higher_is_better": higher}
+            if progress:
+                progress(f"  {name:<26} {results[name]['value']:>14,.1f} {unit}")
+    finally:
+        fx.close()
+    return {"time": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "commit": _git("rev-parse", "--short", "HEAD"), "dirty": bool(_git("status", "--porcelain", "-uno")),
+            "machine": machine(), "threads": threads, "repeat": repeat, "results": results}
+
+
+def _timed(work):
+    t0 = time.perf_counter()
+    work()
+    return time.perf_counter() - t0
+
+
+# ── history ──────────────────────────────────────────────────────────────
+def save(record, path=HISTORY):
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a") as f:
+        f.write(json.dumps(record) + "\n")
+
+
+def load_history(path=HISTORY):
+    if not Path(path).exists():
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _pick(history, ref, before=None):
+    """Latest record whose commit starts with `ref` (any record if ref is None), optionally before index `before`."""
+    pool = history[:before] if before is not None else history
+    for i in range(len(pool) - 1, -1, -1):
+        if ref is None or pool[i]["commit"].startswith(ref):
+            return i
+    raise LookupError(f"no benchmark run{' for ' + ref if ref else ''} in the history")
+
+
+def compare(base, head, threshold=THRESHOLD):
+    """
+    Per-benchmark change from `base` to `head` (two history records).
+
+    Returns rows (name, unit, base value, head value, relative change,
+    status) where status is "regression" when the head is worse by more
+    than `threshold`, "improved" when better by more than that, else "".
+    """
+    rows = []
+    for name, h in head["results"].items():
+        b = base["results"].get(name)
+        if b is None:
+            continue
+        change = (h["value"] - b["value"]) / b["value"]
+        worse = -change if h["higher_is_better"] else change
+        status = "regression" if worse > threshold else "improved" if worse < -threshold else ""
+        rows.append((name, h["unit"], b["value"], h["value"], change, status))
+    return rows
+
+
+def print_comparison(base, head, rows, threshold=THRESHOLD):
+    label = lambda r: f"{r['commit'] or '?'}{'+' if r.get('dirty') else ''} ({r['time']})"
+    print(f"\nbase {label(base)}\nhead {label(head)}   threshold ±{threshold:.0%}")
+    if base["machine"] != head["machine"] or base.get("threads") != head.get("threads"):
+        print("⚠  runs come from different machines / thread counts – differences may not be code")
+    print(f"\n{'benchmark':<26} {'unit':>13} {'base':>14} {'head':>14} {'change':>8}")
+    for name, unit, b, h, change, status in rows:
+        flag = {"regression": "  ✖ regression", "improved": "  ✔ improved"}.get(status, "")
+        print(f"{name:<26} {unit:>13} {b:14,.1f} {h:14,.1f} {change:+8.1%}{flag}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Offline benchmark suite with JSON history")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p_run = sub.add_parser("run", help="run benchmarks and append the results to the history")
+    p_run.add_argument("-k", nargs="+", default=["*"], metavar="GLOB", help="benchmark name patterns")
+    p_run.add_argument("--repeat", type=int, default=REPEAT)
+    p_run.add_argument("--threads", type=int, default=1, help="torch threads for the model benchmarks")
+    p_run.add_argument("--no-save", action="store_true")
+    p_run.add_argument("--compare", action="store_true", help="then compare with the previous run")
+    p_cmp = sub.add_parser("compare", help="compare two runs from the history (exit 1 on regressions)")
+    p_cmp.add_argument("--base", help="commit prefix of the baseline run (default: the run before head)")
+    p_cmp.add_argument("--head", help="commit prefix of the run to check (default: latest)")
+    p_hist = sub.add_parser("history", help="one benchmark's value per recorded run")
+    p_hist.add_argument("name")
+    sub.add_parser("list", help="list benchmark names")
+    for p in (p_run, p_cmp, p_hist):
+        p.add_argument("--history", default=HISTORY)
+    for p in (p_run, p_cmp):
+        p.add_argument("--threshold", type=float, default=THRESHOLD)
+    args = ap.parse_args()
+
+    if args.cmd == "list":
+        for name, (_, unit, higher) in BENCHMARKS.items():
+            print(f"{name:<26} {unit} ({'higher' if higher else 'lower'} is better)")
+    elif args.cmd == "history":
+        for rec in load_history(args.history):
+            if args.name in rec["results"]:
+                r = rec["results"][args.name]
+                print(f"{rec['time']}  {rec['commit']}{'+' if rec.get('dirty') else ' '}  {r['value']:14,.1f} {r['unit']}")
+    elif args.cmd == "run":
+        record = run(args.k, args.repeat, args.threads)
+        if not args.no_save:
+            save(record, args.history)
+            print(f"appended to {args.history}")
+        if args.compare:
+            history = load_history(args.history)
+            if args.no_save:
+                history.append(record)
+            try:
+                base = history[_pick(history, None, before=len(history) - 1)]
+            except LookupError:
+                print("(no earlier run to compare with)")
+                raise SystemExit
+            rows = compare(base, record, args.threshold)
+            print_comparison(base, record, rows, args.threshold)
+            sys.exit(1 if any(r[-1] == "regression" for r in rows) else 0)
+    else:
+        history = load_history(args.history)
+        head_i = _pick(history, args.head)
+        base_i = _pick(history, args.base, before=None if args.base else head_i)
+        rows = compare(history[base_i], history[head_i], args.threshold)
+        print_comparison(history[base_i], history[head_i], rows, args.threshold)
+        sys.exit(1 if any(r[-1] == "regression" for r in rows) else 0)
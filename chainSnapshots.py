@@ -0,0 +1,218 @@
+# chainSnapshots.py  ── TTL-cached spot / option-chain snapshots with offline replay
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import tracing
+
+SNAPSHOT_DIR = "data/chain_snapshots"
+SPOT_TTL     = 60          # seconds a spot price is reused
+EXPIRY_TTL   = 3600        # seconds the list of expiries is reused
+CHAIN_TTL    = 300         # seconds a per-expiry chain is reused
+MODES        = ("live", "record", "replay")
+
+Chain = namedtuple("Chain", "calls puts")
+
+
+class YFinanceChainSource:
+    """Network source: one yf.Ticker per symbol, created on first use."""
+
+    def __init__(self):
+        self._tickers = {}
+
+    def _ticker(self, symbol):
+        if symbol not in self._tickers:
+            import yfinance as yf
+            self._tickers[symbol] = yf.Ticker(symbol)
+        return self._tickers[symbol]
+
+    def spot(self, symbol):
+        return float(self._ticker(symbol).history(period="1d")["Close"].iloc[0])
+
+    def expiries(self, symbol):
+        return list(self._ticker(symbol).options)
+
+    def chain(self, symbol, expiry):
+        c = self._ticker(symbol).option_chain(expiry)
+        return Chain(c.calls, c.puts)
+
+
+# ── columnar (de)serialisation ───────────────────────────────────────────
+def _to_columns(df, prefix):
+    """DataFrame → {prefix.col: ndarray} with no object dtypes, plus a column spec."""
+    arrays, spec = {}, []
+    for col in df.columns:
+        s = df[col]
+        if isinstance(s.dtype, pd.DatetimeTZDtype):
+            arrays[f"{prefix}.{col}"] = s.dt.tz_convert("UTC").dt.tz_localize(None).to_numpy("datetime64[ns]")
+            spec.append([col, "utc"])
+        elif s.dtype == object or pd.api.types.is_string_dtype(s.dtype):
+            arrays[f"{prefix}.{col}"] = s.astype(str).to_numpy(dtype=str)
+            spec.append([col, "str"])
+        else:
+            arrays[f"{prefix}.{col}"] = s.to_numpy()
+            spec.append([col, ""])
+    return arrays, spec
+
+
+def _from_columns(npz, prefix, spec):
+    data = {}
+    for col, kind in spec:
+        values = npz[f"{prefix}.{col}"]
+        data[col] = pd.to_datetime(values).tz_localize("UTC") if kind == "utc" else values
+    return pd.DataFrame(data, columns=[c for c, _ in spec])
+
+
+class ChainSnapshots:
+    """
+    Spot prices, expiry lists and per-expiry chains, each reused for its own TTL.
+
+    Nothing is fetched until it is asked for: `chain(symbol, expiry)` loads
+    only that expiry.  Lookups go memory → disk snapshot → source, and the
+    `hits` / `disk_hits` / `misses` counters record which one answered.
+
+    mode="live"    fetch from `source` when the cached copy is older than its TTL
+    mode="record"  as live, and also write every fetch to `root`
+    mode="replay"  serve only what is under `root`, ignoring TTLs – fully
+                   offline; asking for anything not recorded raises KeyError
+
+    On disk each symbol is a directory with `meta.json` (spot, expiries,
+    column specs and fetch times) and one compressed `.npz` per expiry
+    holding the calls and puts column by column.
+    """
+
+    def __init__(self, root=SNAPSHOT_DIR, mode="live", source=None,
+                 spot_ttl=SPOT_TTL, expiry_ttl=EXPIRY_TTL, chain_ttl=CHAIN_TTL, clock=time.time):
+        if mode not in MODES:
+            raise ValueError(f"Unknown mode {mode!r}; choose one of {', '.join(MODES)}")
+        self.root = Path(root)
+        self.mode = mode
+        self.source = source if source is not None or mode == "replay" else YFinanceChainSource()
+        self.ttl = {"spot": spot_ttl, "expiries": expiry_ttl, "chain": chain_ttl}
+        self.clock = clock
+        self.hits = self.disk_hits = self.misses = 0
+        self._mem = {}                        # (kind, symbol, expiry) → (fetched_at, value)
+        self._lock = threading.Lock()
+        self._key_locks = {}
+
+    # ── public lookups ───────────────────────────────────────────────────
+    def spot(self, symbol):
+        return self._get("spot", symbol.upper())
+
+    def expiries(self, symbol):
+        return self._get("expiries", symbol.upper())
+
+    def chain(self, symbol, expiry):
+        """Chain(calls, puts) DataFrames for one expiry (yfinance's option_chain layout)."""
+        return self._get("chain", symbol.upper(), expiry)
+
+    def stats(self):
+        total = self.hits + self.disk_hits + self.misses
+        return {"hits": self.hits, "disk_hits": self.disk_hits, "misses": self.misses,
+                "hit_rate": (self.hits + self.disk_hits) / total if total else 0.0}
+
+    def clear(self):
+        """Drop the in-memory copies (disk snapshots stay)."""
+        with self._lock:
+            self._mem.clear()
+
+    # ── lookup path ──────────────────────────────────────────────────────
+    def _fresh(self, kind, fetched_at):
+        return self.mode == "replay" or self.clock() - fetched_at < self.ttl[kind]
+
+    def _get(self, kind, symbol, expiry=None):
+        key = (kind, symbol, expiry)
+        with self._lock:
+            entry = self._mem.get(key)
+            if entry and self._fresh(kind, entry[0]):
+                self.hits += 1
+                tracing.count("snapshots.hits")
+                return entry[1]
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:                       # one fetch per key, concurrent callers wait for it
+            with self._lock:
+                entry = self._mem.get(key)
+                if entry and self._fresh(kind, entry[0]):
+                    self.hits += 1
+                    tracing.count("snapshots.hits")
+                    return entry[1]
+
+            entry = self._load(kind, symbol, expiry)
+            if entry and self._fresh(kind, entry[0]):
+                tracing.count("snapshots.disk_hits")
+                with self._lock:
+                    self.disk_hits += 1
+                    self._mem[key] = entry
+                return entry[1]
+            if self.mode == "replay":
+                raise KeyError(f"{kind} for {symbol}{' ' + expiry if expiry else ''} "
+                               f"not recorded under {self.root}")
+
+            fetch = getattr(self.source, kind)
+            with tracing.span(f"market.{kind}", symbol=symbol):
+                value = fetch(symbol, expiry) if kind == "chain" else fetch(symbol)
+            tracing.count("snapshots.misses")
+            entry = (self.clock(), value)
+            if self.mode == "record":
+                self._save(kind, symbol, expiry, entry)
+            with self._lock:
+                self.misses += 1
+                self._mem[key] = entry
+            return value
+
+    # ── persistence ──────────────────────────────────────────────────────
+    def _meta_path(self, symbol):
+        return self.root / symbol / "meta.json"
+
+    def _read_meta(self, symbol):
+        path = self._meta_path(symbol)
+        return json.loads(path.read_text()) if path.exists() else {}
+
+    def _load(self, kind, symbol, expiry):
+        meta = self._read_meta(symbol)
+        if kind != "chain":
+            return tuple(meta[kind]) if kind in meta else None
+        info = meta.get("chains", {}).get(expiry)
+        if info is None:
+            return None
+        with np.load(self.root / symbol / f"{expiry}.npz", allow_pickle=False) as npz:
+            value = Chain(_from_columns(npz, "calls", info["calls"]),
+                          _from_columns(npz, "puts", info["puts"]))
+        return info["fetched_at"], value
+
+    def _save(self, kind, symbol, expiry, entry):
+        fetched_at, value = entry
+        with self._lock:                     # meta.json is shared by every key of a symbol
+            (self.root / symbol).mkdir(parents=True, exist_ok=True)
+            meta = self._read_meta(symbol)
+            if kind == "chain":
+                calls, calls_spec = _to_columns(value.calls, "calls")
+                puts, puts_spec = _to_columns(value.puts, "puts")
+                tmp = self.root / symbol / f"{expiry}.tmp.npz"
+                np.savez_compressed(tmp, **calls, **puts)
+                os.replace(tmp, self.root / symbol / f"{expiry}.npz")
+                meta.setdefault("chains", {})[expiry] = {
+                    "fetched_at": fetched_at, "calls": calls_spec, "puts": puts_spec}
+            else:
+                meta[kind] = [fetched_at, value]
+            tmp = self._meta_path(symbol).with_suffix(".tmp")
+            tmp.write_text(json.dumps(meta))
+            os.replace(tmp, self._meta_path(symbol))
+
+
+def nearest_expiry(snapshots, symbol, min_days=1, now=None):
+    """First listed expiry at least `min_days` away (so T > 0)."""
+    from datetime import datetime, timezone
+
+    from BlackScholes import as_utc
+
+    now = as_utc(now or datetime.now(timezone.utc))
+    return next(e for e in snapshots.expiries(symbol)
+                if (as_utc(e) - now).days >= min_days)
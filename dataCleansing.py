@@ -1,62 +1,265 @@
 from datasets import Dataset, DatasetDict
 from transformers import AutoTokenizer
 from sklearn.model_selection import train_test_split
-import pandas as pd, re, pathlib
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+from multiprocessing import Pool
+import numpy as np, pandas as pd, re, pathlib, os, shutil, tempfile, time
 
-RAW_CSV   = "data/Twitter_Data.csv"
+RAW_CSV    = "data/Twitter_Data.csv"
 MODEL_NAME = "ProsusAI/finbert"
 OUT_DIR    = "data/finbert_tweets"
+MAX_LEN    = 96                      # truncation only – padding happens per batch
+CHUNK_ROWS = 50_000                  # rows read from the CSV per chunk
+WORKERS    = os.cpu_count() or 1     # clean + tokenise processes
 
-# 1️⃣  Load CSV and rename columns
-df = pd.read_csv(RAW_CSV)
-df = df.rename(columns={"clean_text": "text", "category": "label"})
+NUM_PERM   = 64                      # MinHash values per tweet
+BANDS      = 8                       # LSH bands of NUM_PERM // BANDS values → candidates from Jaccard ≈ 0.77
+SHINGLE    = 2                       # word n-grams fed to MinHash
+NEAR_DUP   = 0.8                     # estimated Jaccard at which two candidates count as one tweet
 
-# 2️⃣  Convert label to int, map to FinBERT IDs
-df["label"] = pd.to_numeric(df["label"], downcast="integer")
-
-label_map = {-1: 0,   # bearish
+LABEL_MAP = {-1: 0,   # bearish
               0: 1,   # neutral
               1: 2}   # bullish
 
-df["label"] = df["label"].map(label_map)
-df = df.dropna(subset=["label"])
-
-print("Label counts after mapping:\n", df["label"].value_counts())
-
-# 3️⃣  Clean text
-df["text"] = (
-    df["text"]
-      .astype(str)
-      .apply(lambda t: re.sub(r"http\S+|@\w+|#[A-Za-z0-9_]+|\$[A-Za-z]+", "", t))
-      .str.lower()
-      .str.strip()
-)
-
-# 4️⃣  Train/validation split
-train_df, val_df = train_test_split(
-    df, test_size=0.15, stratify=df["label"], random_state=42
-)
-
-# 5️⃣  Create 🤗 Datasets from DataFrames
-dset = DatasetDict({
-    "train":      Dataset.from_pandas(train_df.reset_index(drop=True)),
-    "validation": Dataset.from_pandas(val_df.reset_index(drop=True)),
-})
-
-# 6️⃣  Tokenise
-tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME, use_fast=True)
-
-def tok(batch):
-    return tokenizer(
-        batch["text"],
-        truncation=True,
-        padding="max_length",
-        max_length=96,
+NOISE = re.compile(r"http\S+|@\w+|#[A-Za-z0-9_]+|\$[A-Za-z]+")   # URLs, mentions, hashtags, cashtags
+
+
+def clean_text(s):
+    """Vectorised version of the old per-row re.sub → lower → strip."""
+    s = s.fillna("nan").astype(str)          # missing text → "nan", as str(NaN) did before
+    return s.str.replace(NOISE, "", regex=True).str.lower().str.strip()
+
+
+def map_labels(s):
+    return pd.to_numeric(s, downcast="integer").map(LABEL_MAP)
+
+
+# ── near-duplicate detection (MinHash + LSH) ──────────────────────────────
+_rng = np.random.default_rng(42)     # same permutations in every worker process
+_PERM_A = _rng.integers(1, 2**63, NUM_PERM, dtype=np.uint64) | np.uint64(1)
+_PERM_B = _rng.integers(0, 2**63, NUM_PERM, dtype=np.uint64)
+
+
+def minhash(texts):
+    """
+    Text hash (uint64) and MinHash signature (NUM_PERM × uint16) of each
+    cleaned text over its word SHINGLE-grams.  Shingles are hashed in one
+    pd.util.hash_array call and each permutation is a multiply-shift hash
+    reduced per text with np.minimum.reduceat; the low 16 bits of every
+    minimum are kept, which is plenty to estimate Jaccard similarity.
+    """
+    texts = list(texts)
+    sig = np.empty((len(texts), NUM_PERM), np.uint16)
+    if not texts:
+        return np.empty(0, np.uint64), sig
+    shingles, starts = [], []
+    for t in texts:
+        words = t.split()
+        starts.append(len(shingles))
+        if len(words) <= SHINGLE:
+            shingles.append(t)       # short (or empty) text: the whole text is one shingle
+        else:
+            shingles.extend(" ".join(words[i:i + SHINGLE]) for i in range(len(words) - SHINGLE + 1))
+    h = pd.util.hash_array(np.asarray(shingles, dtype=object))
+    for j in range(NUM_PERM):
+        sig[:, j] = np.minimum.reduceat((h * _PERM_A[j] + _PERM_B[j]) >> np.uint64(32), starts)
+    return pd.util.hash_array(np.asarray(texts, dtype=object)), sig
+
+
+def duplicate_clusters(text_hash, sig, threshold=NEAR_DUP):
+    """
+    Exact-duplicate group and near-duplicate cluster (0 … k-1) of every row.
+
+    Rows with equal text hashes share a group.  Distinct texts whose
+    signatures are equal in any LSH band become candidate pairs, are kept
+    if at least `threshold` of their MinHash values agree, and clusters are
+    the connected components of those pairs (so near-copies of near-copies
+    are one cluster).
+    """
+    _, first, exact = np.unique(text_hash, return_index=True, return_inverse=True)
+    u = sig[first]                                   # one signature per distinct text
+    m, width = len(u), NUM_PERM // BANDS
+    pairs = []
+    for b in range(BANDS):
+        words = np.ascontiguousarray(u[:, b * width:(b + 1) * width]).view(np.uint64)
+        key = words[:, 0]
+        for w in range(1, words.shape[1]):
+            key = key * np.uint64(0x9E3779B97F4A7C15) ^ words[:, w]
+        order = np.argsort(key, kind="stable")
+        new = np.r_[True, key[order][1:] != key[order][:-1]]
+        head = order[new][np.cumsum(new) - 1]         # first text of each run of equal band keys
+        pairs.append((head * m + order)[head != order])
+    pair = np.unique(np.concatenate(pairs)) if m else np.empty(0, np.int64)
+    a, b = pair // max(m, 1), pair % max(m, 1)
+    agree = np.concatenate([(u[a[i:i + 100_000]] == u[b[i:i + 100_000]]).mean(1)
+                            for i in range(0, len(a), 100_000)] + [np.empty(0)])
+    a, b = a[agree >= threshold], b[agree >= threshold]
+    _, comp = connected_components(coo_matrix((np.ones(len(a)), (a, b)), shape=(m, m)), directed=False)
+    return exact, comp[exact]
+
+
+def first_of(groups):
+    """Mask of the first row of every group."""
+    keep = np.zeros(len(groups), bool)
+    keep[np.unique(groups, return_index=True)[1]] = True
+    return keep
+
+
+def _signature_chunk(args):
+    texts, labels, positions = args
+    t0 = time.perf_counter()
+    text_hash, sig = minhash(clean_text(pd.Series(texts)))
+    return positions, map_labels(pd.Series(labels)).to_numpy(float), text_hash, sig, time.perf_counter() - t0
+
+
+# ── worker process: clean + tokenise one chunk ────────────────────────────
+_tokenizer = None
+
+def _init_worker(model_name):
+    global _tokenizer
+    _tokenizer = AutoTokenizer.from_pretrained(model_name, use_fast=True)
+
+def _process_chunk(args):
+    texts, labels, positions = args
+    t0 = time.perf_counter()
+    texts = clean_text(pd.Series(texts)).tolist()
+    t1 = time.perf_counter()
+    enc = _tokenizer(texts, truncation=True, max_length=MAX_LEN, return_length=True)
+    t2 = time.perf_counter()
+    return enc.data, labels, positions, {"clean": t1 - t0, "tokenise": t2 - t1}
+
+
+def _chunks(raw_csv, split_of=None):
+    """(texts, labels, positions) per CSV chunk; with `split_of`, only rows assigned to a split."""
+    for chunk in pd.read_csv(raw_csv, chunksize=CHUNK_ROWS):
+        if split_of is not None:
+            chunk = chunk[split_of[chunk.index.to_numpy()] >= 0]
+        yield chunk["clean_text"].tolist(), chunk["category"].tolist(), chunk.index.to_numpy()
+
+
+def _rows(raw_csv, split_of, rank_of, workers, model_name, timings):
+    """Stream the CSV through the worker pool and yield tokenised rows tagged with their split."""
+    with Pool(workers, initializer=_init_worker, initargs=(model_name,)) as pool:
+        for enc, labels, positions, t in pool.imap(_process_chunk, _chunks(raw_csv, split_of)):
+            for k, v in t.items():
+                timings[k] += v
+            keys = [k for k in enc if k != "length"]
+            labels = map_labels(pd.Series(labels)).to_numpy()
+            for i, pos in enumerate(positions):
+                row = {k: enc[k][i] for k in keys}
+                row.update(label=int(labels[i]), length=enc["length"][i],
+                           split=int(split_of[pos]), rank=int(rank_of[pos]))
+                yield row
+
+
+def dedup_stats(exact, cluster, keep, labels):
+    """Row counts removed by each dedup step, for the report."""
+    clusters = pd.Series(labels).groupby(cluster)
+    distinct = len(np.unique(exact))
+    return {"rows": len(exact), "kept": int(keep.sum()), "exact": len(exact) - distinct,
+            "near": distinct - clusters.ngroups,
+            "near_clusters": int((pd.Series(exact).groupby(cluster).nunique() > 1).sum()),
+            "label_conflicts": int((clusters.nunique() > 1).sum())}
+
+
+def main(dedup=True, keep_near=False, threshold=NEAR_DUP):
+    t_start = time.perf_counter()
+
+    # 1️⃣  Labels (+ text hash and MinHash signature per row when deduplicating)
+    if dedup:
+        with Pool(WORKERS) as pool:
+            parts = list(pool.imap(_signature_chunk, _chunks(RAW_CSV)))
+        labels = pd.Series(np.concatenate([p[1] for p in parts]), index=np.concatenate([p[0] for p in parts]))
+        text_hash, sig = np.concatenate([p[2] for p in parts]), np.concatenate([p[3] for p in parts])
+        t_sig = sum(p[4] for p in parts)
+    else:
+        labels = pd.concat(
+            map_labels(c["category"])
+            for c in pd.read_csv(RAW_CSV, usecols=["category"], chunksize=CHUNK_ROWS)
+        )
+    n_rows = len(labels)
+    mapped = labels.notna().to_numpy()               # drop unmapped rows
+    labels = labels[mapped]
+    t_labels = time.perf_counter() - t_start
+    print("Label counts after mapping:\n", labels.value_counts())
+
+    # 2️⃣  Duplicates: exact by text hash, near by MinHash/LSH; one row kept per cluster
+    t0 = time.perf_counter()
+    if dedup:
+        exact, cluster = duplicate_clusters(text_hash[mapped], sig[mapped], threshold)
+        keep = first_of(exact if keep_near else cluster)
+        st = dedup_stats(exact, cluster, keep, labels.to_numpy())
+        print(f"\nDedup: {st['rows']:,} → {st['kept']:,} rows ({st['kept'] / st['rows'] - 1:+.1%})"
+              f"\n  exact duplicates dropped  {st['exact']:,}"
+              f"\n  near-duplicates {'kept' if keep_near else 'dropped'}"
+              f"    {st['near']:,} (in {st['near_clusters']:,} clusters)"
+              f"\n  clusters with mixed labels {st['label_conflicts']:,} (first row's label kept)")
+    else:
+        cluster, keep = np.arange(len(labels)), np.ones(len(labels), bool)
+    t_dedup = time.perf_counter() - t0
+
+    # 3️⃣  Train/validation split of whole clusters, so no near-copy straddles the two;
+    #     without dedup every row is its own cluster – same rows, same order as splitting the full frame
+    rep = first_of(cluster)
+    train_c, val_c = train_test_split(
+        cluster[rep], test_size=0.15, stratify=labels.to_numpy()[rep], random_state=42
     )
+    side, order = np.empty(cluster.max() + 1, np.int8), np.empty(cluster.max() + 1, np.int64)
+    side[train_c], order[train_c] = 0, np.arange(len(train_c))
+    side[val_c], order[val_c] = 1, np.arange(len(val_c))
+    pos = labels.index.to_numpy()
+    split_of = np.full(n_rows, -1, dtype=np.int8)
+    rank_of = np.zeros(n_rows, dtype=np.int64)
+    for s in (0, 1):
+        rows = np.flatnonzero(keep & (side[cluster] == s))
+        rows = rows[np.lexsort((rows, order[cluster[rows]]))]
+        split_of[pos[rows]], rank_of[pos[rows]] = s, np.arange(len(rows))
+
+    # 4️⃣  Stream kept rows → clean + tokenise in WORKERS processes → Arrow on disk (unpadded)
+    timings = {"clean": 0.0, "tokenise": 0.0}
+    t0 = time.perf_counter()
+    pathlib.Path(OUT_DIR).parent.mkdir(parents=True, exist_ok=True)
+    scratch = tempfile.mkdtemp(dir=pathlib.Path(OUT_DIR).parent)
+    try:
+        rows = Dataset.from_generator(
+            _rows,
+            gen_kwargs=dict(raw_csv=RAW_CSV, split_of=split_of, rank_of=rank_of,
+                            workers=WORKERS, model_name=MODEL_NAME, timings=timings),
+            cache_dir=scratch,
+        )
+        t_stream = time.perf_counter() - t0
+
+        # 5️⃣  Restore split order and save
+        t0 = time.perf_counter()
+        def part(split):
+            return (rows.filter(lambda s: [x == split for x in s], input_columns="split", batched=True)
+                        .sort("rank")
+                        .remove_columns(["split", "rank"]))
+        dset = DatasetDict({"train": part(0), "validation": part(1)})
+        dset.save_to_disk(OUT_DIR)
+        t_save = time.perf_counter() - t0
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    n = int(keep.sum())
+    print(f"\nrows/sec  labels {n_rows / t_labels:,.0f}"
+          + (f" | signatures {n_rows / max(t_sig, 1e-9):,.0f} per worker"
+             f" | dedup {len(labels) / max(t_dedup, 1e-9):,.0f}" if dedup else "")
+          + f" | clean {n / max(timings['clean'], 1e-9):,.0f} per worker"
+          f" | tokenise {n / max(timings['tokenise'], 1e-9):,.0f} per worker"
+          f" | stream (wall, {WORKERS} workers) {n / t_stream:,.0f}"
+          f" | split+save {n / t_save:,.0f}")
+    print(f"\n✅  Pre-tokenised dataset written to {OUT_DIR}")
+
 
-dset = dset.map(tok, batched=True).remove_columns(["text"])
+if __name__ == "__main__":
+    import argparse
 
-# 7️⃣  Save to disk
-pathlib.Path(OUT_DIR).parent.mkdir(parents=True, exist_ok=True)
-dset.save_to_disk(OUT_DIR)
-print(f"\n✅  Pre-tokenised dataset written to {OUT_DIR}")
+    ap = argparse.ArgumentParser(description="Clean, deduplicate, split and tokenise the tweet corpus")
+    ap.add_argument("--no-dedup", action="store_true", help="keep duplicate tweets (previous behaviour)")
+    ap.add_argument("--keep-near-dups", action="store_true",
+                    help="drop exact duplicates only; near-duplicates stay, each cluster on one side of the split")
+    ap.add_argument("--threshold", type=float, default=NEAR_DUP, help="MinHash Jaccard for near-duplicates")
+    args = ap.parse_args()
+    main(not args.no_dedup, args.keep_near_dups, args.threshold)
@@ -0,0 +1,99 @@
+# dynamicPadding.py ── length-grouped batches + per-batch padding for the Trainer
+import inspect
+
+from transformers import DataCollatorWithPadding, TrainingArguments
+
+MAX_LEN = 96          # same truncation length as dataCleansing.py
+
+
+def add_lengths(dset):
+    """Make sure every split has a `length` column (older datasets were stored padded)."""
+    def count(batch):
+        return {"length": [sum(m) for m in batch["attention_mask"]]}
+    return type(dset)({
+        name: split if "length" in split.column_names else split.map(count, batched=True)
+        for name, split in dset.items()
+    })
+
+
+def make_collator(tokenizer, dynamic=True):
+    """Pad to the longest row of each batch (rounded up to 8), or to MAX_LEN when dynamic=False."""
+    if dynamic:
+        return DataCollatorWithPadding(tokenizer, padding="longest", pad_to_multiple_of=8)
+    return DataCollatorWithPadding(tokenizer, padding="max_length", max_length=MAX_LEN)
+
+
+def length_grouping_args(column="length"):
+    """TrainingArguments kwargs that switch on the length-grouped train sampler."""
+    if "train_sampling_strategy" in inspect.signature(TrainingArguments).parameters:
+        return {"train_sampling_strategy": "group_by_length", "length_column_name": column}
+    return {"group_by_length": True, "length_column_name": column}      # transformers 4.x
+
+
+def by_length(split):
+    """Evaluation split sorted by length so neighbouring rows share a pad length (metrics are order-free)."""
+    return split.sort("length")
+
+
+if __name__ == "__main__":
+    # fixed-96 vs dynamic padding: eval + a short training run, samples/sec and wall-clock
+    import time
+
+    import torch
+    from datasets import load_from_disk
+    from transformers import (
+        AutoConfig,
+        AutoModelForSequenceClassification,
+        AutoTokenizer,
+        Trainer,
+    )
+
+    from baselineModelEvaluation import compute_metrics      # same metrics as the baseline
+
+    MODEL       = "ProsusAI/finbert"
+    DATA        = "data/finbert_tweets"
+    BATCH       = 32
+    TRAIN_STEPS = 50
+    EVAL_ROWS   = 2000
+
+    tokenizer = AutoTokenizer.from_pretrained(MODEL)
+    dataset = add_lengths(load_from_disk(DATA))
+    train = dataset["train"].select(range(min(len(dataset["train"]), TRAIN_STEPS * BATCH * 4)))
+    val = dataset["validation"].select(range(min(len(dataset["validation"]), EVAL_ROWS)))
+
+    def run(dynamic):
+        torch.manual_seed(0)
+        config = AutoConfig.from_pretrained(MODEL, num_labels=3,
+                                            problem_type="single_label_classification")
+        model = AutoModelForSequenceClassification.from_pretrained(MODEL, config=config)
+        args = TrainingArguments(
+            output_dir="runs/padding",
+            per_device_train_batch_size=BATCH,
+            per_device_eval_batch_size=BATCH,
+            max_steps=TRAIN_STEPS,
+            save_strategy="no",
+            report_to="none",
+            **(length_grouping_args() if dynamic else {}),
+        )
+        trainer = Trainer(model=model, args=args, train_dataset=train,
+                          eval_dataset=by_length(val) if dynamic else val,
+                          data_collator=make_collator(tokenizer, dynamic),
+                          compute_metrics=compute_metrics)
+        t0 = time.perf_counter()
+        ev = trainer.evaluate()                     # untrained weights → identical logits either way
+        t_eval = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        tr = trainer.train().metrics
+        t_train = time.perf_counter() - t0
+        return ev, t_eval, tr, t_train
+
+    results = {mode: run(mode == "dynamic") for mode in ("fixed", "dynamic")}
+    print(f"\n{'padding':<8} {'eval s':>8} {'eval samp/s':>12} {'train s':>8} {'train samp/s':>13}")
+    for mode, (ev, t_eval, tr, t_train) in results.items():
+        print(f"{mode:<8} {t_eval:8.1f} {ev['eval_samples_per_second']:12.1f}"
+              f" {t_train:8.1f} {tr['train_samples_per_second']:13.1f}")
+    keys = ("eval_accuracy", "eval_f1_micro", "eval_f1_macro")
+    same = all(results["fixed"][0][k] == results["dynamic"][0][k] for k in keys)
+    print("eval metrics identical:", same, {k: results["dynamic"][0][k] for k in keys})
+    speed = results["fixed"][3] / results["dynamic"][3]
+    print(f"training speed-up: {speed:.2f}×")
@@ -1,84 +1,259 @@
 # finetuning.py ────────────────────────────────────────────────────────
+import json, os, subprocess, sys, time
 import torch, evaluate
+import transformers
 from transformers import (
     AutoConfig,
     AutoModelForSequenceClassification,
+    AutoTokenizer,
     Trainer,
+    TrainerCallback,
     TrainingArguments,
     EarlyStoppingCallback,
 )
 from datasets import load_from_disk
+from dynamicPadding import add_lengths, by_length, length_grouping_args, make_collator
 
 # ─── paths & hyper-params ─────────────────────────────────────────────
 MODEL_NAME = "ProsusAI/finbert"
 DATA       = "data/finbert_tweets"
 OUT        = "model/finbert_finetuned"
 EPOCHS     = 3
-BATCH      = 16
+BATCH      = 16          # per worker; effective batch = BATCH × workers × accum
 LR         = 2e-5
+STATS      = "runs/finetune_scaling.jsonl"
 
-# ─── load tokenised dataset ───────────────────────────────────────────
-dataset = load_from_disk(DATA)
-
-# ─── configure model for SINGLE-LABEL classification ─────────────────
 label2id = {"negative": 0, "neutral": 1, "positive": 2}
 id2label = {v: k for k, v in label2id.items()}
 
-config = AutoConfig.from_pretrained(
-    MODEL_NAME,
-    num_labels=3,
-    problem_type="single_label_classification",
-    label2id=label2id,
-    id2label=id2label,
-)
 
-device = "cuda" if torch.cuda.is_available() else "cpu"
-
-model = AutoModelForSequenceClassification.from_pretrained(
-    MODEL_NAME,
-    config=config,
-).to(device)
-
-# ─── metrics (same as baseline) ───────────────────────────────────────
-metric_acc = evaluate.load("accuracy")
-metric_f1  = evaluate.load("f1")
-
-def compute_metrics(eval_pred):
-    logits, labels = eval_pred
-    preds = logits.argmax(-1)
-    return {
-        "accuracy": metric_acc.compute(predictions=preds, references=labels)["accuracy"],
-        "f1_micro": metric_f1.compute(predictions=preds, references=labels, average="micro")["f1"],
-        "f1_macro": metric_f1.compute(predictions=preds, references=labels, average="macro")["f1"],
-    }
-
-# ─── training arguments ──────────────────────────────────────────────
-args = TrainingArguments(
-    output_dir        = OUT,
-    eval_strategy = "epoch",
-    save_strategy       = "epoch",
-    save_total_limit    = 2,
-    learning_rate       = LR,
-    per_device_train_batch_size = BATCH,
-    per_device_eval_batch_size  = BATCH,
-    num_train_epochs    = EPOCHS,
-    weight_decay        = 0.01,
-    load_best_model_at_end = True,
-    metric_for_best_model  = "eval_loss",
-    logging_steps       = 50,
-    fp16                = torch.cuda.is_available(),  # ignored on M-series
-)
+# ─── CPU data-parallel helpers ────────────────────────────────────────
+def usable_cores():
+    return len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count()
 
-# ─── trainer ──────────────────────────────────────────────────────────
-trainer = Trainer(
-    model           = model,
-    args            = args,
-    train_dataset   = dataset["train"],
-    eval_dataset    = dataset["validation"],
-    compute_metrics = compute_metrics,
-    callbacks       = [EarlyStoppingCallback(early_stopping_patience=2)],
-)
 
-trainer.train()
-trainer.save_model(OUT)
-print(f"\n✅  Fine-tuned model saved to {OUT}")
+def world_size():
+    return int(os.environ.get("WORLD_SIZE", 1))      # set by torch.distributed.run
+
+
+def cpu_bf16_supported():
+    """True when oneDNN has native bf16 kernels (AVX512-BF16 / AMX); elsewhere bf16 is emulated and slower."""
+    try:
+        return bool(torch.ops.mkldnn._is_mkldnn_bf16_supported())
+    except (AttributeError, RuntimeError):
+        return False
+
+
+def tokens_seen_arg():
+    """Count non-padding tokens where the Trainer supports it (transformers 5), all tokens otherwise."""
+    return "non_padding" if int(transformers.__version__.split(".")[0]) >= 5 else True
+
+
+def ddp_args(use_cpu, workers):
+    """TrainingArguments kwargs for multi-process runs (gloo process group on CPU)."""
+    if workers == 1:
+        return {}
+    return {"ddp_backend": "gloo" if use_cpu else None, "ddp_find_unused_parameters": False}
+
+
+def launch(workers, argv, threads=None):
+    """Re-run this script as `workers` gloo processes on this machine (torch.distributed.run)."""
+    threads = threads or max(1, usable_cores() // workers)
+    env = {**os.environ, "OMP_NUM_THREADS": str(threads)}
+    cmd = [sys.executable, "-m", "torch.distributed.run", "--standalone", f"--nproc-per-node={workers}",
+           os.path.abspath(__file__), *argv, "--threads", str(threads)]
+    subprocess.run(cmd, env=env, check=True)
+
+
+class Throughput(TrainerCallback):
+    """
+    Training tokens/sec, summed over all workers.
+
+    Rates are printed for every logging window; the whole-run rate starts
+    after the first optimizer step so start-up and warm-up are not counted.
+    """
+
+    def __init__(self, stats_path=None, **run_info):
+        self.stats_path, self.run_info = stats_path, run_info
+        self.first = self.last = None
+
+    def on_step_end(self, args, state, control, **kw):
+        if self.first is None:
+            self.first = self.last = (time.perf_counter(), state.num_input_tokens_seen, state.global_step)
+
+    def on_log(self, args, state, control, logs=None, **kw):
+        if not state.is_world_process_zero or self.last is None or "loss" not in (logs or {}):
+            return
+        now, tokens = time.perf_counter(), state.num_input_tokens_seen
+        t, seen, _ = self.last
+        if now > t:
+            print(f"  step {state.global_step}: {(tokens - seen) / (now - t):,.0f} tokens/s")
+        self.last = (now, tokens, state.global_step)
+
+    def on_train_end(self, args, state, control, **kw):
+        if not state.is_world_process_zero or self.first is None:
+            return
+        t, seen, step = self.first
+        secs = time.perf_counter() - t
+        row = {**self.run_info, "steps": state.global_step - step,
+               "tokens": state.num_input_tokens_seen - seen, "seconds": round(secs, 3),
+               "tokens_per_sec": (state.num_input_tokens_seen - seen) / secs if secs > 0 else 0.0}
+        print(f"  {row['tokens_per_sec']:,.0f} tokens/s over {row['steps']} steps "
+              f"on {row['workers']} worker(s) × {row['threads']} thread(s)")
+        if self.stats_path:
+            os.makedirs(os.path.dirname(self.stats_path) or ".", exist_ok=True)
+            with open(self.stats_path, "a") as f:
+                f.write(json.dumps(row) + "\n")
+
+
+# ─── training (one process per worker) ────────────────────────────────
+def train(opts):
+    workers = world_size()
+    use_cpu = opts.cpu or workers > 1 or not torch.cuda.is_available()
+    threads = opts.threads or max(1, usable_cores() // workers)
+    if use_cpu:
+        torch.set_num_threads(threads)
+    bf16 = use_cpu and (opts.bf16 == "on" or (opts.bf16 == "auto" and cpu_bf16_supported()))
+
+    # ─── load tokenised dataset (unpadded – padded per batch) ─────────
+    dataset = add_lengths(load_from_disk(opts.data))
+    collator = make_collator(AutoTokenizer.from_pretrained(opts.model))   # pad to longest in batch
+
+    # ─── configure model for SINGLE-LABEL classification ─────────────
+    config = AutoConfig.from_pretrained(
+        opts.model,
+        num_labels=3,
+        problem_type="single_label_classification",
+        label2id=label2id,
+        id2label=id2label,
+    )
+
+    device = "cpu" if use_cpu else "cuda"
+
+    model = AutoModelForSequenceClassification.from_pretrained(
+        opts.model,
+        config=config,
+    ).to(device)
+
+    # ─── metrics (same as baseline) ───────────────────────────────────
+    # --max-steps is a throughput run: no evaluation, checkpoints or early stopping
+    bench = opts.max_steps > 0
+    if not bench:
+        metric_acc = evaluate.load("accuracy")
+        metric_f1  = evaluate.load("f1")
+
+    def compute_metrics(eval_pred):
+        logits, labels = eval_pred
+        preds = logits.argmax(-1)
+        return {
+            "accuracy": metric_acc.compute(predictions=preds, references=labels)["accuracy"],
+            "f1_micro": metric_f1.compute(predictions=preds, references=labels, average="micro")["f1"],
+            "f1_macro": metric_f1.compute(predictions=preds, references=labels, average="macro")["f1"],
+        }
+
+    # ─── training arguments ──────────────────────────────────────────
+    args = TrainingArguments(
+        output_dir        = opts.out,
+        eval_strategy = "no" if bench else "epoch",
+        save_strategy       = "no" if bench else "epoch",
+        save_total_limit    = 2,
+        learning_rate       = LR,
+        per_device_train_batch_size = opts.batch,
+        per_device_eval_batch_size  = opts.batch,
+        gradient_accumulation_steps = opts.accum,
+        num_train_epochs    = EPOCHS,
+        max_steps           = opts.max_steps if bench else -1,
+        weight_decay        = 0.01,
+        load_best_model_at_end = not bench,
+        metric_for_best_model  = "eval_loss",
+        logging_steps       = opts.logging_steps,
+        use_cpu             = use_cpu,
+        fp16                = not use_cpu,                # CUDA only
+        bf16                = bf16,                       # CPU autocast
+        include_num_input_tokens_seen = tokens_seen_arg(),
+        **ddp_args(use_cpu, workers),                     # gloo process group on CPU
+        **length_grouping_args(),                         # batches of similar-length tweets
+    )
+
+    throughput = Throughput(opts.stats, workers=workers, threads=threads, bf16=bf16,
+                            batch=opts.batch, accum=opts.accum)
+    if int(os.environ.get("RANK", 0)) == 0:
+        print(f"{workers} worker(s) × {threads} thread(s) on {device}, bf16={bf16}, "
+              f"effective batch {opts.batch * workers * opts.accum}")
+
+    # ─── trainer ──────────────────────────────────────────────────────
+    trainer = Trainer(
+        model           = model,
+        args            = args,
+        train_dataset   = dataset["train"],
+        eval_dataset    = None if bench else by_length(dataset["validation"]),
+        data_collator   = collator,
+        compute_metrics = None if bench else compute_metrics,
+        callbacks       = [throughput] + ([] if bench else [EarlyStoppingCallback(early_stopping_patience=2)]),
+    )
+
+    # The classification head returns a per-batch mean loss and ignores `num_items_in_batch`;
+    # without this the Trainer skips the 1/accum scaling and multiplies the loss by the world size.
+    trainer.model_accepts_loss_kwargs = False
+
+    trainer.train()
+    if not bench:
+        trainer.save_model(opts.out)                     # rank 0 writes; the others return
+        if trainer.is_world_process_zero():
+            print(f"\n✅  Fine-tuned model saved to {opts.out}")
+
+
+def forwarded(opts):
+    """Command-line options a launched worker needs (its rank and world size come from the launcher)."""
+    return ["--model", opts.model, "--data", opts.data, "--out", opts.out, "--batch", str(opts.batch),
+            "--accum", str(opts.accum), "--bf16", opts.bf16, "--logging-steps", str(opts.logging_steps)]
+
+
+def scaling(opts, argv):
+    """Same short run on 1, 2, 4, … workers; tokens/sec and efficiency vs. linear scaling."""
+    cores = usable_cores()
+    counts = opts.scaling or sorted({1, cores} | {2 ** i for i in range(1, cores.bit_length()) if 2 ** i < cores})
+    rows = []
+    for w in counts:
+        start = sum(1 for _ in open(opts.stats)) if os.path.exists(opts.stats) else 0
+        launch(w, argv + ["--max-steps", str(opts.max_steps or 30), "--stats", opts.stats])
+        with open(opts.stats) as f:
+            rows.append(json.loads(f.readlines()[start]))
+    base = rows[0]["tokens_per_sec"] / rows[0]["workers"]
+    print(f"\n{'workers':>7} {'threads':>7} {'tokens/s':>10} {'speed-up':>9} {'efficiency':>10}")
+    for r in rows:
+        tps = r["tokens_per_sec"]
+        print(f"{r['workers']:7d} {r['threads']:7d} {tps:10,.0f} {tps / rows[0]['tokens_per_sec']:9.2f}"
+              f" {tps / (base * r['workers']):10.0%}")
+    print(f"(appended to {opts.stats})")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Fine-tune FinBERT (single process, or CPU data-parallel)")
+    ap.add_argument("--model", default=MODEL_NAME)
+    ap.add_argument("--data", default=DATA)
+    ap.add_argument("--out", default=OUT)
+    ap.add_argument("--workers", type=int, default=1, help="CPU data-parallel processes (gloo)")
+    ap.add_argument("--threads", type=int, default=0, help="torch threads per worker (default: cores / workers)")
+    ap.add_argument("--batch", type=int, default=BATCH, help="per-worker batch size")
+    ap.add_argument("--accum", type=int, default=1, help="gradient accumulation steps")
+    ap.add_argument("--bf16", choices=("auto", "on", "off"), default="auto",
+                    help="bf16 autocast on CPU (auto: only with native AVX512-BF16 / AMX support)")
+    ap.add_argument("--cpu", action="store_true", help="train on CPU even if CUDA is available")
+    ap.add_argument("--logging-steps", type=int, default=50)
+    ap.add_argument("--max-steps", type=int, default=0, help="throughput run of N steps (no eval / save)")
+    ap.add_argument("--stats", default=None, help="append the run's tokens/sec to this JSONL")
+    ap.add_argument("--scaling", nargs="*", type=int, metavar="N",
+                    help=f"time --max-steps (default 30) on 1, 2, 4, … workers; rows go to {STATS}")
+    opts = ap.parse_args()
+
+    if opts.scaling is not None:
+        opts.stats = opts.stats or STATS
+        scaling(opts, forwarded(opts))
+    elif opts.workers > 1 and "LOCAL_RANK" not in os.environ:
+        launch(opts.workers, forwarded(opts) + (["--max-steps", str(opts.max_steps)] if opts.max_steps else [])
+               + (["--stats", opts.stats] if opts.stats else []), opts.threads or None)
+    else:
+        train(opts)
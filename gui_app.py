@@ -1,15 +1,30 @@
+import queue
+import threading
 import tkinter as tk
+from concurrent.futures import CancelledError, ThreadPoolExecutor
 from tkinter import ttk, messagebox
-from sentimentMapping import black_scholes_greeks, iv_adjust, get_sentiment_full
-from newspaper import Article
-import yfinance as yf
-from datetime import datetime
+import sentimentMapping
+from sentimentMapping import black_scholes_greeks, iv_adjust, get_sentiment_scores, warm_up
+from sentimentCache import SentimentCache
+from BlackScholes import as_utc, implied_vol
+from articleFetcher import ArticleFetcher
+from chainSnapshots import ChainSnapshots
+from datetime import datetime, timezone
 import finalAnalysis
+import tracing
+
+POLL_MS = 30
+STAGES = ["Fetching spot price…", "Solving implied volatility…", "Downloading article…",
+          "Scoring sentiment…", "Computing Greeks…"]
 
 class GreeksApp:
     def __init__(self, root):
         self.root = root
         root.title("Dynamic Greeks Calibrator")
+        self.sentiment_cache = SentimentCache(variant=sentimentMapping.BACKEND)
+        self.articles = ArticleFetcher(parse_workers=0)
+        self.chains = ChainSnapshots()    # spot / chains reused across calibrations until their TTL
+        warm_up(background=True)          # load FinBERT while the user fills in the form
         
         # Input fields
         ttk.Label(root, text="Company Ticker (e.g. AAPL)").grid(row=0, column=0, sticky=tk.W)
@@ -24,7 +39,7 @@ class GreeksApp:
         self.expiry_entry = ttk.Entry(root)
         self.expiry_entry.grid(row=2, column=1)
 
-        ttk.Label(root, text="Implied Volatility (e.g. 0.25)").grid(row=3, column=0, sticky=tk.W)
+        ttk.Label(root, text="Implied Volatility (blank = solve)").grid(row=3, column=0, sticky=tk.W)
         self.iv_entry = ttk.Entry(root)
         self.iv_entry.grid(row=3, column=1)
 
@@ -40,44 +55,202 @@ class GreeksApp:
         self.url_entry = ttk.Entry(root, width=40)
         self.url_entry.grid(row=6, column=1)
 
-        ttk.Button(root, text="Calibrate", command=self.calibrate).grid(row=7, column=0, columnspan=2, pady=10)
+        buttons = ttk.Frame(root)
+        buttons.grid(row=7, column=0, columnspan=2, pady=10)
+        self.calibrate_btn = ttk.Button(buttons, text="Calibrate", command=self.calibrate)
+        self.calibrate_btn.pack(side=tk.LEFT, padx=4)
+        self.cancel_btn = ttk.Button(buttons, text="Cancel", command=self.cancel, state="disabled")
+        self.cancel_btn.pack(side=tk.LEFT, padx=4)
+        self.refresh_btn = ttk.Button(buttons, text="Refresh data", command=self.clear_session)
+        self.refresh_btn.pack(side=tk.LEFT, padx=4)
+
+        # Progress per stage
+        self.progress = ttk.Progressbar(root, maximum=len(STAGES), length=300)
+        self.progress.grid(row=8, column=0, columnspan=2, padx=10)
+        self.status = ttk.Label(root, text="Ready")
+        self.status.grid(row=9, column=0, columnspan=2, pady=(2, 10))
 
+        # Background worker: one thread, so the model is never called concurrently
+        self.executor = ThreadPoolExecutor(1, thread_name_prefix="calibrate")
+        self.events = queue.Queue()       # worker → Tk thread, drained by _poll
+        self.session = {}                 # kind → {key: value}, see _cached
+        self.job = 0
+        self.in_flight = 0                # submitted jobs whose "done" message is not drained yet
+        self.cancel_event = None
+        root.protocol("WM_DELETE_WINDOW", self.close)
+        root.after(POLL_MS, self._poll)
+
+    # ── calibration (runs off the Tk thread) ─────────────────────────────
     def calibrate(self):
         try:
-            ticker = self.ticker_entry.get().strip()
-            K = float(self.strike_entry.get())
-            expiry = self.expiry_entry.get().strip()
-            iv = float(self.iv_entry.get())
-            r = float(self.r_entry.get())
-            call_put = self.cp_entry.get().strip().upper()
-            url = self.url_entry.get().strip()
-
-            # Get spot price
-            tkr = yf.Ticker(ticker)
-            S = tkr.history(period="1d")['Close'].iloc[0]
+            params = self._read_form()
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
+            return
+        self.job += 1
+        if self._all_cached(params):               # only strike / expiry / C-P changed
+            try:
+                result = self._run(params, threading.Event(), lambda *a: None)
+            except Exception as e:
+                self._idle("Failed")
+                messagebox.showerror("Error", str(e))
+                return
+            self._finish(result)
+            return
+        cancel = threading.Event()
+        self.cancel_event = cancel
+        self.calibrate_btn.state(["disabled"])
+        self.refresh_btn.state(["disabled"])       # the worker reads the session cache
+        self.cancel_btn.state(["!disabled"])
+        self.progress.configure(value=0)
+        job = self.job
+        report = lambda i, label: self.events.put(("progress", job, i, label))
+        self.in_flight += 1
+        fut = self.executor.submit(self._run, params, cancel, report)
+        fut.add_done_callback(lambda f: self.events.put(("done", job, f)))
+
+    def cancel(self):
+        """Drop the running calibration; its in-flight network / model call finishes but is ignored."""
+        if self.cancel_event is not None:
+            self.cancel_event.set()
+        self.job += 1
+        self._idle("Cancelled")
+
+    def _read_form(self):
+        iv_text = self.iv_entry.get().strip()
+        call_put = self.cp_entry.get().strip().upper()
+        if call_put not in ("C", "P"):
+            raise ValueError("Call or Put must be C or P")
+        return {
+            "ticker": self.ticker_entry.get().strip().upper(),
+            "K": float(self.strike_entry.get()),
+            "expiry": self.expiry_entry.get().strip(),
+            "iv": float(iv_text) if iv_text else None,
+            "r": float(self.r_entry.get()),
+            "call_put": call_put,
+            "url": self.url_entry.get().strip(),
+        }
+
+    def _cached(self, kind, key, compute):
+        """Session cache: each spot / chain / article / sentiment is fetched once per run of the app."""
+        store = self.session.setdefault(kind, {})
+        if key not in store:
+            store[key] = compute()
+        return store[key]
+
+    def _all_cached(self, p):
+        s = self.session
+        return (p["ticker"] in s.get("spot", {}) and p["url"] in s.get("sentiment", {})
+                and (p["iv"] is not None or (p["ticker"], p["expiry"]) in s.get("chain", {})))
+
+    def _run(self, p, cancel, report):
+        """spot → IV → article → sentiment → Greeks; `report(stage_index, label)` before each stage."""
+        def stage(i):
+            if cancel.is_set():
+                raise CancelledError()
+            report(i, STAGES[i])
+
+        with tracing.span("calibrate"):
+            stage(0)
+            with tracing.span("calibrate.spot"):
+                S = self._cached("spot", p["ticker"], lambda: self.chains.spot(p["ticker"]))
 
             # Time to expiry (fractional years)
-            secs_to_exp = (datetime.fromisoformat(expiry) - datetime.utcnow()).total_seconds()
+            secs_to_exp = (as_utc(p["expiry"]) - datetime.now(timezone.utc)).total_seconds()
             T = secs_to_exp / (365 * 24 * 3600)
 
-            # Get article text
-            art = Article(url)
-            art.download()
-            art.parse()
-            article = art.title + "\n" + art.text
+            # Implied volatility: typed in, or backed out of the quoted chain
+            stage(1)
+            with tracing.span("calibrate.iv", solved=p["iv"] is None):
+                iv = p["iv"] if p["iv"] is not None else self.solve_iv(
+                    p["ticker"], S, p["K"], T, p["r"], p["expiry"], p["call_put"])
 
-            # Sentiment
-            sent_id, conf = get_sentiment_full(article)
+            # Article text, then sentiment (also cached on disk by text + checkpoint)
+            scored = self.session.get("sentiment", {}).get(p["url"])
+            if scored is None:
+                stage(2)
+                with tracing.span("calibrate.article"):
+                    article = self._cached("article", p["url"], lambda: self.articles.fetch(p["url"]))
+                stage(3)
+                with tracing.span("calibrate.sentiment"):
+                    scored = self._cached("sentiment", p["url"], lambda: self.sentiment_cache.get_or_score(
+                        article, lambda text: get_sentiment_scores([text])[0]))
+            sent_id, conf, _ = scored
 
-            # Adjust IV
+            # Adjust IV and recompute Greeks
+            stage(4)
             iv_new = iv_adjust(iv, sent_id, conf)
+            with tracing.span("calibrate.greeks"):
+                greeks = black_scholes_greeks(S, p["K"], T, p["r"], iv_new, p["call_put"])
+            return iv, iv_new, greeks, p["call_put"]
 
-            # Recompute Greeks
-            greeks = black_scholes_greeks(S, K, T, r, iv_new, call_put)
+    # ── main-thread side ─────────────────────────────────────────────────
+    def _poll(self):
+        """Apply worker messages on the Tk thread; stale ones (cancelled jobs) are dropped."""
+        while True:
+            try:
+                kind, job, *rest = self.events.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "done":
+                self.in_flight -= 1
+                if self.in_flight == 0:               # cancelled workers have stopped touching the session
+                    self.refresh_btn.state(["!disabled"])
+            if job != self.job:
+                continue
+            if kind == "progress":
+                i, label = rest
+                self.progress.configure(value=i)
+                self.status.configure(text=label)
+            else:
+                fut = rest[0]
+                try:
+                    self._finish(fut.result())
+                except CancelledError:
+                    self._idle("Cancelled")
+                except Exception as e:
+                    self._idle("Failed")
+                    messagebox.showerror("Error", str(e))
+        self.root.after(POLL_MS, self._poll)
 
-            self.show_results(iv, iv_new, greeks, call_put)
-        except Exception as e:
-            messagebox.showerror("Error", str(e))
+    def _finish(self, result):
+        self._idle("Done")
+        self.progress.configure(value=len(STAGES))
+        self.show_results(*result)
+
+    def _idle(self, text):
+        self.cancel_event = None
+        self.status.configure(text=text)
+        self.calibrate_btn.state(["!disabled"])
+        if self.in_flight == 0:                       # else re-enabled once the last job is drained
+            self.refresh_btn.state(["!disabled"])
+        self.cancel_btn.state(["disabled"])
+
+    def clear_session(self):
+        self.session.clear()
+        self.chains.clear()
+        self.status.configure(text="Session cache cleared")
+
+    def close(self):
+        self.job += 1
+        if self.cancel_event is not None:
+            self.cancel_event.set()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.root.destroy()
+
+    def solve_iv(self, ticker, S, K, T, r, expiry, call_put):
+        chain = self._cached("chain", (ticker, expiry), lambda: self.chains.chain(ticker, expiry))
+        side = chain.calls if call_put == "C" else chain.puts
+        row = side.loc[side["strike"] == K]
+        if row.empty:
+            raise ValueError(f"No {call_put} contract at strike {K} for {expiry}")
+        row = row.iloc[0]
+        price = (row.bid + row.ask) / 2 if row.bid > 0 and row.ask > 0 else row.lastPrice
+        solved = implied_vol(price, S, K, T, r, call_put)
+        if not solved["converged"]:
+            raise ValueError(f"Could not solve IV from price {price:.2f}"
+                             + (" (outside arbitrage bounds)" if solved["no_solution"] else ""))
+        return float(solved["iv"])
 
     def show_results(self, iv_old, iv_new, greeks, call_put):
         result_win = tk.Toplevel(self.root)
@@ -90,6 +263,12 @@ class GreeksApp:
         ttk.Button(result_win, text="Close", command=result_win.destroy).pack(pady=10)
 
 if __name__ == "__main__":
-    root = tk.Tk()
-    app = GreeksApp(root)
-    root.mainloop() 
\ No newline at end of file
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Dynamic Greeks Calibrator")
+    tracing.add_arguments(ap)
+    args = ap.parse_args()
+    with tracing.from_args(args):         # breakdown / exports are written when the window closes
+        root = tk.Tk()
+        app = GreeksApp(root)
+        root.mainloop() 
\ No newline at end of file
@@ -0,0 +1,38 @@
+# importBenchmark.py  ── keeps the analysis / Greeks layer cheap to import
+import subprocess
+import sys
+
+MODULES = ["BlackScholes", "finalAnalysis", "sentimentMapping"]
+HEAVY   = ["torch", "transformers", "yfinance", "newspaper"]   # must stay lazy
+BUDGET  = 1.0      # seconds, best of RUNS in a fresh interpreter
+RUNS    = 5
+
+PROBE = """
+import sys, time
+t = time.perf_counter()
+{imports}
+dt = time.perf_counter() - t
+print(dt, ",".join(m for m in {heavy!r} if m in sys.modules))
+"""
+
+
+def time_import(modules=MODULES):
+    """Best-of-RUNS wall time to import `modules`, plus any heavy deps they pulled in."""
+    code = PROBE.format(imports="\n".join(f"import {m}" for m in modules), heavy=HEAVY)
+    best, leaked = float("inf"), ""
+    for _ in range(RUNS):
+        out = subprocess.run([sys.executable, "-c", code], capture_output=True,
+                             text=True, check=True).stdout.split()
+        best = min(best, float(out[0]))
+        leaked = out[1] if len(out) > 1 else ""
+    return best, leaked
+
+
+if __name__ == "__main__":
+    seconds, leaked = time_import()
+    print(f"import {', '.join(MODULES)}: {seconds * 1000:.0f} ms (budget {BUDGET * 1000:.0f} ms)")
+    if leaked:
+        print(f"✖  heavy modules imported eagerly: {leaked}")
+    if seconds > BUDGET or leaked:
+        sys.exit(1)
+    print("✔  within budget")
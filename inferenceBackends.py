@@ -0,0 +1,202 @@
+# inferenceBackends.py  ── eager / int8-quantized / ONNX Runtime FinBERT on CPU
+import os
+from pathlib import Path
+
+import numpy as np
+
+MODEL_DIR  = "model/finbert_finetuned"
+TOKENIZER  = "ProsusAI/finbert"        # the checkpoint is saved without its tokenizer
+QUANT_FILE = "quantized_int8.pt"
+ONNX_FILE  = "onnx/model.onnx"
+BACKENDS   = ("eager", "quantized", "onnx")
+INPUTS     = ("input_ids", "attention_mask", "token_type_ids")
+
+
+class EagerBackend:
+    """
+    Full-precision PyTorch model.
+
+    Every backend takes a batch of int64 numpy arrays keyed by INPUTS and
+    returns float32 logits as a numpy array, and exposes the model
+    `config` (id2label / label2id / num_labels).
+    """
+
+    name = "eager"
+
+    def __init__(self, model_dir=MODEL_DIR):
+        from transformers import AutoConfig
+        self.config = AutoConfig.from_pretrained(model_dir)
+        self.model = self._load(model_dir).eval()
+
+    def _load(self, model_dir):
+        from transformers import AutoModelForSequenceClassification
+        return AutoModelForSequenceClassification.from_pretrained(model_dir)
+
+    def __call__(self, batch):
+        import torch
+        with torch.inference_mode():
+            inputs = {k: torch.from_numpy(batch[k]) for k in INPUTS if k in batch}
+            return self.model(**inputs).logits.float().numpy()
+
+
+class QuantizedBackend(EagerBackend):
+    """Linear layers dynamically quantized to int8 (exported file, or quantized on load)."""
+
+    name = "quantized"
+
+    def _load(self, model_dir):
+        import torch
+        path = Path(model_dir) / QUANT_FILE
+        if path.exists():
+            return torch.load(path, weights_only=False)
+        return quantize(super()._load(model_dir))
+
+
+class OnnxBackend:
+    """ONNX Runtime session over the exported graph (needs `onnxruntime`)."""
+
+    name = "onnx"
+
+    def __init__(self, model_dir=MODEL_DIR, threads=None):
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise ImportError("The onnx backend needs `pip install onnxruntime`") from e
+        from transformers import AutoConfig
+
+        path = Path(model_dir) / ONNX_FILE
+        if not path.exists():
+            raise FileNotFoundError(f"{path} not found – run `python inferenceBackends.py export` first")
+        self.config = AutoConfig.from_pretrained(model_dir)
+        opts = ort.SessionOptions()
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        opts.intra_op_num_threads = threads or os.cpu_count() or 1
+        self.session = ort.InferenceSession(str(path), opts, providers=["CPUExecutionProvider"])
+        self.inputs = [i.name for i in self.session.get_inputs()]
+
+    def __call__(self, batch):
+        zeros = np.zeros_like(batch["input_ids"])               # e.g. no token_type_ids
+        return self.session.run(["logits"], {k: batch.get(k, zeros) for k in self.inputs})[0]
+
+
+def load_backend(name="eager", model_dir=MODEL_DIR):
+    classes = {"eager": EagerBackend, "quantized": QuantizedBackend, "onnx": OnnxBackend}
+    if name not in classes:
+        raise ValueError(f"Unknown backend {name!r}; choose one of {', '.join(BACKENDS)}")
+    return classes[name](model_dir)
+
+
+def quantize(model):
+    import torch
+    return torch.ao.quantization.quantize_dynamic(model.eval(), {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def export(model_dir=MODEL_DIR, opset=17):
+    """Write the int8 model and the ONNX graph next to the checkpoint."""
+    import torch
+    from transformers import AutoModelForSequenceClassification
+
+    model = AutoModelForSequenceClassification.from_pretrained(model_dir).eval()
+    model.config.return_dict = False
+
+    onnx_path = Path(model_dir) / ONNX_FILE
+    onnx_path.parent.mkdir(parents=True, exist_ok=True)
+    dummy = tuple(torch.ones((2, 16), dtype=torch.long) for _ in INPUTS)
+    axes = {k: {0: "batch", 1: "sequence"} for k in INPUTS}
+    axes["logits"] = {0: "batch"}
+    torch.onnx.export(model, dummy, str(onnx_path), input_names=list(INPUTS),
+                      output_names=["logits"], dynamic_axes=axes, opset_version=opset)
+    print(f"✔  ONNX graph → {onnx_path}")
+
+    model.config.return_dict = True
+    quant_path = Path(model_dir) / QUANT_FILE
+    torch.save(quantize(model), quant_path)
+    print(f"✔  int8 model → {quant_path}")
+
+
+# ── parity harness ───────────────────────────────────────────────────────
+def _batches(split, tokenizer, batch_size):
+    split = split.sort("length")
+    for i in range(0, len(split), batch_size):
+        rows = split[i : i + batch_size]
+        feats = [{k: rows[k][j] for k in INPUTS if k in rows} for j in range(len(rows["input_ids"]))]
+        enc = tokenizer.pad(feats, return_tensors="np")
+        yield {k: enc[k].astype(np.int64) for k in INPUTS if k in enc}, np.asarray(rows["label"])
+
+
+def parity(backends=BACKENDS, model_dir=MODEL_DIR, data="data/finbert_tweets",
+           batch_size=32, limit=None, latency_runs=50, tol=0.005):
+    """
+    Score the validation split with each backend and compare against eager.
+
+    Reports the baselineModelEvaluation metrics, their drift from eager,
+    the largest logit difference, single-row p50 latency and batched
+    throughput.  A backend passes when every metric is within `tol`.
+    """
+    import time
+
+    from datasets import load_from_disk
+    from transformers import AutoTokenizer
+
+    from baselineModelEvaluation import compute_metrics
+    from dynamicPadding import add_lengths
+
+    split = add_lengths(load_from_disk(data))["validation"]
+    if limit:
+        split = split.select(range(min(limit, len(split))))
+    tokenizer = AutoTokenizer.from_pretrained(TOKENIZER)
+    batches = list(_batches(split, tokenizer, batch_size))
+    single = {k: v[:1] for k, v in batches[len(batches) // 2][0].items()}
+
+    report, ref = {}, None
+    for name in backends:
+        try:
+            backend = load_backend(name, model_dir)
+        except (ImportError, FileNotFoundError) as e:
+            print(f"✖  {name}: {e}")
+            continue
+        backend(batches[0][0])                                   # warm-up
+        t0 = time.perf_counter()
+        logits = np.concatenate([backend(b) for b, _ in batches])
+        elapsed = time.perf_counter() - t0
+        labels = np.concatenate([y for _, y in batches])
+        lat = []
+        for _ in range(latency_runs):
+            t = time.perf_counter()
+            backend(single)
+            lat.append(time.perf_counter() - t)
+        metrics = compute_metrics((logits, labels))
+        if ref is None:
+            ref = (logits, metrics)
+        report[name] = {
+            **metrics,
+            "drift": max(abs(metrics[k] - ref[1][k]) for k in metrics),
+            "max_logit_diff": float(np.abs(logits - ref[0]).max()),
+            "p50_ms": 1000 * float(np.median(lat)),
+            "rows_per_s": len(labels) / elapsed,
+        }
+
+    print(f"\n{'backend':<10} {'acc':>7} {'f1_mi':>7} {'f1_ma':>7} {'drift':>7}"
+          f" {'Δlogit':>8} {'p50 ms':>8} {'rows/s':>9}  ok")
+    for name, r in report.items():
+        print(f"{name:<10} {r['accuracy']:7.4f} {r['f1_micro']:7.4f} {r['f1_macro']:7.4f}"
+              f" {r['drift']:7.4f} {r['max_logit_diff']:8.4f} {r['p50_ms']:8.2f}"
+              f" {r['rows_per_s']:9.1f}  {'✔' if r['drift'] <= tol else '✖'}")
+    return report
+
+
+if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Export / compare CPU inference backends")
+    ap.add_argument("command", choices=["export", "parity"])
+    ap.add_argument("--model-dir", default=MODEL_DIR)
+    ap.add_argument("--data", default="data/finbert_tweets")
+    ap.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=BACKENDS)
+    ap.add_argument("--limit", type=int, help="only score the first N validation rows")
+    args = ap.parse_args()
+
+    if args.command == "export":
+        export(args.model_dir)
+    else:
+        parity(args.backends, args.model_dir, args.data, limit=args.limit)
@@ -0,0 +1,199 @@
+# marketData.py  ── concurrent, rate-limited OHLCV downloads
+import random
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+class TokenBucket:
+    """
+    Classic token bucket: `rate` requests per second, bursts up to `capacity`.
+
+    `acquire` blocks the calling thread until a token is available, so a
+    pool of workers sharing one bucket never exceeds the provider's limit.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity or max(rate, 1))
+        self._tokens = self.capacity
+        self._stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, n=1):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._stamp) * self.rate)
+                self._stamp = now
+                if self._tokens >= n:
+                    self._tokens -= n
+                    return
+                wait = (n - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+# ── data sources ─────────────────────────────────────────────────────────
+# A source exposes `batch_size` (max tickers per request) and
+# `download(tickers, start, end=None) -> {ticker: DataFrame}`; tickers it
+# could not serve are simply missing from the result.
+
+class YFinanceSource:
+    """Yahoo Finance through yfinance's multi-ticker `download`."""
+
+    batch_size = 20
+
+    def download(self, tickers, start, end=None):
+        import yfinance as yf
+
+        df = yf.download(
+            tickers=list(tickers),
+            start=start,
+            end=end,
+            group_by="ticker",
+            auto_adjust=True,
+            progress=False,
+            threads=False,          # concurrency is handled by download_all
+        )
+        out = {}
+        for t in tickers:
+            if isinstance(df.columns, pd.MultiIndex):
+                if t not in df.columns.get_level_values(0):
+                    continue
+                sub = df[t]
+            else:
+                sub = df
+            sub = sub.dropna(how="all")
+            if not sub.empty:
+                out[t] = sub
+        return out
+
+
+class StubSource:
+    """
+    Offline stand-in that serves canned (or synthetic random-walk) OHLCV frames.
+
+    `latency` seconds are slept per request and each ticker fails with
+    probability `fail_rate` (raising ConnectionError if the whole request
+    fails), which is enough to exercise retries and the rate limiter.
+    """
+
+    def __init__(self, frames=None, latency=0.05, fail_rate=0.0, batch_size=20, seed=0):
+        self.frames = frames or {}
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.batch_size = batch_size
+        self.calls = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def download(self, tickers, start, end=None):
+        with self._lock:
+            self.calls += 1
+            fails = {t for t in tickers if self._rng.random() < self.fail_rate}
+        time.sleep(self.latency)
+        if fails and len(fails) == len(tickers):
+            raise ConnectionError(f"stub failure for {', '.join(sorted(fails))}")
+        out = {}
+        for t in tickers:
+            if t in fails:
+                continue
+            df = self.frames.get(t)
+            if df is None:
+                df = synthetic_ohlcv(t, start, end)
+            out[t] = df.loc[start:end] if end else df.loc[start:]
+        return out
+
+
+def synthetic_ohlcv(ticker, start, end=None):
+    """Deterministic business-day random walk shaped like a yfinance frame."""
+    days = np.arange(np.datetime64(start, "D"),
+                     np.datetime64(end or pd.Timestamp.today().normalize(), "D") + 1)
+    idx = pd.DatetimeIndex(days[np.is_busday(days)].astype("datetime64[ns]"), name="Date")
+    rng = np.random.default_rng(zlib.crc32(ticker.encode()))
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, len(idx))))
+    spread = close * rng.uniform(0, 0.01, len(idx))
+    return pd.DataFrame({
+        "Open": close + rng.normal(0, 1, len(idx)) * spread,
+        "High": close + spread,
+        "Low": close - spread,
+        "Close": close,
+        "Volume": rng.integers(1_000_000, 50_000_000, len(idx)),
+    }, index=idx)
+
+
+# ── downloader ───────────────────────────────────────────────────────────
+def download_all(tickers, source=None, start="2015-04-21", end=None, workers=8,
+                 rate=4.0, retries=3, backoff=0.5, progress=print):
+    """
+    Download every ticker through a bounded worker pool.
+
+    Tickers are grouped into batches of `source.batch_size`; each request
+    takes a token from a shared bucket (`rate` requests/second).  Tickers
+    missing from a batch response are retried one at a time with
+    exponential backoff (`backoff * 2**attempt`, jittered) up to `retries`
+    times.
+
+    Returns:
+    (frames, failed) - {ticker: DataFrame} and {ticker: last error message}
+    """
+    source = source or YFinanceSource()
+    tickers = list(dict.fromkeys(tickers))
+    bucket = TokenBucket(rate)
+    size = max(1, getattr(source, "batch_size", 1))
+    batches = [tickers[i : i + size] for i in range(0, len(tickers), size)]
+
+    frames, failed = {}, {}
+    lock = threading.Lock()
+
+    def request(group, errors):
+        bucket.acquire()
+        try:
+            got = source.download(group, start, end)
+        except Exception as e:
+            errors.update({t: str(e) for t in group})
+            return
+        for t in group:
+            if t in got and not got[t].empty:
+                with lock:
+                    frames[t] = got[t]
+                errors.pop(t, None)
+            else:
+                errors.setdefault(t, "no data")
+
+    def fetch(batch):
+        errors = {}
+        request(batch, errors)
+        for t in batch:
+            for attempt in range(retries):
+                if t in frames:
+                    break
+                time.sleep(backoff * 2 ** attempt * (0.5 + random.random()))
+                request([t], errors)
+        return errors
+
+    done = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(fetch, b): b for b in batches}
+        for fut in as_completed(futures):
+            batch, errors = futures[fut], fut.result()
+            for t in batch:
+                if t not in frames:
+                    failed[t] = errors.get(t, "no data")
+            done += len(batch)
+            if progress:
+                progress(f"[{done}/{len(tickers)}] {len(frames)} ok, {len(failed)} failed")
+    return frames, failed
+
+
+if __name__ == "__main__":
+    # offline smoke run: 100 synthetic tickers, 50 ms latency, 10 % failures
+    names = [f"T{i:03d}" for i in range(100)]
+    t0 = time.perf_counter()
+    frames, failed = download_all(names, StubSource(latency=0.05, fail_rate=0.1),
+                                  start="2015-04-21", rate=20, backoff=0.05,
+                                  progress=None)
+    print(f"{len(frames)} frames, {len(failed)} failed in {time.perf_counter() - t0:.2f}s")
@@ -0,0 +1,82 @@
+# modelRegistry.py  ── lazily loaded, shared model objects
+import threading
+
+
+class ModelRegistry:
+    """
+    Named loaders whose results are built on first use and then shared.
+
+    `get` is safe to call from several threads: a loader runs at most once,
+    and callers asking for an object that is still loading wait for it
+    rather than loading a second copy.  Loaders may themselves `get` other
+    entries (e.g. a pipeline that needs the tokenizer).
+    """
+
+    def __init__(self):
+        self._loaders = {}
+        self._warmers = {}
+        self._objects = {}
+        self._warmed = set()
+        self._lock = threading.RLock()
+
+    def register(self, name, loader, warm=None):
+        """Register `loader()` under `name`; `warm(obj)` runs once on warm_up."""
+        with self._lock:
+            self._loaders[name] = loader
+            self._warmers[name] = warm
+            self._objects.pop(name, None)
+            self._warmed.discard(name)
+
+    def get(self, name):
+        obj = self._objects.get(name)
+        if obj is not None:
+            return obj
+        with self._lock:
+            if name not in self._objects:
+                if name not in self._loaders:
+                    raise KeyError(f"No model registered under {name!r}")
+                self._objects[name] = self._loaders[name]()
+            return self._objects[name]
+
+    def is_loaded(self, name):
+        return name in self._objects
+
+    def warm_up(self, *names, background=False):
+        """
+        Load `names` (default: everything registered) and run their warm hooks.
+
+        With background=True the work happens on a daemon thread, which is
+        returned so callers can join it.
+        """
+        names = names or tuple(self._loaders)
+
+        def run():
+            for name in names:
+                obj = self.get(name)
+                with self._lock:
+                    if name in self._warmed:
+                        continue
+                    warm = self._warmers.get(name)
+                    if warm is not None:
+                        warm(obj)
+                    self._warmed.add(name)
+
+        if not background:
+            run()
+            return None
+        t = threading.Thread(target=run, name="model-warm-up", daemon=True)
+        t.start()
+        return t
+
+    def reset(self, name=None):
+        """Forget loaded objects (all, or just `name`) so the next get reloads."""
+        with self._lock:
+            if name is None:
+                self._objects.clear()
+                self._warmed.clear()
+            else:
+                self._objects.pop(name, None)
+                self._warmed.discard(name)
+
+
+registry = ModelRegistry()
@@ -0,0 +1,253 @@
+# paramSweep.py  ── parallel search over the iv_adjust coefficients
+import hashlib
+import itertools
+import json
+import os
+import time
+from multiprocessing import Pool
+from multiprocessing.shared_memory import SharedMemory
+from pathlib import Path
+
+import numpy as np
+
+from sentimentMapping import iv_adjust_array
+
+FIELDS  = ("sent_id", "confidence", "base_iv", "realized_vol")
+PARAMS  = ("k_neg", "k_pos", "gamma", "c_min")
+METRICS = ("mae", "rmse")
+
+
+# ── dataset ──────────────────────────────────────────────────────────────
+def load_dataset(path):
+    """(4, n) float64 matrix of FIELDS from a .npz (one array per field) or a CSV with those columns."""
+    if str(path).endswith(".npz"):
+        with np.load(path) as z:
+            return np.stack([z[f].astype(np.float64) for f in FIELDS])
+    import pandas as pd
+    df = pd.read_csv(path, usecols=list(FIELDS))
+    return df[list(FIELDS)].to_numpy(np.float64).T.copy()
+
+
+def dataset_from_backtest(prep):
+    """Flatten backtest.prepare() output to the ticker-days that have a full forward window."""
+    cols = [prep["sent"], prep["conf"], prep["base_iv"], prep["fwd_rv"]]
+    ok = ~np.isnan(prep["base_iv"]) & ~np.isnan(prep["fwd_rv"])
+    return np.stack([np.nan_to_num(c[ok], nan=-1.0) if i < 2 else c[ok] for i, c in enumerate(cols)])
+
+
+class SharedDataset:
+    """
+    The dataset copied once into a named shared-memory block.
+
+    Columns are reordered so the rows with a bearish / bullish signal come
+    first; workers attach by name (see _init_worker) and take plain slices
+    of the same pages, so nothing but the block name is pickled per worker
+    and no worker holds a private copy of the rows.
+    """
+
+    def __init__(self, data):
+        data = np.asarray(data, dtype=np.float64)
+        signal = (data[0] == 0) | (data[0] == 2)
+        self.shape, self.n_signal = data.shape, int(signal.sum())
+        self.shm = SharedMemory(create=True, size=data.nbytes)
+        block = np.ndarray(self.shape, np.float64, self.shm.buf)
+        block[:, :self.n_signal] = data[:, signal]
+        block[:, self.n_signal:] = data[:, ~signal]
+
+    @property
+    def handle(self):
+        return self.shm.name, self.shape, self.n_signal
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+
+# ── objective (runs in the workers) ──────────────────────────────────────
+_W = {}
+
+
+def _init_worker(handle, metric):
+    name, shape, k = handle
+    shm = SharedMemory(name=name)
+    sent, conf, base, real = np.ndarray(shape, np.float64, shm.buf)
+    base_err = base[k:] - real[k:]                           # rows the rule never touches
+    _W.update(
+        shm=shm, metric=metric, n=shape[1],                  # views into the shared block
+        sent=sent[:k], conf=conf[:k], base=base[:k], real=real[:k],
+        fixed=np.abs(base_err).sum() if metric == "mae" else (base_err * base_err).sum(),
+    )
+
+
+def _loss(k_neg, k_pos, gamma, c_min):
+    w = _W
+    shaped = np.where(w["conf"] >= c_min, w["conf"] ** gamma, 0.0)
+    err = iv_adjust_array(w["base"], w["sent"], shaped, k_neg, k_pos) - w["real"]
+    if w["metric"] == "mae":
+        return (w["fixed"] + np.abs(err).sum()) / w["n"]
+    return float(np.sqrt((w["fixed"] + err @ err) / w["n"]))
+
+
+def _evaluate_chunk(points):
+    return [(p, float(_loss(*p))) for p in points]
+
+
+# ── driver ───────────────────────────────────────────────────────────────
+def _key(p):
+    return tuple(round(float(x), 10) for x in p)
+
+
+def fingerprint(data, metric):
+    """Tags checkpoint rows so a resumed sweep only reuses losses from the same data and metric."""
+    return hashlib.sha1(np.ascontiguousarray(data).tobytes()).hexdigest()[:16] + ":" + metric
+
+
+def load_checkpoint(path, tag):
+    done = {}
+    if path and Path(path).exists():
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    row = json.loads(line)
+                    if row.get("tag") == tag:
+                        done[_key(row[k] for k in PARAMS)] = row["loss"]
+    return done
+
+
+def grid(k_neg, k_pos, gammas=(1.0,), c_mins=(0.0,)):
+    """Cartesian product of linspace(lo, hi, n) ranges for k_neg / k_pos and the shaping lists."""
+    return [_key(p) for p in itertools.product(np.linspace(*k_neg), np.linspace(*k_pos), gammas, c_mins)]
+
+
+def sweep(data, points, workers=None, metric="mae", checkpoint=None, chunk=8, progress=print):
+    """
+    Loss of every parameter point, evaluated across a process pool.
+
+    Points already in `checkpoint` (a JSONL file) for the same data and
+    metric are not recomputed; each finished chunk is appended to it, so
+    an interrupted sweep resumes where it stopped.  Returns {(k_neg, k_pos, gamma, c_min): loss}.
+    """
+    tag = fingerprint(data, metric) if checkpoint else None
+    done = load_checkpoint(checkpoint, tag)
+    todo = [p for p in dict.fromkeys(map(_key, points)) if p not in done]
+    if todo:
+        shared = SharedDataset(data)
+        chunks = [todo[i : i + chunk] for i in range(0, len(todo), chunk)]
+        out = open(checkpoint, "a") if checkpoint else None
+        t0 = time.perf_counter()
+        try:
+            with Pool(workers or os.cpu_count(), _init_worker, (shared.handle, metric)) as pool:
+                for i, results in enumerate(pool.imap_unordered(_evaluate_chunk, chunks), 1):
+                    for p, loss in results:
+                        done[p] = loss
+                        if out:
+                            out.write(json.dumps({**dict(zip(PARAMS, p)), "loss": loss, "tag": tag}) + "\n")
+                    if out:
+                        out.flush()
+                    if progress and i % max(1, len(chunks) // 10) == 0:
+                        progress(f"  {i}/{len(chunks)} chunks  {time.perf_counter() - t0:.1f}s")
+        finally:
+            if out:
+                out.close()
+            shared.close()
+    return {p: done[p] for p in map(_key, points)}
+
+
+def refine(data, k_neg=(0.0, 1.0, 21), k_pos=(0.0, 1.0, 21), gammas=(1.0,), c_mins=(0.0,),
+           rounds=3, zoom=4.0, **sweep_kw):
+    """
+    Coarse grid, then `rounds` finer grids centred on the best point so far.
+
+    Each round shrinks the k_neg / k_pos span by `zoom` (clipped at 0) and
+    keeps the same number of steps; gamma / c_min are fixed to the best
+    values from the first round.
+    """
+    results = sweep(data, grid(k_neg, k_pos, gammas, c_mins), **sweep_kw)
+    best = min(results, key=results.get)
+    spans = [(k_neg[1] - k_neg[0]) / zoom, (k_pos[1] - k_pos[0]) / zoom]
+    for _ in range(rounds):
+        ranges = [(max(0.0, best[i] - spans[i] / 2), best[i] + spans[i] / 2, n)
+                  for i, n in ((0, k_neg[2]), (1, k_pos[2]))]
+        results.update(sweep(data, grid(*ranges, (best[2],), (best[3],)), **sweep_kw))
+        best = min(results, key=results.get)
+        spans = [s / zoom for s in spans]
+    return results, best
+
+
+def scaling(data, points, max_workers=None, metric="mae"):
+    """Wall time of the same sweep on 1, 2, 4, … workers (no checkpoint)."""
+    max_workers = max_workers or os.cpu_count()
+    counts = sorted({1, max_workers} | {2 ** i for i in range(1, max_workers.bit_length()) if 2 ** i < max_workers})
+    base = None
+    print(f"\n{'workers':>7} {'wall s':>8} {'speed-up':>9} {'efficiency':>10}")
+    for w in counts:
+        t0 = time.perf_counter()
+        sweep(data, points, w, metric, progress=None)
+        wall = time.perf_counter() - t0
+        base = base or wall
+        print(f"{w:7d} {wall:8.2f} {base / wall:9.2f} {base / wall / w:10.0%}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Search (k_neg, k_pos[, gamma, c_min]) for iv_adjust")
+    src = ap.add_mutually_exclusive_group(required=True)
+    src.add_argument("--data", help=".npz or CSV with sent_id, confidence, base_iv, realized_vol")
+    src.add_argument("--sentiment", help="sentiment events; dataset built with backtest.prepare from --store")
+    src.add_argument("--synthetic", action="store_true", help="backtest's synthetic 100 × 10-year universe")
+    ap.add_argument("--store", default="data/qqq_dfs")
+    ap.add_argument("--k-neg", nargs=3, type=float, default=[0.0, 1.0, 21], metavar=("LO", "HI", "N"))
+    ap.add_argument("--k-pos", nargs=3, type=float, default=[0.0, 1.0, 21], metavar=("LO", "HI", "N"))
+    ap.add_argument("--gamma", nargs="+", type=float, default=[1.0], help="confidence exponents (conf ** gamma)")
+    ap.add_argument("--c-min", nargs="+", type=float, default=[0.0], help="ignore readings below this confidence")
+    ap.add_argument("--refine", type=int, default=0, help="zoom-in rounds around the best grid point")
+    ap.add_argument("--metric", choices=METRICS, default="mae")
+    ap.add_argument("--workers", type=int, default=os.cpu_count())
+    ap.add_argument("--checkpoint", default="runs/param_sweep.jsonl", help="'' disables checkpointing")
+    ap.add_argument("--scaling", action="store_true", help="time the grid on 1..N workers instead")
+    args = ap.parse_args()
+    k_neg = (*args.k_neg[:2], int(args.k_neg[2]))
+    k_pos = (*args.k_pos[:2], int(args.k_pos[2]))
+
+    if args.data:
+        data = load_dataset(args.data)
+    else:
+        import backtest
+        if args.synthetic:
+            import pandas as pd
+
+            from marketData import synthetic_ohlcv
+            names = [f"T{i:03d}" for i in range(100)]
+            closes = pd.DataFrame({t: synthetic_ohlcv(t, "2015-04-21", "2025-04-21")["Close"] for t in names})
+            events = backtest.synthetic_sentiment(names, "2015-04-21", "2025-04-21")
+        else:
+            from priceStore import PriceStore
+            closes = PriceStore(args.store).panel(column="Close")
+            events = backtest.load_sentiment(args.sentiment)
+        data = dataset_from_backtest(backtest.prepare(closes, events))
+    print(f"dataset: {data.shape[1]} rows, {np.isin(data[0], (0, 2)).sum()} with a bearish/bullish signal")
+
+    if args.scaling:
+        scaling(data, grid(k_neg, k_pos, args.gamma, args.c_min), args.workers, args.metric)
+        raise SystemExit
+
+    if args.checkpoint:
+        Path(args.checkpoint).parent.mkdir(parents=True, exist_ok=True)
+    kw = dict(workers=args.workers, metric=args.metric, checkpoint=args.checkpoint or None)
+    t0 = time.perf_counter()
+    if args.refine:
+        results, best = refine(data, k_neg, k_pos, args.gamma, args.c_min, rounds=args.refine, **kw)
+    else:
+        results = sweep(data, grid(k_neg, k_pos, args.gamma, args.c_min), **kw)
+        best = min(results, key=results.get)
+    wall = time.perf_counter() - t0
+
+    baseline = sweep(data, [(0.0, 0.0, 1.0, 0.0)], 1, args.metric, progress=None)
+    current = sweep(data, [(0.20, 0.10, 1.0, 0.0)], 1, args.metric, progress=None)
+    top = sorted(results, key=results.get)[:5]
+    print(f"\n{len(results)} points in {wall:.1f}s on {args.workers} workers ({args.metric})")
+    print(f"  no adjustment          loss {next(iter(baseline.values())):.6f}")
+    print(f"  current (0.20, 0.10)   loss {next(iter(current.values())):.6f}")
+    for p in top:
+        print("  " + "  ".join(f"{k}={v:.4f}" for k, v in zip(PARAMS, p)) + f"   loss {results[p]:.6f}")
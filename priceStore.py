@@ -0,0 +1,206 @@
+# priceStore.py  ── on-disk, per-ticker columnar price history
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from marketData import download_all
+
+COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+INDEX_FILE = "_index.json"
+OVERLAP = 5                     # stored business days re-downloaded on each update to detect re-adjustment
+ADJ_TOL = 1e-4                  # relative Close change on an overlap day that means history was re-adjusted
+MARKET_TZ = "America/New_York"
+SETTLED = "16:30"               # local time after which today's bar is final
+
+
+def last_complete_day(now=None):
+    """Latest date whose daily bar is final: today after SETTLED New York time, else yesterday."""
+    now = pd.Timestamp.now(tz=MARKET_TZ) if now is None else pd.Timestamp(now)
+    now = now.tz_localize(MARKET_TZ) if now.tz is None else now.tz_convert(MARKET_TZ)
+    day = now.normalize().tz_localize(None)
+    return day if now.strftime("%H:%M") >= SETTLED else day - pd.Timedelta(days=1)
+
+
+class PriceStore:
+    """
+    One directory per ticker holding a `.npy` file per column (dates as
+    int64 ns, prices and volume as float64).
+
+    Reads memory-map the column files, so selecting a few tickers, columns
+    or a date range only touches those pages; nothing is held in RAM
+    between calls.  `_index.json` records the last stored date and row
+    count per ticker, which is what `update` uses to fetch only the days
+    that are missing.
+
+    Prices are split / dividend adjusted (yfinance `auto_adjust`), so every
+    past bar changes when a ticker splits or pays out.  `update` therefore
+    re-downloads the last OVERLAP stored days too and rewrites the whole
+    partition when they no longer match; only settled bars are stored.
+    """
+
+    def __init__(self, root="data/qqq_dfs"):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        path = self.root / INDEX_FILE
+        self.index = json.loads(path.read_text()) if path.exists() else {}
+
+    # ── writing ──────────────────────────────────────────────────────────
+    def append(self, ticker, df):
+        """Append rows of `df` newer than the last stored date; returns rows added."""
+        df = df.sort_index()
+        last = self.last_date(ticker)
+        if last is not None:
+            df = df.loc[df.index > last]
+        if df.empty:
+            return 0
+        return self._write(ticker, df, keep_old=True)
+
+    def replace(self, ticker, df):
+        """Overwrite the whole partition with `df` (e.g. after a split re-adjusted history)."""
+        return self._write(ticker, df.sort_index(), keep_old=False)
+
+    def _write(self, ticker, df, keep_old):
+        part = self.root / ticker
+        part.mkdir(exist_ok=True)
+        new = {"Date": df.index.values.astype("datetime64[ns]").astype(np.int64)}
+        for col in COLUMNS:
+            if col in df:
+                new[col] = df[col].to_numpy(np.float64)    # Volume too: missing bars stay NaN
+        for col, values in new.items():
+            f = part / f"{col}.npy"
+            if keep_old and f.exists():
+                values = np.concatenate([np.load(f), values])   # older int64 Volume promotes to float64
+            tmp = part / f"{col}.tmp.npy"
+            np.save(tmp, values)
+            os.replace(tmp, f)
+
+        old_rows = self.index.get(ticker, {}).get("rows", 0) if keep_old else 0
+        self.index[ticker] = {
+            "last": str(df.index[-1].date()),
+            "rows": int(len(new["Date"]) + old_rows),
+            "columns": [c for c in COLUMNS if c in new],
+        }
+        self._save_index()
+        return len(df)
+
+    def readjusted(self, ticker, df):
+        """True when `df`'s closes on already-stored days differ from the stored ones."""
+        if self.last_date(ticker) is None or "Close" not in df:
+            return False
+        stored = self.read_arrays(ticker, ["Close"], start=df.index[0])
+        new = df["Close"].to_numpy(np.float64)
+        _, i, j = np.intersect1d(stored["Date"], df.index.values.astype("datetime64[ns]").astype(np.int64),
+                                 return_indices=True)
+        return bool(len(i)) and bool(np.any(np.abs(new[j] / stored["Close"][i] - 1) > ADJ_TOL))
+
+    def update(self, tickers, source=None, start="2015-04-21", now=None, **download_kw):
+        """
+        Bring `tickers` up to date, downloading only the days after each one's
+        last row plus an OVERLAP-day check window.
+
+        Tickers are grouped by their resume date so each group is a single
+        download_all call.  A ticker whose overlap closes changed (split or
+        dividend re-adjustment) is downloaded again from `start` and its
+        partition rewritten.  Bars after `last_complete_day(now)` – today's
+        session before the close – are never stored.  Returns download_all's
+        `failed` dict.
+        """
+        settled = last_complete_day(now)
+        groups = {}
+        for t in tickers:
+            last = self.last_date(t)
+            if last is None:
+                resume = start
+            elif np.busday_count(np.datetime64(last.date(), "D") + 1, np.datetime64(settled.date(), "D") + 1) == 0:
+                continue                                   # already up to date
+            else:
+                resume = str(np.busday_offset(np.datetime64(last.date(), "D"), -OVERLAP, roll="backward"))
+            groups.setdefault(resume, []).append(t)
+
+        failed, stale = {}, []
+        for resume, group in groups.items():
+            frames, errs = download_all(group, source, start=resume, **download_kw)
+            for t, df in frames.items():
+                df = df.sort_index().loc[:settled]
+                if df.empty:
+                    continue
+                if self.readjusted(t, df):
+                    stale.append(t)
+                else:
+                    self.append(t, df)
+            # nothing new since the last stored day is not a failure
+            failed.update({t: e for t, e in errs.items()
+                           if e != "no data" or self.last_date(t) is None})
+
+        if stale:                                          # history re-adjusted: fetch it all again
+            frames, errs = download_all(stale, source, start=start, **download_kw)
+            for t, df in frames.items():
+                df = df.sort_index().loc[:settled]
+                if not df.empty:
+                    self.replace(t, df)
+            failed.update(errs)
+        return failed
+
+    # ── reading ──────────────────────────────────────────────────────────
+    def tickers(self):
+        return sorted(self.index)
+
+    def last_date(self, ticker):
+        entry = self.index.get(ticker)
+        return pd.Timestamp(entry["last"]) if entry else None
+
+    def read_arrays(self, ticker, columns=None, start=None, end=None):
+        """Memory-mapped column slices {'Date': int64 ns, col: values} — no copies."""
+        part = self.root / ticker
+        dates = np.load(part / "Date.npy", mmap_mode="r")
+        lo = 0 if start is None else np.searchsorted(dates, pd.Timestamp(start).value, "left")
+        hi = len(dates) if end is None else np.searchsorted(dates, pd.Timestamp(end).value, "right")
+        out = {"Date": dates[lo:hi]}
+        for col in columns or self.index[ticker]["columns"]:
+            out[col] = np.load(part / f"{col}.npy", mmap_mode="r")[lo:hi]
+        return out
+
+    def read(self, ticker, columns=None, start=None, end=None):
+        """One ticker as a yfinance-shaped DataFrame indexed by Date."""
+        arrs = self.read_arrays(ticker, columns, start, end)
+        idx = pd.DatetimeIndex(arrs.pop("Date").view("datetime64[ns]"), name="Date")
+        return pd.DataFrame(arrs, index=idx)
+
+    def panel(self, tickers=None, column="Close", start=None, end=None):
+        """Date × ticker frame of a single column (outer-joined on dates)."""
+        series = {}
+        for t in tickers or self.tickers():
+            arrs = self.read_arrays(t, [column], start, end)
+            series[t] = pd.Series(arrs[column],
+                                  index=pd.DatetimeIndex(arrs["Date"].view("datetime64[ns]")))
+        df = pd.DataFrame(series)
+        df.index.name = "Date"
+        return df
+
+    def _save_index(self):
+        tmp = self.root / (INDEX_FILE + ".tmp")
+        tmp.write_text(json.dumps(self.index, indent=1, sort_keys=True))
+        os.replace(tmp, self.root / INDEX_FILE)
+
+
+if __name__ == "__main__":
+    # offline round-trip: 100 synthetic tickers, ~10 years of business days
+    import shutil
+    import tempfile
+    import time
+
+    from marketData import StubSource
+
+    root = Path(tempfile.mkdtemp())
+    try:
+        store = PriceStore(root)
+        names = [f"T{i:03d}" for i in range(100)]
+        store.update(names, StubSource(latency=0), start="2015-04-21", rate=100, progress=None)
+        t0 = time.perf_counter()
+        closes = PriceStore(root).panel(names, "Close")
+        print(f"panel {closes.shape} loaded in {time.perf_counter() - t0:.3f}s")
+    finally:
+        shutil.rmtree(root)
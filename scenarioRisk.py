@@ -0,0 +1,202 @@
+# scenarioRisk.py  ── portfolio P&L / Greeks over spot × vol × sentiment × time scenario grids
+import time
+
+import numpy as np
+import pandas as pd
+
+from BlackScholes import bs_engine
+from sentimentMapping import iv_adjust_array
+
+CONTRACT_SIZE = 100
+MAX_CELLS  = 50_000         # positions × scenarios priced per block (its ~20 temporaries stay in cache)
+MIN_IV     = 1e-4           # shocked vols are floored here
+SENTIMENTS = {"bearish": 0, "neutral": 1, "bullish": 2}
+AXES       = ("spot_move", "vol_shift", "sentiment", "day")
+MEASURES   = ("value", "pnl", "delta", "gamma", "vega", "theta")
+
+
+# ── inputs ───────────────────────────────────────────────────────────────
+def scenario_grid(spot_moves=np.linspace(-0.2, 0.2, 21), vol_shifts=np.linspace(-0.10, 0.10, 11),
+                  sentiments=list(SENTIMENTS), days=(0, 1, 2, 5, 10, 21), conf=0.9,
+                  k_neg=0.20, k_pos=0.10):
+    """
+    Cartesian grid of scenarios, one row each, indexed by AXES.
+
+    spot_move  relative move of every underlying (−0.1 = −10 %)
+    vol_shift  absolute IV change in vol points (0.02 = +2 pts), added after
+    sentiment  the iv_adjust shift at confidence `conf`, applied as an IV multiple
+    day        calendar days of time decay
+    """
+    index = pd.MultiIndex.from_product(                     # rounded so xs(0.0, …) finds linspace zeros
+        [np.round(np.asarray(spot_moves, float), 10), np.round(np.asarray(vol_shifts, float), 10),
+         pd.Categorical(sentiments, categories=sentiments), np.asarray(days, float)], names=AXES)
+    sent_id = index.get_level_values("sentiment").map(SENTIMENTS).to_numpy(float)
+    return pd.DataFrame({"iv_scale": iv_adjust_array(1.0, sent_id, conf, k_neg, k_pos)}, index=index)
+
+
+def load_positions(path):
+    """Positions CSV: spot, strike, T (years) or expiry, iv, call_put, quantity [, r, multiplier, beta, ticker]."""
+    df = pd.read_csv(path)
+    if "T" not in df and "expiry" in df:
+        from BlackScholes import year_fractions
+        df["T"] = year_fractions(df["expiry"].astype(str).to_numpy())
+    return df
+
+
+# ── engine ───────────────────────────────────────────────────────────────
+def _greeks(S, K, T, r, iv, is_call, dtype=np.float64):
+    """bs_engine on a block, with positions at or past expiry valued at intrinsic (delta a step, rest 0)."""
+    live = T > 0
+    g = bs_engine(S, K, np.where(live, T, 1.0), r, iv, is_call, dtype)
+    sign = np.where(is_call, 1.0, -1.0).astype(dtype)
+    if not live.all():
+        itm = sign * (S - K) > 0
+        g["price"] = np.where(live, g["price"], np.maximum(sign * (S - K), 0.0))
+        g["delta"] = np.where(live, g["delta"], sign * itm)
+        for k in ("gamma", "theta", "vega"):
+            g[k] = np.where(live, g[k], 0.0)
+    return g
+
+
+def evaluate(positions, scenarios, r=0.05, by=None, max_cells=MAX_CELLS, dtype=np.float64):
+    """
+    Portfolio value, P&L and Greeks in every scenario, summed over positions.
+
+    Positions × scenarios is priced block by block (at most `max_cells`
+    cells at a time) and each block is folded into the per-scenario totals
+    with one matrix product, so the full positions × scenarios tensor
+    never exists.  `by` names a position column (e.g. "ticker") to get one
+    set of totals per group instead of one for the whole book.  With
+    dtype=np.float32 blocks are priced in single precision (about twice as
+    fast); totals are always accumulated in float64.
+
+    Positions need spot, strike, T (years), iv, call_put and quantity
+    (contracts, negative = short); r, multiplier (default CONTRACT_SIZE)
+    and beta (spot-move sensitivity, default 1) are optional.
+
+    Returns:
+    DataFrame indexed like `scenarios` (plus a `by` level) with MEASURES:
+    value and pnl in currency, delta and gamma in shares (the same units
+    as black_scholes_greeks, times quantity × multiplier), vega per vol
+    point and theta per day.
+    """
+    P = len(positions)
+    col = lambda name, default: (positions[name].to_numpy(float) if name in positions
+                                 else np.full(P, default, float))
+    S0, K, T0, iv0 = (positions[c].to_numpy(float) for c in ("spot", "strike", "T", "iv"))
+    rate, beta = col("r", r), col("beta", 1.0)
+    is_call = np.char.upper(positions["call_put"].to_numpy(str)) == "C"
+    weight = positions["quantity"].to_numpy(float) * col("multiplier", CONTRACT_SIZE)
+
+    if by is None:
+        groups, codes = pd.Index(["portfolio"], name="portfolio"), np.zeros(P, int)
+    else:
+        codes, uniques = pd.factorize(positions[by], sort=True)
+        groups = pd.Index(uniques, name=by)
+    W = np.zeros((len(groups), P))                         # group × position weights
+    W[codes, np.arange(P)] = weight
+
+    move = scenarios.index.get_level_values("spot_move").to_numpy(float)
+    shift = scenarios.index.get_level_values("vol_shift").to_numpy(float)
+    years = scenarios.index.get_level_values("day").to_numpy(float) / 365
+    scale = scenarios["iv_scale"].to_numpy(float)
+    N = len(scenarios)
+
+    base = _greeks(S0, K, T0, rate, iv0, is_call)["price"]
+    totals = {m: np.zeros((len(groups), N)) for m in MEASURES if m != "pnl"}
+    p_step = max(1, min(P, max_cells // N))                # whole scenario rows when they fit
+    s_step = max(1, min(N, max_cells // p_step))
+    move, shift, years, scale = (x.astype(dtype) for x in (move, shift, years, scale))
+    for p0 in range(0, P, p_step):
+        p = slice(p0, p0 + p_step)
+        S_, K_, T_, r_, iv_, b_ = (x[p, None].astype(dtype) for x in (S0, K, T0, rate, iv0, beta))
+        c_, Wp = is_call[p, None], W[:, p].astype(dtype)
+        for s0 in range(0, N, s_step):
+            s = slice(s0, s0 + s_step)
+            S = S_ * (1 + b_ * move[s])
+            iv = np.maximum(iv_ * scale[s] + shift[s], MIN_IV)
+            g = _greeks(S, K_, T_ - years[s], r_, iv, c_, dtype)
+            totals["value"][:, s] += Wp @ g["price"]
+            totals["delta"][:, s] += Wp @ g["delta"]
+            totals["gamma"][:, s] += Wp @ g["gamma"]
+            totals["vega"][:, s] += Wp @ (0.01 * g["vega"])
+            totals["theta"][:, s] += Wp @ (g["theta"] / 365)
+    totals["pnl"] = totals["value"] - (W @ base)[:, None]
+
+    frames = {name: pd.DataFrame({m: totals[m][i] for m in MEASURES}, index=scenarios.index)
+              for i, name in enumerate(groups)}
+    if by is None:
+        return frames["portfolio"]
+    return pd.concat(frames, names=[by])
+
+
+def surface(result, measure="pnl", rows="spot_move", cols="vol_shift", **fixed):
+    """
+    2-D labelled slice of `evaluate` output for a report, e.g.
+    surface(res, "pnl", "spot_move", "sentiment", vol_shift=0, day=5).
+    Axes neither pivoted nor fixed must have a single value.
+    """
+    df = result[measure]
+    for level, value in fixed.items():
+        df = df.xs(value, level=level)
+    rest = [n for n in df.index.names if n not in (rows, cols)]
+    if rest:
+        if any(df.index.get_level_values(n).nunique() > 1 for n in rest):
+            raise ValueError(f"fix {', '.join(rest)} (keyword arguments) to get a 2-D surface")
+        df = df.droplevel(rest)
+    return df.unstack(cols)
+
+
+def synthetic_positions(n, seed=0):
+    """`n` random option positions on ten underlyings (offline timing / demo book)."""
+    rng = np.random.default_rng(seed)
+    tickers = np.array([f"T{i:02d}" for i in range(10)])
+    spots = dict(zip(tickers, rng.uniform(20, 500, len(tickers))))
+    ticker = rng.choice(tickers, n)
+    spot = np.array([spots[t] for t in ticker])
+    return pd.DataFrame({
+        "ticker": ticker, "spot": spot, "strike": spot * rng.uniform(0.7, 1.3, n),
+        "T": rng.choice([7, 14, 30, 60, 91, 182, 365], n) / 365, "iv": rng.uniform(0.15, 0.8, n),
+        "call_put": rng.choice(["C", "P"], n), "quantity": rng.integers(-20, 21, n),
+        "beta": rng.uniform(0.6, 1.6, n),
+    })
+
+
+if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Portfolio P&L / Greeks over a scenario grid")
+    src = ap.add_mutually_exclusive_group(required=True)
+    src.add_argument("--positions", help="positions CSV (see load_positions)")
+    src.add_argument("--synthetic", type=int, metavar="N", help="N random positions (timing run)")
+    ap.add_argument("--spot", nargs=3, type=float, default=[-0.2, 0.2, 41], metavar=("LO", "HI", "N"))
+    ap.add_argument("--vol", nargs=3, type=float, default=[-0.10, 0.10, 21], metavar=("LO", "HI", "N"))
+    ap.add_argument("--days", nargs="+", type=float, default=[0, 1, 2, 5, 10, 21])
+    ap.add_argument("--conf", type=float, default=0.9, help="sentiment confidence of the iv_adjust shocks")
+    ap.add_argument("--r", type=float, default=0.05)
+    ap.add_argument("--by", help="position column to break totals down by (e.g. ticker)")
+    ap.add_argument("--max-cells", type=int, default=MAX_CELLS)
+    ap.add_argument("--float32", action="store_true", help="price blocks in single precision")
+    ap.add_argument("--out", help="write the full result (CSV or .parquet)")
+    args = ap.parse_args()
+
+    positions = load_positions(args.positions) if args.positions else synthetic_positions(args.synthetic)
+    grid = scenario_grid(np.linspace(*args.spot[:2], int(args.spot[2])),
+                         np.linspace(*args.vol[:2], int(args.vol[2])), days=args.days, conf=args.conf)
+    t0 = time.perf_counter()
+    res = evaluate(positions, grid, args.r, args.by, args.max_cells,
+                   np.float32 if args.float32 else np.float64)
+    wall = time.perf_counter() - t0
+    print(f"{len(positions)} positions × {len(grid)} scenarios in {wall:.2f}s "
+          f"({len(positions) * len(grid) / wall / 1e6:.1f} M position-scenarios/s)")
+
+    book = res.groupby(level=list(AXES), observed=True, sort=False).sum() if args.by else res
+    money = "{:,.0f}".format
+    print("\nP&L, day 0, no extra vol shift: spot move × sentiment")
+    print(surface(book, "pnl", "spot_move", "sentiment", vol_shift=0.0, day=0.0)
+          .iloc[::5].rename(index="{:+.0%}".format).to_string(float_format=money))
+    print("\nP&L, neutral, flat spot: vol shift × days")
+    print(surface(book, "pnl", "vol_shift", "day", spot_move=0.0, sentiment="neutral")
+          .iloc[::2].rename(index="{:+.2f}".format).to_string(float_format=money))
+    if args.out:
+        res.to_parquet(args.out) if args.out.endswith(".parquet") else res.to_csv(args.out)
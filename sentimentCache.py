@@ -0,0 +1,170 @@
+# sentimentCache.py  ── disk-backed cache of article sentiment results
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+
+import tracing
+
+CACHE_PATH  = "data/sentiment_cache.sqlite"
+MODEL_DIR   = "model/finbert_finetuned"
+MAX_ENTRIES = 10_000          # rows kept on disk before LRU eviction
+MEM_ENTRIES = 256             # hot entries mirrored in memory
+TOUCH_BATCH = 64              # memory hits whose last_used is written to disk in one statement
+
+
+def normalize_text(text):
+    """Canonical form used for hashing: NFKC, collapsed whitespace, stripped."""
+    return " ".join(unicodedata.normalize("NFKC", text).split())
+
+
+def model_fingerprint(model_dir=MODEL_DIR):
+    """
+    Identity of a checkpoint directory: hash of every file's name, size and mtime.
+
+    Retraining or replacing the checkpoint changes the fingerprint, which
+    invalidates everything cached for the old weights.  A path that is not
+    a local directory (e.g. a hub id) is used verbatim.
+    """
+    root = Path(model_dir)
+    if not root.is_dir():
+        return str(model_dir)
+    h = hashlib.sha256()
+    for f in sorted(p for p in root.rglob("*") if p.is_file()):
+        st = f.stat()
+        h.update(f"{f.relative_to(root)}:{st.st_size}:{st.st_mtime_ns};".encode())
+    return h.hexdigest()
+
+
+class SentimentCache:
+    """
+    Content-addressed (sent_id, confidence, per-label scores) store.
+
+    Entries are keyed by sha256(normalized text + model fingerprint) and
+    live in SQLite; the most recently used ones are mirrored in memory so a
+    repeat lookup never touches disk.  Rows from other checkpoints are
+    dropped on open and the table is trimmed to `max_entries` by last use.
+    `variant` (the inference backend) is part of the key, so backends
+    sharing one file keep separate entries without purging each other.
+    """
+
+    def __init__(self, path=CACHE_PATH, model_dir=MODEL_DIR,
+                 max_entries=MAX_ENTRIES, mem_entries=MEM_ENTRIES, variant=""):
+        # `variant` separates results from different inference backends of one checkpoint
+        self.fingerprint = model_fingerprint(model_dir)
+        self.variant = variant
+        self.model_id = self.fingerprint + (f":{variant}" if variant else "")
+        self.max_entries = max_entries
+        self.mem_entries = mem_entries
+        self.hits = self.misses = 0
+        self._mem = OrderedDict()
+        self._touched = {}            # key → last use, for memory hits not yet written to disk
+        self._lock = threading.Lock()
+
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS sentiment ("
+            " key TEXT PRIMARY KEY, model_id TEXT, sent_id INTEGER,"
+            " confidence REAL, scores TEXT, last_used REAL)"
+        )
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(sentiment)")}
+        if "variant" not in columns:                   # model_id now holds the fingerprint alone
+            self._db.execute("ALTER TABLE sentiment ADD COLUMN variant TEXT NOT NULL DEFAULT ''")
+        self._db.execute("CREATE INDEX IF NOT EXISTS ix_last_used ON sentiment(last_used)")
+        # only a changed checkpoint invalidates rows; other backends' rows are kept
+        self._db.execute("DELETE FROM sentiment WHERE model_id != ?", (self.fingerprint,))
+        self._db.commit()
+
+    def key(self, text):
+        return hashlib.sha256(
+            (normalize_text(text) + "\0" + self.model_id).encode()
+        ).hexdigest()
+
+    def get(self, text):
+        """Return (sent_id, confidence, scores) or None."""
+        k = self.key(text)
+        with self._lock:
+            if k in self._mem:
+                self._mem.move_to_end(k)
+                self._touched[k] = time.time()            # keep hot rows from being trimmed
+                if len(self._touched) >= TOUCH_BATCH:
+                    self._flush_touched()
+                    self._db.commit()
+                self.hits += 1
+                tracing.count("sentiment_cache.hits")
+                return self._mem[k]
+            row = self._db.execute(
+                "SELECT sent_id, confidence, scores FROM sentiment WHERE key = ?", (k,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                tracing.count("sentiment_cache.misses")
+                return None
+            self._db.execute("UPDATE sentiment SET last_used = ? WHERE key = ?", (time.time(), k))
+            self._db.commit()
+            value = (row[0], row[1], json.loads(row[2]))
+            self._remember(k, value)
+            self.hits += 1
+            tracing.count("sentiment_cache.hits")
+            return value
+
+    def put(self, text, sent_id, confidence, scores):
+        k = self.key(text)
+        value = (int(sent_id), float(confidence), dict(scores))
+        with self._lock:
+            self._flush_touched()                         # trim below must see current last_used
+            self._db.execute(
+                "INSERT OR REPLACE INTO sentiment (key, model_id, sent_id, confidence, scores, last_used,"
+                " variant) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (k, self.fingerprint, value[0], value[1], json.dumps(value[2]), time.time(), self.variant),
+            )
+            self._db.execute(
+                "DELETE FROM sentiment WHERE key IN (SELECT key FROM sentiment"
+                " ORDER BY last_used DESC LIMIT -1 OFFSET ?)", (self.max_entries,)
+            )
+            self._db.commit()
+            self._remember(k, value)
+
+    def get_or_score(self, text, scorer):
+        """Cached result for `text`, computing it with scorer(text) → (sent_id, conf, scores) on a miss."""
+        value = self.get(text)
+        if value is None:
+            value = scorer(text)
+            self.put(text, *value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._mem.clear()
+            self._touched.clear()
+            self._db.execute("DELETE FROM sentiment")
+            self._db.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM sentiment").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._flush_touched()
+            self._db.commit()
+            self._db.close()
+
+    def _flush_touched(self):
+        if self._touched:
+            self._db.executemany("UPDATE sentiment SET last_used = ? WHERE key = ?",
+                                 [(t, k) for k, t in self._touched.items()])
+            self._touched.clear()
+
+    def _remember(self, k, value):
+        self._mem[k] = value
+        self._mem.move_to_end(k)
+        if len(self._mem) > self.mem_entries:
+            self._mem.popitem(last=False)
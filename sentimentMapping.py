@@ -1,23 +1,38 @@
-# sentimentMapping.py  ── end‑to‑end demo
-import yfinance as yf
-from datetime import datetime
-from scipy.stats import norm
+# sentimentMapping.py  ── sentiment → IV conversion (run as a script for the end‑to‑end demo)
+import os
+from datetime import datetime, timezone
+from functools import partial
 import numpy as np
-from transformers import pipeline, AutoTokenizer
-from newspaper import Article
+from BlackScholes import as_utc, bs_engine, chain_implied_vol
+from americanPricer import american_engine
+from inferenceBackends import BACKENDS, load_backend
+from modelRegistry import registry
+import tracing
+
+MODEL_DIR = "model/finbert_finetuned"
+TOKENIZER = "ProsusAI/finbert"
+BACKEND   = os.environ.get("FINBERT_BACKEND", "eager")    # eager | quantized | onnx
 
 # ── Black‑Scholes Greeks ───────────────────────────────────────────────
-def black_scholes_greeks(S, K, T, r, vol, call_put="C"):
-    d1 = (np.log(S / K) + (r + 0.5 * vol ** 2) * T) / (vol * np.sqrt(T))
-    d2 = d1 - vol * np.sqrt(T)
-    sign  = 1 if call_put == "C" else -1
-
-    delta = sign * norm.cdf(sign * d1)
-    gamma = norm.pdf(d1) / (S * vol * np.sqrt(T))
-    vega  = 0.01 * S * norm.pdf(d1) * np.sqrt(T)          # per 1‑vol‑pt
-    theta = (-S * norm.pdf(d1) * vol / (2 * np.sqrt(T))
-             - sign * r * K * np.exp(-r * T) * norm.cdf(sign * d2)) / 365
-    return {"delta": delta, "gamma": gamma, "vega": vega, "theta": theta}
+def black_scholes_greeks(S, K, T, r, vol, call_put="C", american=None, q=0.0):
+    """European Greeks, or American ones with american="binomial" | "baw"; q = continuous dividend yield."""
+    if american is None:
+        g = _european_greeks(S, K, T, r, vol, call_put, q)
+    else:
+        g = american_engine(S, K, T, r, vol, call_put, q, method=american)
+    tracing.count("options.priced", g["delta"].size)
+    return {"delta": g["delta"][()],
+            "gamma": g["gamma"][()],
+            "vega":  (0.01 * g["vega"])[()],               # per 1‑vol‑pt
+            "theta": (g["theta"] / 365)[()]}               # per day
+
+def _european_greeks(S, K, T, r, vol, call_put, q):
+    """bs_engine on the dividend-adjusted spot F = S·e^(−qT), with delta / gamma / theta taken w.r.t. S."""
+    disc_q = np.exp(-np.asarray(q, dtype=np.float64) * np.asarray(T, dtype=np.float64))
+    F = np.asarray(S, dtype=np.float64) * disc_q
+    g = bs_engine(F, K, T, r, vol, call_put)
+    return {**g, "delta": disc_q * g["delta"], "gamma": disc_q * disc_q * g["gamma"],
+            "theta": g["theta"] + np.asarray(q) * F * g["delta"]}
 
 # ── IV‑adjustment rule ────────────────────────────────────────────────
 def iv_adjust(base_iv, sent_id, conf, k_neg=0.20, k_pos=0.10):
@@ -27,76 +42,191 @@ def iv_adjust(base_iv, sent_id, conf, k_neg=0.20, k_pos=0.10):
         return base_iv * (1 - k_pos * conf)
     return base_iv            # neutral
 
-# ── FinBERT pipeline & tokenizer ──────────────────────────────────────
-clf = pipeline(
-    "text-classification",
-    model="model/finbert_finetuned",
-    tokenizer="ProsusAI/finbert",
-    top_k=None,                       # returns all 3 scores per call
-)
-tok = AutoTokenizer.from_pretrained("ProsusAI/finbert")
+def iv_adjust_array(base_iv, sent_id, conf, k_neg=0.20, k_pos=0.10):
+    """iv_adjust over arrays (e.g. a ticker × date matrix); any other sent_id, incl. NaN, is neutral."""
+    base_iv, sent_id, conf = np.asarray(base_iv), np.asarray(sent_id), np.asarray(conf)
+    scale = np.where(sent_id == 0, 1 + k_neg * conf, np.where(sent_id == 2, 1 - k_pos * conf, 1.0))
+    return base_iv * scale
+
+# ── FinBERT pipeline & tokenizer (loaded on first use) ───────────────
+def _load_tokenizer():
+    from transformers import AutoTokenizer
+    return AutoTokenizer.from_pretrained(TOKENIZER)
+
+def _load_classifier():
+    from transformers import pipeline
+    return pipeline(
+        "text-classification",
+        model=MODEL_DIR,
+        tokenizer=get_tokenizer(),
+        top_k=None,                   # returns all 3 scores per call
+    )
+
+def _load_backend(name):
+    return load_backend(name, MODEL_DIR)
+
+def _warm_backend(backend):
+    tok = get_tokenizer()
+    ids = np.array([[tok.cls_token_id, tok.sep_token_id]], dtype=np.int64)
+    backend({"input_ids": ids, "attention_mask": np.ones_like(ids)})   # first pass allocates the kernels
+
+registry.register("tokenizer", _load_tokenizer)
+registry.register("finbert", _load_classifier)
+for _name in BACKENDS:
+    registry.register(f"finbert:{_name}", partial(_load_backend, _name), warm=_warm_backend)
+
+def get_tokenizer():
+    return registry.get("tokenizer")
+
+def get_classifier():
+    """The plain transformers pipeline (scoring itself goes through get_backend)."""
+    return registry.get("finbert")
+
+def set_backend(name):
+    """Switch sentiment scoring between the eager, int8-quantized and ONNX Runtime models."""
+    global BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown backend {name!r}; choose one of {', '.join(BACKENDS)}")
+    BACKEND = name
+
+def get_backend():
+    return registry.get(f"finbert:{BACKEND}")
+
+def warm_up(background=False):
+    """Load tokenizer + model ahead of the first request; returns the thread if backgrounded."""
+    return registry.warm_up("tokenizer", f"finbert:{BACKEND}", background=background)
+
+def _chunk_ids(ids, max_len, tok):
+    """Split token ids into ≤max_len slices wrapped in CLS/SEP (≥1 slice per doc)."""
+    body = max_len - 2                              # keeps slice ≤512 incl. CLS/SEP
+    return [[tok.cls_token_id] + ids[i : i + body] + [tok.sep_token_id]
+            for i in range(0, max(len(ids), 1), body)]
+
+def score_articles(texts, batch_size=16, max_len=510):
+    """
+    Summed per-label probabilities for each article, one row per text.
+
+    All texts are tokenized once; their chunks are pooled, sorted by length
+    and padded per batch, so each forward pass carries `batch_size` chunks
+    drawn from any of the documents.
+    """
+    tok = get_tokenizer()
+    with tracing.span("sentiment.tokenize", articles=len(texts)):
+        ids = tok(list(texts), add_special_tokens=False)["input_ids"]
+        chunks, owner = [], []
+        for doc, doc_ids in enumerate(ids):
+            for chunk in _chunk_ids(doc_ids, max_len, tok):
+                chunks.append(chunk)
+                owner.append(doc)
+    tracing.count("sentiment.articles", len(ids))
+    tracing.count("sentiment.chunks", len(chunks))
+    tracing.count("sentiment.tokens", sum(map(len, chunks)))
+
+    backend = get_backend()
+    num_labels = backend.config.num_labels
+    order = sorted(range(len(chunks)), key=lambda i: len(chunks[i]), reverse=True)
+    probs = np.zeros((len(chunks), num_labels))
+    for b in range(0, len(order), batch_size):
+        rows = order[b : b + batch_size]
+        batch = tok.pad({"input_ids": [chunks[i] for i in rows]}, return_tensors="np")
+        with tracing.span("sentiment.forward", rows=len(rows), width=batch["input_ids"].shape[1]):
+            logits = backend({k: v.astype(np.int64) for k, v in batch.items()})
+        tracing.count("sentiment.forward_passes")
+        logits = logits - logits.max(-1, keepdims=True)
+        probs[rows] = np.exp(logits) / np.exp(logits).sum(-1, keepdims=True)
+
+    label_score = np.zeros((len(ids), num_labels))
+    np.add.at(label_score, owner, probs)
+    return label_score
+
+def get_sentiment_scores(texts, batch_size=16, max_len=510):
+    """Vote per article → [(sent_id, conf, {label: share of total score}), ...]."""
+    config   = get_backend().config
+    id2label = config.id2label
+    label2id = config.label2id
+    results = []
+    for row in score_articles(texts, batch_size, max_len):
+        row = row / row.sum()
+        best = int(row.argmax())
+        results.append((label2id[id2label[best]], float(row[best]),   # 0 / 1 / 2
+                        {id2label[i]: float(v) for i, v in enumerate(row)}))
+    return results
+
+def get_sentiment_batch(texts, batch_size=16, max_len=510):
+    """Confidence‑weighted majority vote for many articles → [(sent_id, conf), ...]."""
+    return [(sent_id, conf) for sent_id, conf, _ in
+            get_sentiment_scores(texts, batch_size, max_len)]
 
 def get_sentiment_full(text, max_len=510):
     """Chunk the article into ≤512‑token slices and aggregate sentiment."""
-    tokens = tok(text, add_special_tokens=False)["input_ids"]
-    chunks = [tokens[i : i + max_len - 2]          # keeps slice ≤512 incl. CLS/SEP
-              for i in range(0, len(tokens), max_len - 2)]
-
-    scores = []
-    for chunk in chunks:
-        txt = tok.decode(chunk)
-        scores.extend(clf(txt)[0])                 # list[dict] per chunk
-
-    # confidence‑weighted majority vote
-    label_score = {"negative": 0.0, "neutral": 0.0, "positive": 0.0}
-    for s in scores:
-        label_score[s["label"]] += s["score"]
-
-    best_label = max(label_score, key=label_score.get)
-    confidence = label_score[best_label] / sum(label_score.values())
-    sent_id    = clf.model.config.label2id[best_label]   # 0 / 1 / 2
-    return sent_id, confidence
-
-# ── Pull and parse a live article ─────────────────────────────────────
-url = (
-    "https://www.cnbc.com/2025/05/01/apple-has-managed-tariffs-so-far-"
-    "says-tough-to-predict-beyond-june.html"
-)
-art = Article(url); art.download(); art.parse()
-article = art.title + "\n" + art.text
-
-# ── Sentiment inference ───────────────────────────────────────────────
-sent_id, conf = get_sentiment_full(article)
-print("FinBERT sentiment:", ["bearish", "neutral", "bullish"][sent_id],
-      "conf", round(conf, 2))
-
-# ── Option baseline data (SPY call) ───────────────────────────────────
-tkr = yf.Ticker("SPY")
-
-# first expiry at least one day away so T > 0
-exp = next(e for e in tkr.options
-           if (datetime.fromisoformat(e) - datetime.utcnow()).days >= 1)
-
-# spot price
-S = tkr.history(period="1d")["Close"].iloc[0]
-
-# at‑the‑money call
-calls = tkr.option_chain(exp).calls
-opt   = calls.iloc[(calls["strike"] - S).abs().argmin()]
-
-K      = opt.strike
-iv_raw = opt.impliedVolatility
-print(f"Picked strike {K}  expiry {exp}")
-
-# ── Adjust IV by sentiment ────────────────────────────────────────────
-iv_new = iv_adjust(iv_raw, sent_id, conf)
-print("Baseline IV:", round(iv_raw, 4), "→ Adjusted IV:", round(iv_new, 4))
-
-# ── Time to expiry (fractional years) ─────────────────────────────────
-secs_to_exp = (datetime.fromisoformat(exp) - datetime.utcnow()).total_seconds()
-T = secs_to_exp / (365 * 24 * 3600)
-
-# ── Recompute Greeks ─────────────────────────────────────────────────
-r = 0.05     # risk‑free rate assumption
-greeks = black_scholes_greeks(S, K, T, r, iv_new)
-print("Adjusted Greeks:", greeks)
+    return get_sentiment_batch([text], max_len=max_len)[0]
+
+def main(snapshots=None):
+    from articleFetcher import ArticleFetcher
+    from chainSnapshots import ChainSnapshots, nearest_expiry
+    from tickerIndex import TickerIndex
+
+    # ── Pull and parse a live article ─────────────────────────────────────
+    url = (
+        "https://www.cnbc.com/2025/05/01/apple-has-managed-tariffs-so-far-"
+        "says-tough-to-predict-beyond-june.html"
+    )
+    with tracing.span("demo.article"):
+        article = ArticleFetcher(parse_workers=0).fetch(url)
+
+    # ── Sentiment inference ───────────────────────────────────────────────
+    with tracing.span("demo.sentiment"):
+        sent_id, conf = get_sentiment_full(article)
+    print("FinBERT sentiment:", ["bearish", "neutral", "bullish"][sent_id],
+          "conf", round(conf, 2))
+
+    # ── Option baseline data (call on the most-mentioned ticker, else SPY) ─
+    ticker = TickerIndex().top(article, default="SPY")
+    print("Routed to", ticker)
+    snapshots = snapshots or ChainSnapshots()
+
+    with tracing.span("demo.market"):
+        # first expiry at least one day away so T > 0
+        exp = nearest_expiry(snapshots, ticker)
+
+        # spot price
+        S = snapshots.spot(ticker)
+
+        calls = snapshots.chain(ticker, exp).calls
+
+    r = 0.05     # risk‑free rate assumption
+
+    # solve IV for the whole chain from mid/last prices, then take the ATM call
+    with tracing.span("demo.implied_vol", contracts=len(calls)):
+        solved = chain_implied_vol(calls, S, r, expiry=exp)
+    calls = calls.assign(iv_solved=solved["iv"])
+    print(f"IV solved for {solved['converged'].sum()}/{len(calls)} contracts,"
+          f" {solved['no_solution'].sum()} outside arbitrage bounds")
+    opt   = calls.iloc[(calls["strike"] - S).abs().argmin()]
+
+    K      = opt.strike
+    iv_raw = opt.iv_solved if opt.iv_solved > 0 else opt.impliedVolatility   # NaN → yfinance IV
+    print(f"Picked strike {K}  expiry {exp}")
+
+    # ── Adjust IV by sentiment ────────────────────────────────────────────
+    iv_new = iv_adjust(iv_raw, sent_id, conf)
+    print("Baseline IV:", round(iv_raw, 4), "→ Adjusted IV:", round(iv_new, 4))
+
+    # ── Time to expiry (fractional years) ─────────────────────────────────
+    secs_to_exp = (as_utc(exp) - datetime.now(timezone.utc)).total_seconds()
+    T = secs_to_exp / (365 * 24 * 3600)
+
+    # ── Recompute Greeks ─────────────────────────────────────────────────
+    with tracing.span("demo.greeks"):
+        greeks = black_scholes_greeks(S, K, T, r, iv_new)
+    print("Adjusted Greeks:", greeks)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser(description="One-article calibration demo")
+    tracing.add_arguments(ap)
+    args = ap.parse_args()
+    with tracing.from_args(args), tracing.span("demo"):
+        main()
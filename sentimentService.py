@@ -0,0 +1,373 @@
+# sentimentService.py  ── long-running calibration service with micro-batched FinBERT
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+import finalAnalysis
+import tracing
+from BlackScholes import as_utc
+from sentimentMapping import black_scholes_greeks, iv_adjust
+
+MAX_BATCH = 32        # articles per forward pass
+MAX_WAIT  = 0.005     # seconds the first request in a batch may wait for company
+
+
+class MicroBatcher:
+    """
+    Coalesce concurrent single-item calls into batched calls of `fn`.
+
+    `fn(items) -> results` runs on a one-thread executor (the model is not
+    re-entrant).  A batch is dispatched when it reaches `max_batch` items
+    or when its oldest item has waited `max_wait` seconds, whichever comes
+    first; while it runs, the next batch fills up.
+    """
+
+    def __init__(self, fn, max_batch=MAX_BATCH, max_wait=MAX_WAIT):
+        self.fn = fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.batches = self.items = 0
+        self._queue = None
+        self._task = None
+        self._pool = ThreadPoolExecutor(1, thread_name_prefix="batcher")
+
+    def start(self):
+        self._queue = asyncio.Queue()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        self._task.cancel()
+        self._pool.shutdown(wait=False)
+
+    async def submit(self, item):
+        fut = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, fut))
+        return await fut
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            items, futs = zip(*batch)
+            tracing.count("service.batches")
+            tracing.count("service.batched_items", len(items))
+            try:
+                results = await loop.run_in_executor(self._pool, self.fn, list(items))
+            except Exception as e:
+                if len(items) == 1:
+                    if not futs[0].done():
+                        futs[0].set_exception(e)
+                    continue
+                # one bad article should not fail its neighbours: retry each on its own
+                tracing.count("service.batch_retries")
+                await self._run_each(loop, items, futs)
+                continue
+            self.batches += 1
+            self.items += len(items)
+            for f, r in zip(futs, results):
+                if not f.done():
+                    f.set_result(r)
+
+    async def _run_each(self, loop, items, futs):
+        for item, f in zip(items, futs):
+            try:
+                (r,) = await loop.run_in_executor(self._pool, self.fn, [item])
+            except Exception as e:
+                tracing.count("service.item_errors")
+                if not f.done():
+                    f.set_exception(e)
+            else:
+                self.items += 1
+                if not f.done():
+                    f.set_result(r)
+
+
+# ── market data & scoring back-ends ──────────────────────────────────────
+class YFinanceMarket:
+    """Live spot prices, each reused for the snapshot layer's spot TTL."""
+
+    def __init__(self, snapshots=None):
+        from chainSnapshots import ChainSnapshots
+        self.snapshots = snapshots or ChainSnapshots()
+
+    def spot(self, ticker):
+        return self.snapshots.spot(ticker)
+
+
+class StubMarket:
+    """Fixed spot prices so the service can be load-tested offline."""
+
+    def __init__(self, spots=None, default=100.0):
+        self.spots = spots or {}
+        self.default = default
+
+    def spot(self, ticker):
+        return self.spots.get(ticker.upper(), self.default)
+
+
+class StubScorer:
+    """
+    Stand-in for get_sentiment_scores with a batch cost of `fixed + per_item * n` seconds.
+
+    Mimics how a transformer forward pass amortises its fixed overhead
+    across a batch, which is what micro-batching exploits.
+    """
+
+    LABELS = ("negative", "neutral", "positive")
+
+    def __init__(self, fixed=0.02, per_item=0.001):
+        self.fixed = fixed
+        self.per_item = per_item
+
+    def __call__(self, texts):
+        time.sleep(self.fixed + self.per_item * len(texts))
+        out = []
+        for t in texts:
+            sent_id = len(t) % 3                   # 0 negative, 1 neutral, 2 positive
+            scores = {label: 0.8 if i == sent_id else 0.1 for i, label in enumerate(self.LABELS)}
+            out.append((sent_id, scores[self.LABELS[sent_id]], scores))
+        return out
+
+
+def _default_scorer(texts):
+    from sentimentMapping import get_sentiment_scores
+    return get_sentiment_scores(texts)
+
+
+# ── calibration ──────────────────────────────────────────────────────────
+class CalibrationService:
+    """
+    One calibration per request: spot → article sentiment (batched) → iv_adjust → Greeks → analysis.
+
+    Blocking work (spot lookup, article download) runs on a thread pool;
+    sentiment goes through the MicroBatcher so concurrent requests share
+    forward passes.
+    """
+
+    def __init__(self, market=None, scorer=None, max_batch=MAX_BATCH, max_wait=MAX_WAIT,
+                 io_workers=16):
+        self.market = market or YFinanceMarket()
+        self.batcher = MicroBatcher(scorer or _default_scorer, max_batch, max_wait)
+        self.io = ThreadPoolExecutor(io_workers, thread_name_prefix="io")
+        self._fetcher = None
+
+    def start(self):
+        self.batcher.start()
+
+    async def stop(self):
+        await self.batcher.stop()
+        self.io.shutdown(wait=False)
+
+    def _article(self, url):
+        if self._fetcher is None:
+            from articleFetcher import ArticleFetcher
+            self._fetcher = ArticleFetcher(parse_workers=0)
+        return self._fetcher.fetch(url)
+
+    async def calibrate(self, req):
+        with tracing.span("calibrate"):
+            return await self._calibrate(req)
+
+    async def _calibrate(self, req):
+        loop = asyncio.get_running_loop()
+        ticker = str(req["ticker"]).strip().upper()
+        K = float(req["strike"])
+        iv = float(req["iv"])
+        r = float(req.get("r", 0.05))
+        call_put = str(req.get("call_put", "C")).strip().upper()
+        if call_put not in ("C", "P"):
+            raise ValueError("call_put must be 'C' or 'P'")
+        T = (as_utc(req["expiry"]) - datetime.now(timezone.utc)).total_seconds() / (365 * 24 * 3600)
+        if T <= 0:
+            raise ValueError("expiry must be in the future")
+
+        if not (req.get("text") or req.get("url")):
+            raise ValueError("provide 'text' or 'url'")
+
+        spot = loop.run_in_executor(self.io, self.market.spot, ticker)
+        try:
+            if req.get("text"):
+                article = req["text"]
+            else:
+                article = await loop.run_in_executor(self.io, self._article, req["url"])
+
+            with tracing.span("calibrate.sentiment_wait"):
+                sent_id, conf, scores = await self.batcher.submit(article)
+            S = await spot
+        finally:
+            if not spot.done():
+                spot.cancel()
+            elif not spot.cancelled():
+                spot.exception()                   # mark a failed lookup as retrieved
+        iv_new = iv_adjust(iv, sent_id, conf)
+        greeks = {k: float(v) for k, v in black_scholes_greeks(S, K, T, r, iv_new, call_put).items()}
+        return {
+            "ticker": ticker, "spot": S, "sent_id": sent_id, "confidence": conf, "scores": scores,
+            "iv": iv, "iv_adjusted": iv_new, "greeks": greeks,
+            "analysis": finalAnalysis.generate_analysis(iv_new, greeks, call_put),
+        }
+
+
+# ── minimal HTTP/1.1 front end (keep-alive, JSON) ─────────────────────────
+async def _read_request(reader):
+    line = await reader.readline()
+    if not line:
+        return None
+    method, path, _ = line.decode().split(" ", 2)
+    headers = {}
+    while (h := await reader.readline()) not in (b"\r\n", b"\n", b""):
+        k, _, v = h.decode().partition(":")
+        headers[k.strip().lower()] = v.strip()
+    body = await reader.readexactly(int(headers.get("content-length", 0)))
+    return method, path, headers, body
+
+
+def _response(status, payload):
+    if isinstance(payload, str):
+        body, ctype = payload.encode(), "text/plain; version=0.0.4"
+    else:
+        body, ctype = json.dumps(payload).encode(), "application/json"
+    reason = {200: "OK", 400: "Bad Request", 404: "Not Found", 500: "Internal Server Error"}[status]
+    return (f"HTTP/1.1 {status} {reason}\r\nContent-Type: {ctype}\r\n"
+            f"Content-Length: {len(body)}\r\n\r\n").encode() + body
+
+
+def make_handler(service):
+    async def handle(reader, writer):
+        try:
+            while (req := await _read_request(reader)) is not None:
+                method, path, _, body = req
+                if method == "POST" and path == "/calibrate":
+                    try:
+                        out = 200, await service.calibrate(json.loads(body))
+                    except (KeyError, ValueError, TypeError) as e:
+                        out = 400, {"error": f"{type(e).__name__}: {e}"}
+                    except Exception as e:
+                        out = 500, {"error": f"{type(e).__name__}: {e}"}
+                elif method == "GET" and path == "/metrics":
+                    out = 200, tracing.prometheus_text()
+                elif method == "GET" and path == "/health":
+                    b = service.batcher
+                    out = 200, {"batches": b.batches, "items": b.items,
+                                "mean_batch": b.items / b.batches if b.batches else 0.0}
+                else:
+                    out = 404, {"error": f"no route {method} {path}"}
+                writer.write(_response(*out))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+    return handle
+
+
+async def serve(host="127.0.0.1", port=8765, **service_kw):
+    service = CalibrationService(**service_kw)
+    service.start()
+    server = await asyncio.start_server(make_handler(service), host, port)
+    print(f"listening on http://{host}:{server.sockets[0].getsockname()[1]}"
+          "  (POST /calibrate, GET /health, GET /metrics)")
+    async with server:
+        await server.serve_forever()
+
+
+# ── bundled load generator ───────────────────────────────────────────────
+SAMPLE_TEXTS = [
+    "Apple beat earnings expectations and raised guidance for the June quarter.",
+    "Shares slid after the company warned that tariffs would squeeze margins.",
+    "The stock was little changed as investors awaited the Fed decision.",
+]
+
+
+async def loadtest(host, port, requests=500, concurrency=32):
+    """Fire `requests` calibrations over `concurrency` keep-alive connections; print p50/p99 and req/s."""
+    expiry = (datetime.now(timezone.utc) + timedelta(days=90)).date().isoformat()
+    latencies, errors = [], 0
+    counter = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        reader, writer = await asyncio.open_connection(host, port)
+        for i in counter:
+            payload = json.dumps({"ticker": "SPY", "strike": 100 + i % 20, "expiry": expiry,
+                                  "iv": 0.25, "r": 0.05, "call_put": "CP"[i % 2],
+                                  "text": SAMPLE_TEXTS[i % len(SAMPLE_TEXTS)] * (1 + i % 5)}).encode()
+            t0 = time.perf_counter()
+            writer.write(f"POST /calibrate HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+                         f"Content-Length: {len(payload)}\r\n\r\n".encode() + payload)
+            await writer.drain()
+            status = int((await reader.readline()).split()[1])
+            length = 0
+            while (h := await reader.readline()) != b"\r\n":
+                if h.lower().startswith(b"content-length"):
+                    length = int(h.split(b":")[1])
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - t0)
+            errors += status != 200
+        writer.close()
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - t0
+    lat = np.array(latencies) * 1000
+    print(f"{len(lat)} requests, {concurrency} concurrent, {errors} errors")
+    print(f"p50 {np.percentile(lat, 50):.1f} ms   p99 {np.percentile(lat, 99):.1f} ms   "
+          f"{len(lat) / wall:.1f} req/s")
+    return lat, wall
+
+
+async def _bench(args):
+    service = CalibrationService(market=StubMarket({"SPY": 105.0}),
+                                 scorer=None if args.real_model else StubScorer(),
+                                 max_batch=args.max_batch, max_wait=args.max_wait)
+    service.start()
+    server = await asyncio.start_server(make_handler(service), "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    async with server:
+        await loadtest("127.0.0.1", port, args.requests, args.concurrency)
+    b = service.batcher
+    print(f"{b.batches} forward passes, mean batch {b.items / max(b.batches, 1):.1f}")
+    await service.stop()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Micro-batching sentiment / Greeks service")
+    sub = ap.add_subparsers(dest="command", required=True)
+    s = sub.add_parser("serve")
+    s.add_argument("--host", default="127.0.0.1")
+    s.add_argument("--port", type=int, default=8765)
+    s.add_argument("--stub-market", action="store_true", help="fixed spot prices instead of yfinance")
+    b = sub.add_parser("bench", help="in-process server + load generator (stub market data)")
+    b.add_argument("--requests", type=int, default=500)
+    b.add_argument("--concurrency", type=int, default=32)
+    b.add_argument("--real-model", action="store_true", help="score with FinBERT instead of the stub")
+    for p in (s, b):
+        p.add_argument("--max-batch", type=int, default=MAX_BATCH)
+        p.add_argument("--max-wait", type=float, default=MAX_WAIT)
+        tracing.add_arguments(p)
+    args = ap.parse_args()
+
+    with tracing.from_args(args):
+        try:
+            if args.command == "serve":
+                asyncio.run(serve(args.host, args.port, max_batch=args.max_batch, max_wait=args.max_wait,
+                                  market=StubMarket() if args.stub_market else None))
+            else:
+                asyncio.run(_bench(args))
+        except KeyboardInterrupt:
+            pass
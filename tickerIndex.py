@@ -0,0 +1,264 @@
+# tickerIndex.py  ── one-pass multi-pattern matcher routing article text to Nasdaq-100 tickers
+import re
+from collections import Counter
+from typing import NamedTuple
+
+WIKI     = "https://en.wikipedia.org/wiki/Nasdaq-100"      # same table DataIntegration.py scrapes
+WINDOW   = 400          # characters of context kept either side of a mention (passages)
+
+# ticker → company name, extra aliases.  Names and aliases match case-sensitively (plus their
+# ALL-CAPS form, for headlines); cashtags ($aapl) match in any case.
+NASDAQ100 = {
+    "AAPL": ("Apple", ("iPhone maker",)),
+    "ABNB": ("Airbnb", ()),
+    "ADBE": ("Adobe", ()),
+    "ADI":  ("Analog Devices", ()),
+    "ADP":  ("Automatic Data Processing", ()),
+    "ADSK": ("Autodesk", ()),
+    "AEP":  ("American Electric Power", ()),
+    "AMAT": ("Applied Materials", ()),
+    "AMD":  ("Advanced Micro Devices", ()),
+    "AMGN": ("Amgen", ()),
+    "AMZN": ("Amazon", ("Amazon.com", "AWS", "Amazon Web Services")),
+    "APP":  ("AppLovin", ()),
+    "ARM":  ("Arm Holdings", ()),
+    "ASML": ("ASML Holding", ()),
+    "AVGO": ("Broadcom", ()),
+    "AXON": ("Axon Enterprise", ()),
+    "AZN":  ("AstraZeneca", ()),
+    "BIIB": ("Biogen", ()),
+    "BKNG": ("Booking Holdings", ("Booking.com", "Priceline")),
+    "BKR":  ("Baker Hughes", ()),
+    "CCEP": ("Coca-Cola Europacific Partners", ()),
+    "CDNS": ("Cadence Design Systems", ()),
+    "CDW":  ("CDW", ()),
+    "CEG":  ("Constellation Energy", ()),
+    "CHTR": ("Charter Communications", ()),
+    "CMCSA": ("Comcast", ("NBCUniversal",)),
+    "COST": ("Costco", ("Costco Wholesale",)),
+    "CPRT": ("Copart", ()),
+    "CRWD": ("CrowdStrike", ()),
+    "CSCO": ("Cisco", ("Cisco Systems",)),
+    "CSGP": ("CoStar Group", ()),
+    "CSX":  ("CSX", ()),
+    "CTAS": ("Cintas", ()),
+    "CTSH": ("Cognizant", ()),
+    "DASH": ("DoorDash", ()),
+    "DDOG": ("Datadog", ()),
+    "DXCM": ("DexCom", ("Dexcom",)),
+    "EA":   ("Electronic Arts", ()),
+    "EXC":  ("Exelon", ()),
+    "FANG": ("Diamondback Energy", ()),
+    "FAST": ("Fastenal", ()),
+    "FTNT": ("Fortinet", ()),
+    "GEHC": ("GE HealthCare", ("GE Healthcare",)),
+    "GFS":  ("GlobalFoundries", ()),
+    "GILD": ("Gilead Sciences", ("Gilead",)),
+    "GOOGL": ("Alphabet", ("Google", "YouTube")),
+    "GOOG": ("Alphabet", ()),                # class C; names route to GOOGL
+    "HON":  ("Honeywell", ()),
+    "IDXX": ("Idexx Laboratories", ("IDEXX",)),
+    "INTC": ("Intel", ()),
+    "INTU": ("Intuit", ("TurboTax",)),
+    "ISRG": ("Intuitive Surgical", ()),
+    "KDP":  ("Keurig Dr Pepper", ("Keurig Dr. Pepper",)),
+    "KHC":  ("Kraft Heinz", ()),
+    "KLAC": ("KLA Corporation", ("KLA Corp",)),
+    "LIN":  ("Linde", ()),
+    "LRCX": ("Lam Research", ()),
+    "LULU": ("Lululemon", ("lululemon",)),
+    "MAR":  ("Marriott", ("Marriott International",)),
+    "MCHP": ("Microchip Technology", ()),
+    "MDLZ": ("Mondelez", ("Mondelēz",)),
+    "MELI": ("MercadoLibre", ("Mercado Libre",)),
+    "META": ("Meta Platforms", ("Meta", "Facebook", "Instagram", "WhatsApp")),
+    "MNST": ("Monster Beverage", ()),
+    "MRVL": ("Marvell", ("Marvell Technology",)),
+    "MSFT": ("Microsoft", ()),
+    "MSTR": ("MicroStrategy", ()),
+    "MU":   ("Micron", ("Micron Technology",)),
+    "NFLX": ("Netflix", ()),
+    "NVDA": ("Nvidia", ("NVIDIA",)),
+    "NXPI": ("NXP Semiconductors", ()),
+    "ODFL": ("Old Dominion Freight Line", ()),
+    "ON":   ("ON Semiconductor", ("onsemi",)),
+    "ORLY": ("O'Reilly Automotive", ("O’Reilly Automotive",)),
+    "PANW": ("Palo Alto Networks", ()),
+    "PAYX": ("Paychex", ()),
+    "PCAR": ("Paccar", ("PACCAR",)),
+    "PDD":  ("PDD Holdings", ("Pinduoduo", "Temu")),
+    "PEP":  ("PepsiCo", ()),
+    "PLTR": ("Palantir", ("Palantir Technologies",)),
+    "PYPL": ("PayPal", ()),
+    "QCOM": ("Qualcomm", ()),
+    "REGN": ("Regeneron", ("Regeneron Pharmaceuticals",)),
+    "ROP":  ("Roper Technologies", ()),
+    "ROST": ("Ross Stores", ()),
+    "SBUX": ("Starbucks", ()),
+    "SHOP": ("Shopify", ()),
+    "SNPS": ("Synopsys", ()),
+    "TEAM": ("Atlassian", ()),
+    "TMUS": ("T-Mobile", ("T-Mobile US",)),
+    "TRI":  ("Thomson Reuters", ()),
+    "TSLA": ("Tesla", ()),
+    "TTD":  ("The Trade Desk", ()),
+    "TTWO": ("Take-Two Interactive", ("Take-Two",)),
+    "TXN":  ("Texas Instruments", ()),
+    "VRSK": ("Verisk", ("Verisk Analytics",)),
+    "VRTX": ("Vertex Pharmaceuticals", ()),
+    "WBD":  ("Warner Bros. Discovery", ()),
+    "WDAY": ("Workday", ()),
+    "XEL":  ("Xcel Energy", ()),
+    "ZS":   ("Zscaler", ()),
+}
+
+# Tickers that are ordinary words / abbreviations in upper case: only $cashtags and names count
+AMBIGUOUS = {"APP", "ARM", "COST", "DASH", "FAST", "HON", "LIN", "MAR", "MU", "ON", "SHOP", "TEAM", "TRI"}
+
+SUFFIX = re.compile(r"[,\s]+(Inc\.?|Corp\.?|Corporation|Co\.?|plc|PLC|N\.V\.|Ltd\.?|Limited|S\.A\.|"
+                    r"Incorporated|Class [A-C])$")
+
+
+class Mention(NamedTuple):
+    ticker: str
+    start: int
+    end: int
+    kind: str           # "cashtag", "ticker" or "name"
+
+
+def _trie(words):
+    """Nested-dict trie; "" marks the end of a word."""
+    root = {}
+    for w in words:
+        node = root
+        for ch in w:
+            node = node.setdefault(ch, {})
+        node[""] = True
+    return root
+
+
+def _trie_regex(node):
+    """
+    Regex equivalent to the trie: shared prefixes are written once, so the
+    engine follows one branch per character instead of trying every word.
+    """
+    branches = [(r"\s+" if ch == " " else re.escape(ch)) + _trie_regex(child)
+                for ch, child in sorted(node.items()) if ch]
+    if not branches:
+        return ""
+    body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+    if "" in node:
+        return f"(?:{body})?"          # greedy: the longest name wins, shorter ones on backtrack
+    return body
+
+
+def short_name(name):
+    """'Apple Inc.' → 'Apple', 'Alphabet Inc. (Class A)' → 'Alphabet' (scraped names)."""
+    prev = None
+    while prev != name:
+        prev, name = name, SUFFIX.sub("", name).strip()
+    return name
+
+
+class TickerIndex:
+    """
+    Compiled matcher over tickers, $cashtags, company names and aliases.
+
+    All patterns are merged into one trie and compiled into a single
+    regular expression, so a text is scanned once (in C) whatever the
+    number of patterns; word boundaries are enforced on both sides.
+    """
+
+    def __init__(self, companies=NASDAQ100, ambiguous=AMBIGUOUS):
+        self.lookup = {}                                 # surface form → (ticker, kind)
+        for ticker, (name, aliases) in companies.items():
+            for alias in (name, *aliases):
+                alias = " ".join(alias.split())
+                for form in (alias, alias.upper()):
+                    self.lookup.setdefault(form, (ticker, "name"))
+            if ticker not in ambiguous:
+                self.lookup[ticker] = (ticker, "ticker")
+        self.tickers = sorted(companies)
+        self._regex = re.compile(
+            r"(?<![\w$])(?:\$(?P<cash>(?i:" + _trie_regex(_trie(self.tickers)) + "))"
+            r"|(?P<word>" + _trie_regex(_trie(self.lookup)) + r"))(?![\w$])")
+
+    @classmethod
+    def scraped(cls, url=WIKI, ambiguous=AMBIGUOUS):
+        """Current constituents from Wikipedia (Ticker + Company columns), with the built-in aliases."""
+        import pandas as pd
+
+        table = pd.read_html(url, match="Ticker")[0].dropna(subset=["Ticker"])
+        companies = {t: (short_name(re.sub(r"\s*\(.*?\)", "", str(name))), NASDAQ100.get(t, ("", ()))[1])
+                     for t, name in zip(table["Ticker"], table["Company"])}
+        return cls(companies, ambiguous)
+
+    def mentions(self, text):
+        """Every mention in `text`, in order."""
+        out = []
+        for m in self._regex.finditer(text):
+            cash = m.group("cash")
+            if cash is not None:
+                out.append(Mention(cash.upper(), m.start(), m.end(), "cashtag"))
+            else:
+                ticker, kind = self.lookup[" ".join(m.group("word").split())]
+                out.append(Mention(ticker, m.start(), m.end(), kind))
+        return out
+
+    def counts(self, text):
+        """Counter of mentions per ticker."""
+        return Counter(m.ticker for m in self.mentions(text))
+
+    def top(self, text, default=None):
+        """Most-mentioned ticker (first mentioned on ties), or `default`."""
+        c = self.counts(text)
+        return c.most_common(1)[0][0] if c else default
+
+    def route(self, texts, min_count=1):
+        """ticker → [(text index, mentions), …] for a batch of articles."""
+        routes = {}
+        for i, text in enumerate(texts):
+            for ticker, n in self.counts(text).items():
+                if n >= min_count:
+                    routes.setdefault(ticker, []).append((i, n))
+        return routes
+
+    def passages(self, text, window=WINDOW):
+        """
+        ticker → the parts of `text` within `window` characters of its
+        mentions (overlapping windows merged), for per-ticker sentiment.
+        """
+        spans = {}
+        for m in self.mentions(text):
+            lo, hi = max(0, m.start - window), min(len(text), m.end + window)
+            s = spans.setdefault(m.ticker, [])
+            if s and lo <= s[-1][1]:
+                s[-1][1] = max(s[-1][1], hi)
+            else:
+                s.append([lo, hi])
+        return {t: " … ".join(text[lo:hi] for lo, hi in s) for t, s in spans.items()}
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+    import time
+
+    ap = argparse.ArgumentParser(description="Ticker mentions per article (files, or stdin)")
+    ap.add_argument("files", nargs="*")
+    ap.add_argument("--scrape", action="store_true", help="use the current Wikipedia constituents")
+    ap.add_argument("--min-count", type=int, default=1)
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    index = TickerIndex.scraped() if args.scrape else TickerIndex()
+    print(f"{len(index.lookup)} patterns for {len(index.tickers)} tickers compiled in "
+          f"{time.perf_counter() - t0:.2f}s", file=sys.stderr)
+    texts = [open(f, encoding="utf-8").read() for f in args.files] or [sys.stdin.read()]
+    names = args.files or ["<stdin>"]
+    t0 = time.perf_counter()
+    routes = index.route(texts, args.min_count)
+    wall = time.perf_counter() - t0
+    for ticker, hits in sorted(routes.items()):
+        print(f"{ticker:<6} " + ", ".join(f"{names[i]} ×{n}" for i, n in hits))
+    print(f"{len(texts)} articles in {wall * 1000:.1f} ms", file=sys.stderr)
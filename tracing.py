@@ -0,0 +1,274 @@
+# tracing.py  ── nested timing spans + counters, JSON trace / Prometheus export
+import cProfile
+import contextvars
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from functools import wraps
+
+ENABLED    = os.environ.get("DG_TRACE", "") not in ("", "0")
+MAX_EVENTS = 100_000      # finished spans kept for the JSON trace (aggregates are unbounded)
+MAX_SAMPLES = 10_000      # latest durations per span kept for percentiles
+BUCKETS    = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, float("inf"))
+
+
+class _Noop:
+    """What span() hands out while tracing is off: entering it costs one attribute lookup."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+_NOOP = _Noop()
+
+
+class _State:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.reset()
+
+    def reset(self):
+        self.t0 = time.perf_counter()
+        self.events = []
+        self.counters = defaultdict(float)
+        self.stats = {}                       # span name → [count, total, self, max, bucket counts]
+        self.durations = defaultdict(lambda: deque(maxlen=MAX_SAMPLES))   # for percentiles
+        self.profiles = {}                    # (span name, thread) → cProfile.Profile (profile mode)
+        self.profile_depth = None
+
+_S = _State()
+_stack = contextvars.ContextVar("span_stack", default=())   # per thread *and* per asyncio task
+
+
+class _Span:
+    __slots__ = ("name", "attrs", "start", "child", "parent", "profile", "token")
+
+    def __init__(self, name, attrs):
+        self.name, self.attrs, self.child, self.profile = name, attrs, 0.0, None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        stack = _stack.get()
+        self.parent = stack[-1] if stack else None
+        if (_S.profile_depth is not None and len(stack) == _S.profile_depth
+                and not getattr(_S.local, "profiling", False)):
+            with _S.lock:
+                self.profile = _S.profiles.setdefault((self.name, threading.get_ident()),
+                                                      cProfile.Profile())
+            _S.local.profiling = True
+            self.profile.enable()
+        self.token = _stack.set(stack + (self,))
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter()
+        if self.profile is not None:
+            self.profile.disable()
+            _S.local.profiling = False
+        _stack.reset(self.token)
+        dur = end - self.start
+        if self.parent is not None:
+            self.parent.child += dur
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        with _S.lock:
+            st = _S.stats.get(self.name)
+            if st is None:
+                st = _S.stats[self.name] = [0, 0.0, 0.0, 0.0, [0] * len(BUCKETS)]
+            st[0] += 1
+            st[1] += dur
+            st[2] += dur - self.child
+            st[3] = max(st[3], dur)
+            st[4][next(i for i, b in enumerate(BUCKETS) if dur <= b)] += 1
+            _S.durations[self.name].append(dur)
+            if len(_S.events) < MAX_EVENTS:
+                _S.events.append({
+                    "name": self.name, "ph": "X", "pid": os.getpid(),
+                    "tid": threading.get_ident(), "ts": (self.start - _S.t0) * 1e6,
+                    "dur": dur * 1e6, "args": self.attrs,
+                })
+        return False
+
+
+# ── public API ───────────────────────────────────────────────────────────
+def enable():
+    global ENABLED
+    ENABLED = True
+
+
+def disable():
+    global ENABLED
+    ENABLED = False
+
+
+def reset():
+    with _S.lock:
+        _S.reset()
+
+
+def span(name, **attrs):
+    """Context manager timing a (possibly nested) stage: `with span("sentiment.forward", rows=16): ...`."""
+    if not ENABLED:
+        return _NOOP
+    return _Span(name, attrs)
+
+
+def traced(name=None):
+    """Decorator form of span(); defaults to the function's qualified name."""
+    def wrap(fn):
+        label = name or fn.__qualname__
+
+        @wraps(fn)
+        def inner(*args, **kwargs):
+            if not ENABLED:
+                return fn(*args, **kwargs)
+            with _Span(label, {}):
+                return fn(*args, **kwargs)
+        return inner
+    return wrap
+
+
+def count(name, n=1):
+    """Add `n` to a monotonically increasing counter (chunks, tokens, cache hits, …)."""
+    if ENABLED:
+        with _S.lock:
+            _S.counters[name] += n
+
+
+def counters():
+    with _S.lock:
+        return dict(_S.counters)
+
+
+# ── exports ──────────────────────────────────────────────────────────────
+def export_json(path):
+    """Chrome / Perfetto trace-event file (open in chrome://tracing or ui.perfetto.dev)."""
+    with _S.lock:
+        doc = {"traceEvents": list(_S.events), "displayTimeUnit": "ms",
+               "otherData": {"counters": dict(_S.counters)}}
+    with open(path, "w") as f:
+        json.dump(doc, f, default=str)
+
+
+def _metric(name):
+    return "dg_" + "".join(c if c.isalnum() else "_" for c in name)
+
+
+def prometheus_text():
+    """Counters and per-span latency histograms in the Prometheus text exposition format."""
+    with _S.lock:
+        counters_ = sorted(_S.counters.items())
+        stats = sorted((k, v[0], v[1], list(v[4])) for k, v in _S.stats.items())
+    lines = []
+    for name, value in counters_:
+        m = _metric(name) + "_total"
+        lines += [f"# TYPE {m} counter", f"{m} {value:g}"]
+    if stats:
+        lines.append("# TYPE dg_span_seconds histogram")
+    for name, n, total, buckets in stats:
+        cum = 0
+        for le, c in zip(BUCKETS, buckets):
+            cum += c
+            lines.append(f'dg_span_seconds_bucket{{span="{name}",le="{"+Inf" if le == float("inf") else le}"}} {cum}')
+        lines.append(f'dg_span_seconds_sum{{span="{name}"}} {total:.6f}')
+        lines.append(f'dg_span_seconds_count{{span="{name}"}} {n}')
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path):
+    with open(path, "w") as f:
+        f.write(prometheus_text())
+
+
+def summary():
+    """Per-span rows: calls, total / self seconds, mean, p50, p95, max (sorted by total)."""
+    with _S.lock:
+        items = [(k, v[:4], sorted(_S.durations[k])) for k, v in _S.stats.items()]
+    rows = []
+    for name, (n, total, self_t, mx), d in items:
+        rows.append({"span": name, "calls": n, "total": total, "self": self_t, "mean": total / n,
+                     "p50": d[len(d) // 2], "p95": d[min(len(d) - 1, int(0.95 * len(d)))], "max": mx})
+    return sorted(rows, key=lambda r: -r["total"])
+
+
+def print_summary():
+    rows = summary()
+    if not rows:
+        print("(no spans recorded)")
+        return
+    width = max(len(r["span"]) for r in rows)
+    print(f"\n{'span':<{width}} {'calls':>6} {'total ms':>9} {'self ms':>9} {'mean ms':>8}"
+          f" {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8}")
+    for r in rows:
+        print(f"{r['span']:<{width}} {r['calls']:6d}" + "".join(
+            f" {1000 * r[k]:{w}.2f}" for k, w in (("total", 9), ("self", 9), ("mean", 8),
+                                                   ("p50", 8), ("p95", 8), ("max", 8))))
+    for name, value in sorted(counters().items()):
+        print(f"  {name} = {value:g}")
+
+
+def profile_stages(depth=1):
+    """cProfile every span opened at nesting `depth` (0 = root spans, 1 = their children), per span name."""
+    _S.profile_depth = depth
+
+
+def dump_slowest_profile(path, top=25):
+    """Write (and print the top of) the cProfile stats of the stage with the largest total time."""
+    import pstats
+
+    with _S.lock:
+        timed = {k: _S.stats[k][1] for k, _ in _S.profiles if k in _S.stats}
+        if not timed:
+            print("(no profiled stages)")
+            return None
+        name = max(timed, key=timed.get)
+        profiles = [p for (k, _), p in _S.profiles.items() if k == name]
+    stats = pstats.Stats(*profiles)                # merged across the threads that ran the stage
+    stats.dump_stats(path)
+    print(f"\ncProfile of slowest stage {name!r} ({1000 * timed[name]:.1f} ms) → {path}")
+    stats.sort_stats("cumulative").print_stats(top)
+    return name
+
+
+# ── command-line glue ────────────────────────────────────────────────────
+def add_arguments(parser):
+    g = parser.add_argument_group("tracing")
+    g.add_argument("--profile", action="store_true", help="print a per-stage latency breakdown")
+    g.add_argument("--cprofile", metavar="PATH", help="also dump cProfile stats of the slowest stage")
+    g.add_argument("--trace", metavar="PATH", help="write a JSON trace (chrome://tracing / Perfetto)")
+    g.add_argument("--metrics", metavar="PATH", help="write Prometheus text-format metrics")
+
+
+@contextmanager
+def from_args(args, profile_depth=1):
+    """Enable tracing if any tracing flag was given; report / export when the block exits."""
+    on = args.profile or args.cprofile or args.trace or args.metrics
+    if on:
+        enable()
+        if args.cprofile:
+            profile_stages(profile_depth)
+    try:
+        yield
+    finally:
+        if on:
+            if args.trace:
+                export_json(args.trace)
+            if args.metrics:
+                write_prometheus(args.metrics)
+            if args.profile or args.cprofile:
+                print_summary()
+            if args.cprofile:
+                dump_slowest_profile(args.cprofile)